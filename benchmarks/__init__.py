@@ -0,0 +1 @@
+"""Сквозной бенчмарк страниц Yatube: python manage.py benchmark."""
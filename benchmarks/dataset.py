@@ -0,0 +1,218 @@
+"""Детерминированный синтетический набор данных.
+
+Строки пишутся через bulk_create пачками из генераторов, так что память
+не зависит от объема: в ней держатся только id пользователей и групп и
+текущая пачка. Сигналы при bulk_create не срабатывают, поэтому
+производные данные (счетчики, ленты подписок, поисковый индекс) после
+загрузки пересчитываются теми же функциями, что и команды обслуживания.
+
+Авторство постов и подписки распределены по степенному закону (Ципф):
+немного популярных авторов и длинный хвост. Комментарии приходят
+всплесками: у большинства постов их мало, у редких — сотни.
+"""
+import datetime
+import itertools
+import json
+import random
+import tempfile
+
+from PIL import Image
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Max, Min
+
+from posts.images import build_variants
+from posts.maintenance import (explicit_dates, invalidate_feeds,
+                               rebuild_derived)
+from posts.models import Post, Group, Comment, Follow, User
+
+
+WORDS = (
+    'утро', 'город', 'дождь', 'кофе', 'книга', 'море', 'горы', 'поезд',
+    'кошка', 'собака', 'сад', 'лес', 'река', 'снег', 'солнце', 'ветер',
+    'музыка', 'фильм', 'код', 'python', 'django', 'база', 'запрос',
+    'индекс', 'кэш', 'лента', 'друг', 'отпуск', 'работа', 'вечер',
+)
+
+# Разных картинок немного: посты делят их, как делят популярные файлы.
+DISTINCT_IMAGES = 5
+IMAGE_SIZE = (320, 180)
+BATCH_SIZE = 1000
+
+ZIPF_EXPONENT = 1.1
+# Параметр Парето для числа подписок и всплесков комментариев: у
+# распределения тяжелый хвост, а среднее (k - 1) равно 1 / (ALPHA - 1).
+PARETO_ALPHA = 1.5
+MAX_COMMENTS_PER_POST = 5000
+# Момент, к которому по умолчанию приходятся последние посты: с текущим
+# временем одно и то же зерно давало бы разные даты при каждом запуске.
+EPOCH = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _last_id(model):
+    return model.objects.aggregate(last=Max('id'))['last'] or 0
+
+
+def _heavy_tail(rng, mean):
+    """Неотрицательное целое со средним около mean и тяжелым хвостом."""
+    sample = (rng.paretovariate(PARETO_ALPHA) - 1) * (PARETO_ALPHA - 1)
+    return int(mean * sample + rng.random())
+
+
+def _batches(objects, batch_size):
+    iterator = iter(objects)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _no_progress(phase, done, total):
+    pass
+
+
+class Popularity:
+    """Выбор пользователей с весами по закону Ципфа."""
+
+    def __init__(self, rng, user_ids):
+        self.rng = rng
+        self.ranked = list(user_ids)
+        rng.shuffle(self.ranked)
+        self.cum_weights = list(itertools.accumulate(
+            1 / rank ** ZIPF_EXPONENT
+            for rank in range(1, len(self.ranked) + 1)))
+
+    def choose(self, count=1):
+        return self.rng.choices(self.ranked, cum_weights=self.cum_weights,
+                                k=count)
+
+
+def _insert(model, objects, total, batch_size, progress):
+    done = 0
+    for batch in _batches(objects, batch_size):
+        model.objects.bulk_create(batch, ignore_conflicts=model is Follow)
+        done += len(batch)
+        progress(model.__name__.lower(), done, total)
+
+
+def _make_images(rng, prefix, count):
+    """Крошечные картинки в storage с готовыми вариантами для карточек."""
+    images = []
+    for number in range(count):
+        spool = tempfile.SpooledTemporaryFile()
+        color = tuple(rng.randrange(256) for _ in range(3))
+        Image.new('RGB', IMAGE_SIZE, color).save(spool, 'JPEG', quality=85)
+        spool.seek(0)
+        name = default_storage.save(f'posts/{prefix}_{number}.jpg',
+                                    File(spool))
+        variants = build_variants(name)
+        images.append({
+            'image': name,
+            'image_width': variants.pop('width'),
+            'image_height': variants.pop('height'),
+            'image_variants': json.dumps(variants),
+        })
+    return images
+
+
+def seed(users=50, groups=5, posts=1000, comments=3000, follows=10,
+         images=100, days=365, prefix='bench', random_seed=0,
+         until=EPOCH, batch_size=BATCH_SIZE, progress=None):
+    """Наполняет базу и возвращает id пользователей, slug групп и
+    диапазон id постов.
+
+    comments — примерное общее число комментариев, follows — среднее
+    число подписок у пользователя, images — число постов с картинкой,
+    days — за сколько дней до момента until разбросаны посты.
+    progress(phase, done, total) вызывается после каждой пачки.
+    При одинаковых random_seed и until содержимое, включая даты,
+    получается одинаковым.
+    """
+    rng = random.Random(random_seed)
+    progress = progress or _no_progress
+    step = datetime.timedelta(days=days) / max(posts, 1)
+
+    def post_date(number):
+        return until - step * (posts - number)
+
+    with transaction.atomic():
+        # Новые id больше текущего максимума, но не обязательно идут
+        # сразу за ним: у AUTOINCREMENT в SQLite номера не переиспользуются.
+        last_user = _last_id(User)
+        _insert(User, (User(username=f'{prefix}{last_user + 1 + number}')
+                       for number in range(users)),
+                users, batch_size, progress)
+        user_ids = list(User.objects.filter(
+            id__gt=last_user).order_by('id').values_list('id', flat=True))
+        popularity = Popularity(rng, user_ids)
+
+        last_group = _last_id(Group)
+        _insert(Group, (Group(title=f'Группа {number}',
+                              slug=f'{prefix}-{last_group + 1 + number}',
+                              description=_text(rng, 12))
+                        for number in range(groups)),
+                groups, batch_size, progress)
+        group_ids = list(Group.objects.filter(
+            id__gt=last_group).order_by('id').values_list('id', flat=True))
+
+        last_post = _last_id(Post)
+        with explicit_dates(Post._meta.get_field('pub_date'),
+                            Comment._meta.get_field('created')):
+            _insert(Post, (
+                Post(text=_text(rng, rng.randint(5, 60)),
+                     author_id=popularity.choose()[0],
+                     group_id=(rng.choice(group_ids)
+                               if group_ids and rng.random() < 0.7
+                               else None),
+                     pub_date=post_date(number))
+                for number in range(posts)), posts, batch_size, progress)
+            # Внутри одной транзакции id вставленных постов идут подряд.
+            first_post = Post.objects.filter(id__gt=last_post).aggregate(
+                first=Min('id'))['first'] or last_post + 1
+            post_ids = range(first_post, _last_id(Post) + 1)
+
+            per_post = comments / posts if posts else 0
+            _insert(Comment, (
+                Comment(post_id=post_id, author_id=rng.choice(user_ids),
+                        text=_text(rng, rng.randint(3, 20)),
+                        created=post_date(number) + datetime.timedelta(
+                            minutes=rng.expovariate(1 / 60)))
+                for number, post_id in enumerate(post_ids)
+                for _ in range(min(_heavy_tail(rng, per_post),
+                                   MAX_COMMENTS_PER_POST))
+            ), comments, batch_size, progress)
+
+        _insert(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in sorted(set(popularity.choose(
+                min(_heavy_tail(rng, follows), len(user_ids)))))
+            if author_id != user_id
+        ), users * follows, batch_size, progress)
+
+        image_files = _make_images(
+            rng, prefix, min(images, DISTINCT_IMAGES)) if images else []
+        with_image = rng.sample(post_ids, min(images, len(post_ids)))
+        for number, image_fields in enumerate(image_files):
+            for batch in _batches(with_image[number::len(image_files)],
+                                  batch_size):
+                Post.objects.filter(pk__in=batch).update(**image_fields)
+
+    # Пересчитываем только записанное: стоимость не зависит от того,
+    # сколько данных уже было в базе.
+    rebuild_derived(user_ids, batch_size, progress,
+                    posts=Post.objects.filter(
+                        pk__range=(first_post, post_ids.stop - 1)))
+    invalidate_feeds(group_ids, user_ids)
+    return {
+        'users': user_ids,
+        'groups': list(Group.objects.filter(
+            id__in=group_ids).values_list('slug', flat=True)),
+        'posts': post_ids,
+    }
@@ -0,0 +1,225 @@
+import math
+import platform
+from collections import defaultdict
+from importlib import import_module
+from time import perf_counter
+
+import django
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from core.queries import QueryRecorder, wrap_all_connections
+from posts.comments import first_page
+from posts.models import Post, Comment, User
+
+
+ANONYMOUS = 'anonymous'
+USER = 'user'
+STAFF = 'staff'
+BOTH = (ANONYMOUS, USER)
+
+# Маршруты, которые должен покрывать бенчмарк.
+URLCONFS = ('posts.urls', 'users.urls', 'about.urls')
+
+
+class Scenario:
+    """Один запрос бенчмарка: имя маршрута, URL и кто его выполняет."""
+
+    def __init__(self, route, url, method='get', data=None, clients=BOTH,
+                 name=None):
+        self.route = route
+        self.url = url
+        self.method = method
+        self.data = data
+        self.clients = clients
+        self.name = name or route
+
+
+def route_names():
+    names = set()
+    for urlconf in URLCONFS:
+        module = import_module(urlconf)
+        namespace = getattr(module, 'app_name', None)
+        names.update(f'{namespace}:{pattern.name}' if namespace
+                     else pattern.name
+                     for pattern in module.urlpatterns if pattern.name)
+    return names
+
+
+def build_scenarios(data):
+    """Сценарии для набора данных из benchmarks.dataset.seed."""
+    users, posts = data['users'], data['posts']
+    reader = User.objects.get(pk=users[0])
+    post = Post.objects.filter(
+        pk__range=(posts[0], posts[-1])).select_related(
+            'author').order_by('-comment_count').first()
+    own_post = Post.objects.filter(author=reader).first() or \
+        Post.objects.create(text='Пост читателя', author=reader)
+    stranger = User.objects.filter(pk__range=(users[0], users[-1])).exclude(
+        pk=reader.pk).exclude(following__user=reader).first() or post.author
+    post_args = [post.author.username, post.pk]
+    comments_cursor = first_page(post)[1] or ''
+    return reader, [
+        Scenario('index', reverse('index')),
+        Scenario('index', reverse('index') + '?page=5', name='index:page'),
+        Scenario('index', reverse('index') + '?after=',
+                 name='index:cursor'),
+        Scenario('group', reverse('group', args=[data['groups'][0]])),
+        Scenario('profile', reverse('profile', args=[post.author.username])),
+        Scenario('post', reverse('post', args=post_args)),
+        Scenario('post_comments', reverse('post_comments', args=post_args) +
+                 '?after=' + comments_cursor),
+        Scenario('search', reverse('search') + '?q=кофе+город'),
+        Scenario('export', reverse('export') + '?author=' +
+                 post.author.username, clients=(STAFF,)),
+        Scenario('follow_index', reverse('follow_index'), clients=(USER,)),
+        Scenario('new_post', reverse('new_post'), clients=(USER,)),
+        Scenario('new_post', reverse('new_post'), 'post',
+                 {'text': 'Новый пост из бенчмарка'}, clients=(USER,),
+                 name='new_post:submit'),
+        Scenario('post_edit', reverse(
+            'post_edit', args=[reader.username, own_post.pk]),
+            clients=(USER,)),
+        Scenario('add_comment', reverse('add_comment', args=post_args),
+                 'post', {'text': 'Комментарий из бенчмарка'},
+                 clients=(USER,)),
+        Scenario('profile_follow', reverse(
+            'profile_follow', args=[stranger.username]), clients=(USER,)),
+        Scenario('profile_unfollow', reverse(
+            'profile_unfollow', args=[stranger.username]), clients=(USER,)),
+        Scenario('error404', reverse('error404')),
+        Scenario('error500', reverse('error500')),
+        Scenario('signup', reverse('signup'), clients=(ANONYMOUS,)),
+        Scenario('about:author', reverse('about:author')),
+        Scenario('about:tech', reverse('about:tech')),
+    ]
+
+
+def measure(client, scenario, cold_cache=False):
+    """Время ответа с чтением всего тела, число SQL-запросов, размер."""
+    if cold_cache:
+        cache.clear()
+    recorder = QueryRecorder()
+    with wrap_all_connections(recorder):
+        start = perf_counter()
+        response = getattr(client, scenario.method)(
+            scenario.url, scenario.data)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        elapsed = perf_counter() - start
+    return {'seconds': elapsed, 'queries': recorder.count, 'bytes': size,
+            'status': response.status_code}
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(scenario, client_name, samples):
+    latencies = [sample['seconds'] * 1000 for sample in samples]
+    queries = [sample['queries'] for sample in samples]
+    sizes = [sample['bytes'] for sample in samples]
+    return {
+        'name': scenario.name,
+        'route': scenario.route,
+        'client': client_name,
+        'method': scenario.method.upper(),
+        'url': scenario.url,
+        'requests': len(samples),
+        'status': sorted({sample['status'] for sample in samples}),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'mean': round(sum(latencies) / len(latencies), 3),
+            'max': round(max(latencies), 3),
+        },
+        'queries': {
+            'p50': percentile(queries, 50),
+            'max': max(queries),
+            'mean': round(sum(queries) / len(queries), 2),
+        },
+        'bytes': {
+            'p50': percentile(sizes, 50),
+            'max': max(sizes),
+        },
+    }
+
+
+def run(data, iterations=20, warmup=2, cold_cache=False, dataset=None):
+    """Прогоняет все сценарии и возвращает отчет для json.dump.
+
+    Сценарии чередуются внутри каждого круга, так что подписка и отписка
+    идут по очереди, а кэш прогревается так же, как под живым трафиком.
+    Первые warmup кругов не учитываются.
+    """
+    reader, scenarios = build_scenarios(data)
+    clients = {ANONYMOUS: Client(), USER: Client(), STAFF: Client()}
+    clients[USER].force_login(reader)
+    clients[STAFF].force_login(User.objects.get_or_create(
+        username='benchmark-staff', defaults={'is_staff': True})[0])
+    samples = defaultdict(list)
+    for round_number in range(warmup + iterations):
+        for scenario in scenarios:
+            for client_name in scenario.clients:
+                sample = measure(clients[client_name], scenario, cold_cache)
+                if round_number >= warmup:
+                    samples[scenario.name, client_name].append(sample)
+    covered = {scenario.route for scenario in scenarios}
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'iterations': iterations,
+            'warmup': warmup,
+            'cold_cache': cold_cache,
+            'dataset': dataset or {},
+            'rows': {
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'users': User.objects.count(),
+            },
+            'uncovered_routes': sorted(route_names() - covered),
+        },
+        'results': [
+            summarize(scenario, client_name,
+                      samples[scenario.name, client_name])
+            for scenario in scenarios for client_name in scenario.clients
+            if samples[scenario.name, client_name]
+        ],
+    }
+
+
+def compare(baseline, current, threshold=1.25, min_delta_ms=1.0):
+    """Регрессии относительно прошлого прогона: p95 выросла больше чем в
+    threshold раз (и хотя бы на min_delta_ms) или стало больше запросов.
+    """
+    previous = {(result['name'], result['client']): result
+                for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = previous.get((result['name'], result['client']))
+        if before is None:
+            continue
+        label = f"{result['name']} ({result['client']})"
+        old_p95 = before['latency_ms']['p95']
+        new_p95 = result['latency_ms']['p95']
+        if new_p95 > old_p95 * threshold and \
+                new_p95 - old_p95 >= min_delta_ms:
+            regressions.append(
+                f'{label}: p95 {old_p95:.1f} -> {new_p95:.1f} мс')
+        if result['queries']['max'] > before['queries']['max']:
+            regressions.append(
+                f"{label}: запросов {before['queries']['max']} -> "
+                f"{result['queries']['max']}")
+    return regressions
@@ -0,0 +1,93 @@
+"""Вычисление значений кэша без «давки» (cache stampede).
+
+Когда горячий ключ (фрагмент главной ленты) истекает, все воркеры
+одновременно получают промах и одновременно пересчитывают значение.
+get_or_compute защищается от этого двумя способами:
+
+* ранний пересчет (XFetch): незадолго до истечения каждый читатель с
+  небольшой вероятностью — тем большей, чем ближе срок и чем дольше
+  вычисление, — решает обновить значение заранее, пока остальные
+  продолжают читать старое;
+* блокировка: пересчитывает только тот, кто занял ключ блокировки через
+  cache.add(); остальные отдают еще живое значение или недолго ждут
+  нового. С общим между процессами бэкендом (core/cache/sqlite.py)
+  блокировка действует на все воркеры.
+"""
+import math
+import random
+import time
+
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from core import metrics
+
+
+LOCK_SUFFIX = ':lock'
+
+_missing = object()
+
+
+def _store(cache, key, compute, timeout):
+    started = time.perf_counter()
+    value = compute()
+    delta = time.perf_counter() - started
+    if timeout is DEFAULT_TIMEOUT:
+        timeout = cache.default_timeout
+    expiry = None if timeout is None else time.time() + timeout
+    cache.set(key, (value, delta, expiry), timeout)
+    return value
+
+
+def _wait(cache, key, wait):
+    deadline = time.monotonic() + wait
+    pause = 0.005
+    while time.monotonic() < deadline:
+        time.sleep(pause)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+        pause = min(pause * 2, 0.1)
+    return _missing
+
+
+def get_or_compute(key, compute, timeout=DEFAULT_TIMEOUT, beta=1.0,
+                   lock_timeout=10, wait=2.0, cache=None, store=True):
+    """Значение key из кэша или результат compute(), сохраненный на
+    timeout секунд.
+
+    beta > 1 — пересчитывать раньше, beta < 1 — позже. Тот, кто не занял
+    блокировку при пустом кэше, ждет до wait секунд и затем считает сам,
+    чтобы запрос не завис из-за упавшего соседа. store=False — только
+    читать кэш: промах считается и никуда не сохраняется.
+    """
+    cache = cache or default_cache
+    entry = cache.get(key)
+    if entry is not None:
+        value, delta, expiry = entry
+        # -log(u) при u из (0, 1] — экспоненциальная добавка ко времени:
+        # значение «истекает» для этого читателя немного раньше срока.
+        early = -delta * beta * math.log(1 - random.random())
+        if expiry is None or time.time() + early < expiry:
+            metrics.inc('yatube_cache_compute_total', result='hit')
+            return value
+    if not store:
+        metrics.inc('yatube_cache_compute_total', result='computed')
+        return compute()
+    lock = key + LOCK_SUFFIX
+    if not cache.add(lock, 1, lock_timeout):
+        if entry is not None:
+            metrics.inc('yatube_cache_compute_total', result='stale')
+            return entry[0]
+        value = _wait(cache, key, wait)
+        if value is not _missing:
+            metrics.inc('yatube_cache_compute_total', result='waited')
+            return value
+        metrics.inc('yatube_cache_compute_total', result='computed')
+        return _store(cache, key, compute, timeout)
+    metrics.inc('yatube_cache_compute_total',
+                result='computed' if entry is None else 'early')
+    try:
+        return _store(cache, key, compute, timeout)
+    finally:
+        cache.delete(lock)
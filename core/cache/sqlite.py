@@ -0,0 +1,264 @@
+"""Кэш в файле SQLite, общий для всех процессов на машине.
+
+LocMemCache у каждого воркера свой: кэш холодный и дублируется, а
+сдвиг поколения в одном процессе (posts/feed_cache.py) не виден
+остальным. Этот бэкенд хранит записи в одном файле в режиме WAL:
+читатели не ждут писателя, а add() атомарен между процессами, поэтому
+годится для блокировок (core/cache/__init__.py).
+
+Вытеснение — LRU: время обращения обновляется при чтении (не чаще раза
+в TOUCH_INTERVAL секунд, чтобы чтение горячих ключей не превращалось в
+поток записей), а при превышении MAX_ENTRIES записей или MAX_SIZE байт
+удаляются просроченные и давно не читанные записи. Число записей и
+общий размер ведут триггеры, так что проверка лимитов — одно чтение.
+
+    CACHES = {'default': {
+        'BACKEND': 'core.cache.sqlite.SQLiteCache',
+        'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+        'OPTIONS': {'MAX_ENTRIES': 100000, 'MAX_SIZE': 256 * 1024 ** 2},
+    }}
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from core import metrics
+
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache_entries ('
+    ' key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL,'
+    ' accessed REAL NOT NULL, size INTEGER NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_entries_accessed '
+    'ON cache_entries (accessed)',
+    'CREATE TABLE IF NOT EXISTS cache_totals ('
+    ' id INTEGER PRIMARY KEY CHECK (id = 0),'
+    ' entries INTEGER NOT NULL, size INTEGER NOT NULL)',
+    'INSERT OR IGNORE INTO cache_totals VALUES (0, 0, 0)',
+    'CREATE TRIGGER IF NOT EXISTS cache_entries_insert '
+    'AFTER INSERT ON cache_entries BEGIN UPDATE cache_totals SET'
+    ' entries = entries + 1, size = size + NEW.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_entries_delete '
+    'AFTER DELETE ON cache_entries BEGIN UPDATE cache_totals SET'
+    ' entries = entries - 1, size = size - OLD.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_entries_update '
+    'AFTER UPDATE OF size ON cache_entries BEGIN UPDATE cache_totals SET'
+    ' size = size - OLD.size + NEW.size; END',
+)
+
+UPSERT = (
+    'INSERT INTO cache_entries (key, value, expires, accessed, size) '
+    'VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET'
+    ' value = excluded.value, expires = excluded.expires,'
+    ' accessed = excluded.accessed, size = excluded.size')
+
+# Ограничение SQLite на число параметров запроса.
+MAX_PARAMS = 900
+
+
+def _alive(expires, now):
+    return expires is None or expires > now
+
+
+class SQLiteCache(BaseCache):
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 64 * 1024 ** 2))
+        self._touch_interval = float(options.get('TOUCH_INTERVAL', 1))
+        self._busy_timeout = float(options.get('TIMEOUT', 20))
+        self._local = threading.local()
+
+    # Соединение — свое у каждого потока и процесса: после fork
+    # унаследованное соединение использовать нельзя.
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self._path, timeout=self._busy_timeout,
+                                   isolation_level=None)
+            conn.execute('PRAGMA journal_mode = wal')
+            conn.execute('PRAGMA synchronous = normal')
+            with self._transaction(conn):
+                for statement in SCHEMA:
+                    conn.execute(statement)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    @contextmanager
+    def _transaction(conn):
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _row(self, key, value, timeout, now):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        return (key, data, self.get_backend_timeout(timeout), now,
+                len(key) + len(data))
+
+    def _touch_read(self, conn, keys, now):
+        for start in range(0, len(keys), MAX_PARAMS):
+            chunk = keys[start:start + MAX_PARAMS]
+            conn.execute(
+                'UPDATE cache_entries SET accessed = ? WHERE accessed < ? '
+                'AND key IN ({})'.format(', '.join('?' * len(chunk))),
+                [now, now - self._touch_interval, *chunk])
+
+    def _cull(self, conn, now):
+        entries, size = conn.execute(
+            'SELECT entries, size FROM cache_totals').fetchone()
+        if entries <= self._max_entries and size <= self._max_size:
+            return
+        conn.execute('DELETE FROM cache_entries WHERE expires <= ?', (now,))
+        entries, size = conn.execute(
+            'SELECT entries, size FROM cache_totals').fetchone()
+        if entries <= self._max_entries and size <= self._max_size:
+            return
+        # Как в бэкендах Django: за раз освобождаем 1/CULL_FREQUENCY.
+        keep = 1 - 1 / self._cull_frequency if self._cull_frequency else 0
+        excess_entries = entries - int(self._max_entries * keep)
+        excess_size = size - int(self._max_size * keep)
+        victims = []
+        for key, entry_size in conn.execute(
+                'SELECT key, size FROM cache_entries ORDER BY accessed'):
+            if excess_entries <= 0 and excess_size <= 0:
+                break
+            victims.append(key)
+            excess_entries -= 1
+            excess_size -= entry_size
+        self._delete_keys(conn, victims)
+
+    @staticmethod
+    def _delete_keys(conn, keys):
+        deleted = 0
+        for start in range(0, len(keys), MAX_PARAMS):
+            chunk = keys[start:start + MAX_PARAMS]
+            deleted += conn.execute(
+                'DELETE FROM cache_entries WHERE key IN ({})'.format(
+                    ', '.join('?' * len(chunk))), chunk).rowcount
+        return deleted
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        conn = self._connection()
+        with self._transaction(conn):
+            # Занять ключ можно, только если его нет или он просрочен —
+            # одной инструкцией, поэтому атомарно между процессами.
+            added = conn.execute(
+                UPSERT + ' WHERE cache_entries.expires <= ?',
+                (*self._row(key, value, timeout, now), now)).rowcount
+            if added:
+                self._cull(conn, now)
+        return bool(added)
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._get_many([key]).get(key, default)
+
+    def _get_many(self, keys):
+        now = time.time()
+        conn = self._connection()
+        found = {}
+        for start in range(0, len(keys), MAX_PARAMS):
+            chunk = keys[start:start + MAX_PARAMS]
+            for key, data, expires in conn.execute(
+                    'SELECT key, value, expires FROM cache_entries '
+                    'WHERE key IN ({})'.format(', '.join('?' * len(chunk))),
+                    chunk):
+                if _alive(expires, now):
+                    found[key] = pickle.loads(data)
+        if found:
+            self._touch_read(conn, list(found), now)
+            metrics.inc('yatube_cache_gets_total', len(found), result='hit')
+        if len(found) < len(keys):
+            metrics.inc('yatube_cache_gets_total', len(keys) - len(found),
+                        result='miss')
+        return found
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        return {keys[key]: value
+                for key, value in self._get_many(list(keys)).items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        rows = [self._row(self._key(key, version), value, timeout, now)
+                for key, value in data.items()]
+        conn = self._connection()
+        with self._transaction(conn):
+            conn.executemany(UPSERT, rows)
+            self._cull(conn, now)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        return bool(self._connection().execute(
+            'UPDATE cache_entries SET expires = ?, accessed = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), now, key, now)).rowcount)
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        conn = self._connection()
+        with self._transaction(conn):
+            row = conn.execute(
+                'SELECT value, expires FROM cache_entries WHERE key = ?',
+                (key,)).fetchone()
+            if row is None or not _alive(row[1], now):
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            conn.execute(
+                'UPDATE cache_entries SET value = ?, size = ?, accessed = ? '
+                'WHERE key = ?', (data, len(key) + len(data), now, key))
+        return value
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection().execute(
+            'SELECT 1 FROM cache_entries WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time())).fetchone() is not None
+
+    def delete(self, key, version=None):
+        return bool(self.delete_many([key], version))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        conn = self._connection()
+        with self._transaction(conn):
+            return self._delete_keys(conn, keys)
+
+    def clear(self):
+        conn = self._connection()
+        with self._transaction(conn):
+            conn.execute('DELETE FROM cache_entries')
+
+    def stats(self):
+        """Число записей и их общий размер в байтах."""
+        entries, size = self._connection().execute(
+            'SELECT entries, size FROM cache_totals').fetchone()
+        return {'entries': entries, 'size': size}
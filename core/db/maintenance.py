@@ -0,0 +1,75 @@
+"""Регулярное обслуживание базы SQLite."""
+import time
+
+from django.db import connections
+
+
+def _pragma(cursor, name):
+    cursor.execute(f'PRAGMA {name}')
+    return cursor.fetchone()[0]
+
+
+def fts5_tables(cursor):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                   "AND sql LIKE '%USING fts5%'")
+    return [name for name, in cursor.fetchall()]
+
+
+def state(cursor):
+    page_size = _pragma(cursor, 'page_size')
+    return {
+        'journal_mode': _pragma(cursor, 'journal_mode'),
+        'auto_vacuum': _pragma(cursor, 'auto_vacuum'),
+        'size': _pragma(cursor, 'page_count') * page_size,
+        'free': _pragma(cursor, 'freelist_count') * page_size,
+    }
+
+
+def maintain(using='default', vacuum_pages=None, full_vacuum=False,
+             analyze=True):
+    """Обновляет статистику планировщика, возвращает свободные страницы
+    файлу и сжимает журнал WAL.
+
+    vacuum_pages — сколько свободных страниц отдать за раз (None — все);
+    full_vacuum — полный VACUUM, который заодно включает auto_vacuum,
+    заданный в PRAGMA соединения. Возвращает список (шаг, секунды) и
+    состояние базы до и после.
+    """
+    connection = connections[using]
+    steps = []
+
+    def step(name, sql):
+        started = time.perf_counter()
+        cursor.execute(sql)
+        cursor.fetchall()
+        steps.append((name, time.perf_counter() - started))
+
+    with connection.cursor() as cursor:
+        before = state(cursor)
+        if analyze:
+            step('analyze', 'ANALYZE')
+        step('optimize', 'PRAGMA optimize')
+        for table in fts5_tables(cursor):
+            step(f'fts5 optimize {table}',
+                 f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+        if full_vacuum:
+            step('vacuum', 'VACUUM')
+        elif before['auto_vacuum'] == 2:
+            pages = _pragma(cursor, 'freelist_count')
+            if vacuum_pages is not None:
+                pages = min(pages, vacuum_pages)
+            # Каждый шаг инструкции освобождает одну страницу. execute()
+            # модуля sqlite3 делает только первый шаг, а строк PRAGMA не
+            # возвращает, и fetchall() дальше не шагает; executescript()
+            # выполняет ее до конца одним вызовом. incremental_vacuum(0)
+            # отдал бы все страницы.
+            if pages:
+                started = time.perf_counter()
+                cursor.executescript(
+                    f'PRAGMA incremental_vacuum({int(pages)});')
+                steps.append(('incremental vacuum',
+                              time.perf_counter() - started))
+        if before['journal_mode'] == 'wal':
+            step('wal checkpoint', 'PRAGMA wal_checkpoint(TRUNCATE)')
+        after = state(cursor)
+    return steps, before, after
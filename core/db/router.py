@@ -0,0 +1,101 @@
+"""Чтение с реплик, запись в основную базу.
+
+Реплики — алиасы из DATABASE_REPLICAS. Читать с них разрешено только
+внутри запроса к представлению из REPLICA_READ_VIEWS (его включает
+ReplicaMiddleware); команды, сигналы и прочие представления читают из
+основной базы, где видны все записи. Одна реплика выбирается на весь
+запрос, чтобы страницы собирались из одного снимка.
+
+После записи пользователь REPLICA_STICKY_SECONDS читает из основной
+базы (cookie ставит ReplicaMiddleware), поэтому сразу видит свой пост
+или комментарий, даже если реплика отстает. Запись посреди запроса
+тоже переключает оставшиеся чтения на основную базу.
+
+Записью для cookie считается только выполненный INSERT, UPDATE или
+DELETE (record_writes), а не любой QuerySet с for_write: get_or_create,
+нашедший готовую строку на GET, ничего не меняет и не должен на
+REPLICA_STICKY_SECONDS отключать пользователю реплики.
+
+Поколения лент сдвигаются сразу при записи, а реплика может отставать:
+страница или фрагмент, собранные из нее, легли бы в кэш под новым
+поколением и отдавались бы устаревшими до следующей записи. Поэтому
+запрос, читавший с реплики (replica_used), кэш только читает.
+"""
+import random
+import re
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+# Данные, которые должны быть свежими всегда: сессия только что
+# вошедшего пользователя может еще не доехать до реплики.
+PRIMARY_APPS = ('sessions',)
+
+_state = threading.local()
+
+WRITE_RE = re.compile(r'\s*(?:INSERT|UPDATE|DELETE|REPLACE)\b', re.I)
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+def read_from_replica(alias=None):
+    """Разрешает чтение с реплики alias (None — выбрать случайную)
+    до вызова reset()."""
+    choices = replicas()
+    _state.replica = alias or (random.choice(choices) if choices else None)
+    _state.wrote = False
+    _state.used = False
+
+
+def reset():
+    """Возвращает поток к чтению из основной базы; True — была запись."""
+    wrote = getattr(_state, 'wrote', False)
+    _state.replica = None
+    _state.wrote = False
+    _state.used = False
+    return wrote
+
+
+def current_replica():
+    return getattr(_state, 'replica', None)
+
+
+def replica_used():
+    """Читал ли текущий запрос хоть что-то с реплики."""
+    return getattr(_state, 'used', False)
+
+
+def record_writes(execute, sql, params, many, context):
+    """execute_wrapper, отмечающий запрос к сайту как пишущий."""
+    if WRITE_RE.match(sql):
+        _state.wrote = True
+    return execute(sql, params, many, context)
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        replica = current_replica()
+        if replica is None:
+            return DEFAULT_DB_ALIAS
+        _state.used = True
+        return replica
+
+    def db_for_write(self, model, **hints):
+        # Дальше в этом запросе читаем то, что только что записали или
+        # собирались записать.
+        _state.replica = None
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы: связи между ними допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
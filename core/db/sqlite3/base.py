@@ -0,0 +1,35 @@
+"""SQLite с настройками для работы под нагрузкой.
+
+Отличия от django.db.backends.sqlite3:
+
+* PRAGMA из OPTIONS['pragmas'] выполняются на каждом новом соединении
+  (журнал WAL, synchronous, размеры кэша и mmap, busy_timeout);
+* транзакции atomic() открываются через BEGIN IMMEDIATE (или режим из
+  OPTIONS['transaction_mode']). Обычный BEGIN берет блокировку записи
+  только на первом INSERT/UPDATE, и если ее уже держит другое
+  соединение, SQLite сразу отвечает «database is locked», не дожидаясь
+  busy_timeout. Немедленная блокировка ждет своей очереди, а читателям
+  в режиме WAL она не мешает.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        options = self.settings_dict['OPTIONS']
+        for name, value in options.get('pragmas', {}).items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get(
+            'transaction_mode', 'IMMEDIATE')
+        self.cursor().execute(f'BEGIN {mode}')
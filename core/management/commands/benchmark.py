@@ -0,0 +1,91 @@
+import json
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from benchmarks.dataset import seed
+from benchmarks.runner import compare, run
+from core.test_runner import isolated_caches
+
+
+class Command(BaseCommand):
+    help = ('Наполняет временную базу синтетическими данными, прогоняет '
+            'все страницы и печатает отчет в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=3000)
+        parser.add_argument('--follows', type=int, default=10,
+                            help='Подписок у каждого пользователя')
+        parser.add_argument('--images', type=int, default=100,
+                            help='Постов с картинкой')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--cold-cache', action='store_true',
+                            help='Очищать кэш перед каждым запросом')
+        parser.add_argument('--output', help='Файл для JSON-отчета')
+        parser.add_argument('--compare', metavar='BASELINE',
+                            help='JSON прошлого прогона для сравнения')
+        parser.add_argument('--threshold', type=float, default=1.25)
+
+    def handle(self, *args, **options):
+        dataset = {key: options[key] for key in (
+            'users', 'groups', 'posts', 'comments', 'follows', 'images')}
+        media_root = tempfile.mkdtemp()
+        cache_dir = tempfile.mkdtemp(prefix='yatube-cache-')
+        # Тестовая база, свой кэш и DEBUG = False: данные бенчмарка не
+        # попадают в рабочую базу и общий кэш сервера (и --cold-cache не
+        # очищает его), а SQL-запросы не копятся в connection.queries.
+        # Письма админам о 500 из сценария error500 остаются в памяти.
+        with isolated_caches(cache_dir), override_settings(
+                DEBUG=False, MEDIA_ROOT=media_root,
+                POSTS_THUMBNAIL_WORKERS=0,
+                EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            runner = DiscoverRunner(verbosity=0, interactive=False)
+            old_config = runner.setup_databases()
+            try:
+                data = seed(**dataset)
+                report = run(data, options['iterations'],
+                             options['warmup'], options['cold_cache'],
+                             dataset)
+            finally:
+                runner.teardown_databases(old_config)
+                shutil.rmtree(media_root, ignore_errors=True)
+                shutil.rmtree(cache_dir, ignore_errors=True)
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(output + '\n')
+            self.write_table(report)
+        else:
+            self.stdout.write(output)
+
+        if report['meta']['uncovered_routes']:
+            self.stderr.write('Маршруты без сценария: ' + ', '.join(
+                report['meta']['uncovered_routes']))
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                regressions = compare(json.load(baseline_file), report,
+                                      options['threshold'])
+            if regressions:
+                raise CommandError(
+                    'Регрессии:\n' + '\n'.join(regressions))
+
+    def write_table(self, report):
+        self.stdout.write(f"{'страница':<22}{'клиент':<11}{'p50':>9}"
+                          f"{'p95':>9}{'p99':>9}{'SQL':>5}{'байт':>9}")
+        for result in report['results']:
+            latency = result['latency_ms']
+            self.stdout.write(
+                f"{result['name']:<22}{result['client']:<11}"
+                f"{latency['p50']:>9.2f}{latency['p95']:>9.2f}"
+                f"{latency['p99']:>9.2f}{result['queries']['max']:>5}"
+                f"{result['bytes']['p50']:>9}")
@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import QUERY_PARAM, make_token
+
+
+class Command(BaseCommand):
+    help = ('Печатает подписанный флаг ?_profile=: запросы с ним '
+            'профилируются (core/profiling.py)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user',
+                            help='Флаг действует только для этого '
+                                 'пользователя')
+        parser.add_argument('--memory', action='store_true',
+                            help='Отслеживать выделения памяти')
+
+    def handle(self, *args, **options):
+        user_id = None
+        if options['user']:
+            user = get_user_model().objects.filter(
+                username=options['user']).first()
+            if user is None:
+                raise CommandError(
+                    f'Пользователь {options["user"]} не найден')
+            user_id = user.pk
+        token = make_token(user_id, options['memory'])
+        self.stdout.write(f'?{QUERY_PARAM}={token}')
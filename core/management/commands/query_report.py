@@ -0,0 +1,51 @@
+import shutil
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import querylog
+
+
+SORT_KEYS = ('total', 'count', 'p95', 'per_request')
+
+
+class Command(BaseCommand):
+    help = ('Самые дорогие SQL-запросы по отпечаткам из сводки всех '
+            'процессов (QUERY_LOG_DIR)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument('--sort', choices=SORT_KEYS, default='total',
+                            help='per_request — выполнений на запрос к '
+                                 'представлению, выдает N+1')
+        parser.add_argument('--view', help='Только это имя URL')
+        parser.add_argument('--width', type=int, default=120,
+                            help='Обрезать SQL до N символов, 0 — целиком')
+        parser.add_argument('--reset', action='store_true',
+                            help='Удалить накопленную сводку')
+
+    def handle(self, *args, **options):
+        directory = getattr(settings, 'QUERY_LOG_DIR', None)
+        if not directory:
+            raise CommandError('QUERY_LOG_DIR не задан')
+        if options['reset']:
+            shutil.rmtree(directory, ignore_errors=True)
+            self.stdout.write('Сводка удалена')
+            return
+        snapshots = querylog.load(directory)
+        if not snapshots:
+            raise CommandError(f'В {directory} нет сводки')
+        rows = querylog.report(snapshots, options['top'], options['sort'],
+                               options['view'])
+        self.stdout.write('{:>10} {:>7} {:>8} {:>8} {:>8}  {:<16} {:<12} {}'
+                          .format('total ms', 'count', 'per req', 'p95 ms',
+                                  'max ms', 'view', 'id', 'sql'))
+        for row in rows:
+            sql = row['sql']
+            if options['width'] and len(sql) > options['width']:
+                sql = sql[:options['width'] - 1] + '…'
+            self.stdout.write(
+                '{:>10.1f} {:>7} {:>8.1f} {:>8.2f} {:>8.2f}  {:<16} {:<12} {}'
+                .format(row['total'] * 1000, row['count'],
+                        row['per_request'], row['p95'] * 1000,
+                        row['max'] * 1000, row['view'], row['id'], sql))
@@ -0,0 +1,71 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from benchmarks.dataset import BATCH_SIZE, EPOCH, seed
+
+
+def date(value):
+    return datetime.datetime.combine(
+        datetime.date.fromisoformat(value), datetime.time(),
+        datetime.timezone.utc)
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу детерминированными синтетическими данными '
+            'пачками bulk_create')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=300000,
+                            help='Примерное общее число комментариев')
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Среднее число подписок у пользователя')
+        parser.add_argument('--images', type=int, default=0,
+                            help='Постов с крошечной картинкой')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней разбросаны посты')
+        parser.add_argument('--until', type=date, default=EPOCH,
+                            help='Дата последних постов, ГГГГ-ММ-ДД; по '
+                                 'умолчанию фиксированная, чтобы данные '
+                                 'не зависели от дня запуска')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Зерно генератора случайных чисел')
+        parser.add_argument('--prefix', default='user',
+                            help='Префикс имен пользователей и slug групп')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    # При DEBUG каждый запрос вместе с параметрами bulk_create копится в
+    # connection.queries, и память растет с объемом данных.
+    @override_settings(DEBUG=False)
+    def handle(self, *args, **options):
+        self.started = time.monotonic()
+        self.phase = None
+        data = seed(
+            users=options['users'], groups=options['groups'],
+            posts=options['posts'], comments=options['comments'],
+            follows=options['follows'], images=options['images'],
+            days=options['days'], prefix=options['prefix'],
+            random_seed=options['seed'], until=options['until'],
+            batch_size=options['batch_size'],
+            progress=self.progress)
+        self.stdout.write('')
+        self.stdout.write(
+            f"Готово за {time.monotonic() - self.started:.0f} с: "
+            f"пользователей {len(data['users'])}, "
+            f"групп {len(data['groups'])}, постов {len(data['posts'])}")
+
+    def progress(self, phase, done, total):
+        # Одна обновляемая строка на этап: \r возвращает каретку.
+        if phase != self.phase:
+            if self.phase is not None:
+                self.stdout.write('')
+            self.phase = phase
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(f'\r{phase:<10} {done:>10} / ~{total:<10} '
+                          f'{elapsed:7.1f} с', ending='')
+        self.stdout.flush()
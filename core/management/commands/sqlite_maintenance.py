@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.db.maintenance import maintain
+
+
+class Command(BaseCommand):
+    help = ('Обслуживание SQLite: ANALYZE, PRAGMA optimize, оптимизация '
+            'индексов FTS5, incremental vacuum и сжатие WAL. Запускается '
+            'по расписанию (cron) или сама с --interval')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--vacuum-pages', type=int,
+                            help='Сколько свободных страниц вернуть за '
+                                 'раз; по умолчанию все')
+        parser.add_argument('--full-vacuum', action='store_true',
+                            help='Полный VACUUM: блокирует базу, но '
+                                 'включает incremental auto_vacuum')
+        parser.add_argument('--no-analyze', action='store_true',
+                            help='Только PRAGMA optimize без ANALYZE')
+        parser.add_argument('--interval', type=int,
+                            help='Повторять каждые N секунд')
+
+    def handle(self, *args, **options):
+        if connections[options['database']].vendor != 'sqlite':
+            raise CommandError('Команда обслуживает только SQLite')
+        while True:
+            self.run_once(options)
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def run_once(self, options):
+        steps, before, after = maintain(
+            options['database'], options['vacuum_pages'],
+            options['full_vacuum'], not options['no_analyze'])
+        for name, seconds in steps:
+            self.stdout.write(f'{name:<40} {seconds * 1000:>10.1f} мс')
+        if after['auto_vacuum'] != 2:
+            self.stderr.write('auto_vacuum не incremental: свободные '
+                              'страницы вернет только --full-vacuum')
+        self.stdout.write(
+            f"размер {before['size'] / 1024 ** 2:.1f} -> "
+            f"{after['size'] / 1024 ** 2:.1f} МиБ, свободно "
+            f"{before['free'] / 1024 ** 2:.1f} -> "
+            f"{after['free'] / 1024 ** 2:.1f} МиБ")
@@ -0,0 +1,43 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.db.router import replicas
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик из '
+            'DATABASE_REPLICAS онлайн-бэкапом — замена репликации для '
+            'проверки маршрутизации на одной машине')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help='Повторять каждые N секунд')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('Команда копирует только базы SQLite')
+        if not replicas():
+            raise CommandError('DATABASE_REPLICAS пуст')
+        while True:
+            self.sync(primary)
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def sync(self, primary):
+        primary.ensure_connection()
+        for alias in replicas():
+            started = time.perf_counter()
+            # Бэкап идет постранично под блокировкой копии: читатели
+            # реплики видят либо старый, либо новый снимок целиком.
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'{alias}: {elapsed * 1000:.0f} мс')
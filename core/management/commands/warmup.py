@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = ('Прогрев перед приемом трафика: импорты, шаблоны, маршруты '
+            'и кэши первых страниц лент')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int,
+                            default=getattr(settings, 'WARMUP_PAGES', 3),
+                            help='Сколько страниц главной и групп '
+                                 'запросить, 0 — не прогревать кэши')
+
+    def handle(self, *args, **options):
+        steps = warm_up(options['pages'])
+        self.stdout.write('{:>10}  {:<28} {}'.format('ms', 'step', ''))
+        for name, seconds, detail in steps:
+            self.stdout.write('{:>10.1f}  {:<28} {}'.format(
+                seconds * 1000, name, detail))
+        self.stdout.write('{:>10.1f}  {}'.format(
+            sum(seconds for _, seconds, _ in steps) * 1000, 'total'))
@@ -0,0 +1,214 @@
+"""Метрики в формате Prometheus.
+
+Счетчики и гистограммы живут в памяти процесса, у каждого потока свой
+шард: поток меняет только свой словарь, поэтому запись обходится без
+блокировок, а чтение складывает копии шардов. Блокировка берется один
+раз — когда поток впервые что-то записывает. Шарды завершившихся
+потоков при этом и при чтении сливаются в общий итог, так что их число
+не растет вместе с числом когда-либо живших потоков.
+
+Чтобы /metrics показывал все воркеры, а не тот, что принял запрос,
+каждый процесс не чаще раза в METRICS_FLUSH_INTERVAL секунд сбрасывает
+свой снимок в METRICS_DIR (файл <pid>.json), и эндпоинт суммирует
+снимки всех процессов. Файлы завершившихся воркеров остаются: иначе
+счетчики уменьшались бы после перезапуска.
+"""
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+COUNTERS = {
+    'yatube_sql_queries_total': 'SQL-запросы по представлениям',
+    'yatube_sql_seconds_total': 'Время SQL по представлениям',
+    'yatube_cache_gets_total': 'Чтения кэша: hit или miss',
+    'yatube_page_cache_total': 'Кэш страниц для анонимов: hit или miss',
+    'yatube_cache_compute_total':
+        'get_or_compute: hit, early, computed, stale или waited',
+}
+
+HISTOGRAMS = {
+    'yatube_http_request_seconds':
+        'Время ответа по имени URL и коду ответа',
+    'yatube_template_render_seconds': 'Время рендеринга шаблонов',
+    'yatube_thumbnail_seconds':
+        'Время подготовки миниатюр и вариантов картинки',
+}
+
+
+def _key(name, labels):
+    return name, tuple(sorted((key, str(value))
+                              for key, value in labels.items()))
+
+
+class Registry:
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._retired = {'counters': {}, 'histograms': {}}
+        self._flushed = 0
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {'counters': {}, 'histograms': {}}
+            with self._lock:
+                self._retire()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _retire(self):
+        # Вызывается под блокировкой. Завершившийся поток в шард уже не
+        # пишет, поэтому его можно сложить в итог без копирования.
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                merge(self._retired, shard)
+        self._shards = alive
+
+    def inc(self, name, value=1, **labels):
+        counters = self._shard()['counters']
+        key = _key(name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        histograms = self._shard()['histograms']
+        key = _key(name, labels)
+        series = histograms.get(key)
+        if series is None:
+            # Счетчики корзин, затем сумма и число наблюдений.
+            series = histograms[key] = [0] * (len(DEFAULT_BUCKETS) + 2)
+        for index, bound in enumerate(DEFAULT_BUCKETS):
+            if value <= bound:
+                series[index] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def snapshot(self):
+        """Сумма шардов всех потоков процесса."""
+        total = {'counters': {}, 'histograms': {}}
+        with self._lock:
+            self._retire()
+            merge(total, self._retired)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            # copy() словаря атомарна под GIL; гистограммы при сложении
+            # копируются в новые списки.
+            merge(total, {kind: shard[kind].copy() for kind in total})
+        return total
+
+    def reset(self):
+        with self._lock:
+            for shard in [self._retired, *(s for _, s in self._shards)]:
+                shard['counters'].clear()
+                shard['histograms'].clear()
+
+    def flush(self, force=False):
+        """Сбрасывает снимок процесса в METRICS_DIR."""
+        directory = getattr(settings, 'METRICS_DIR', None)
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+        now = time.monotonic()
+        if not directory or not force and now - self._flushed < interval:
+            return
+        self._flushed = now
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as file:
+            json.dump(_dump(self.snapshot()), file)
+        os.replace(path + '.tmp', path)
+
+
+def merge(total, snapshot):
+    for key, value in snapshot['counters'].items():
+        total['counters'][key] = total['counters'].get(key, 0) + value
+    for key, series in snapshot['histograms'].items():
+        current = total['histograms'].setdefault(key, [0] * len(series))
+        for index, value in enumerate(series):
+            current[index] += value
+    return total
+
+
+def _dump(snapshot):
+    return {kind: [[name, labels, value]
+                   for (name, labels), value in series.items()]
+            for kind, series in snapshot.items()}
+
+
+def _load(data):
+    return {kind: {(name, tuple(map(tuple, labels))): value
+                   for name, labels, value in data.get(kind, ())}
+            for kind in ('counters', 'histograms')}
+
+
+def collect():
+    """Метрики всех процессов из METRICS_DIR или только текущего."""
+    registry.flush(force=True)
+    directory = getattr(settings, 'METRICS_DIR', None)
+    if not directory:
+        return registry.snapshot()
+    total = {'counters': {}, 'histograms': {}}
+    for entry in os.scandir(directory):
+        if not entry.name.endswith('.json'):
+            continue
+        try:
+            with open(entry.path) as file:
+                merge(total, _load(json.load(file)))
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+def _labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"')
+               .replace('\n', r'\n') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value
+                          in zip(pairs, escaped)) + '}'
+
+
+def _number(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render(snapshot):
+    """Текстовый формат экспозиции Prometheus 0.0.4."""
+    lines = []
+    for name, help_text in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for (metric, labels), value in sorted(snapshot['counters'].items()):
+            if metric == name:
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+    for name, help_text in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for (metric, labels), series in sorted(
+                snapshot['histograms'].items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(DEFAULT_BUCKETS, series):
+                cumulative += count
+                lines.append('{}_bucket{} {}'.format(
+                    name, _labels(labels, [('le', _number(float(bound)))]),
+                    cumulative))
+            lines.append('{}_bucket{} {}'.format(
+                name, _labels(labels, [('le', '+Inf')]), series[-1]))
+            lines.append(f'{name}_sum{_labels(labels)} {series[-2]!r}')
+            lines.append(f'{name}_count{_labels(labels)} {series[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+inc = registry.inc
+observe = registry.observe
@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from . import metrics, profiling, querylog
+from .db import router
+from .queries import QueryRecorder, wrap_all_connections
+
+
+logger = logging.getLogger('yatube.queries')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class ViewQueryStats:
+    """Накопленные по имени URL количество запросов и время SQL."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, url_name, count, duration):
+        with self._lock:
+            stat = self._stats.setdefault(
+                url_name, {'requests': 0, 'queries': 0, 'sql_time': 0.0,
+                           'max_queries': 0})
+            stat['requests'] += 1
+            stat['queries'] += count
+            stat['sql_time'] += duration
+            stat['max_queries'] = max(stat['max_queries'], count)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(stat) for name, stat in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+view_query_stats = ViewQueryStats()
+
+
+def get_url_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return match.view_name
+
+
+def check_query_budget(url_name, count):
+    """Сравнивает число запросов с QUERY_BUDGETS[url_name].
+
+    QUERY_BUDGET_ACTION = 'raise' превращает превышение в исключение
+    (удобно в тестах), иначе оно пишется в лог.
+    """
+    budget = getattr(settings, 'QUERY_BUDGETS', {}).get(url_name)
+    if budget is None or count <= budget:
+        return
+    message = f'{url_name}: {count} SQL queries, budget is {budget}'
+    if getattr(settings, 'QUERY_BUDGET_ACTION', 'log') == 'raise':
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+class MetricsMiddleware:
+    """Время ответа по имени URL и коду ответа (core/metrics.py)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        metrics.observe('yatube_http_request_seconds',
+                        time.perf_counter() - started,
+                        view=get_url_name(request) or 'unmatched',
+                        status=response.status_code)
+        metrics.registry.flush()
+        return response
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with wrap_all_connections(recorder):
+            response = self.get_response(request)
+        url_name = get_url_name(request)
+        if url_name is not None:
+            view_query_stats.record(url_name, recorder.count,
+                                    recorder.duration)
+            metrics.inc('yatube_sql_queries_total', recorder.count,
+                        view=url_name)
+            metrics.inc('yatube_sql_seconds_total', recorder.duration,
+                        view=url_name)
+            check_query_budget(url_name, recorder.count)
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(recorder.count)
+            response['X-Query-Time'] = f'{recorder.duration * 1000:.1f}ms'
+        return response
+
+
+class QueryLogMiddleware:
+    """Сводка SQL по отпечаткам для manage.py query_report и журнал
+    медленных запросов (core/querylog.py)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        statements = querylog.RequestQueries(request)
+        with wrap_all_connections(statements):
+            response = self.get_response(request)
+        querylog.query_log.record(get_url_name(request) or 'unmatched',
+                                  statements.statements)
+        querylog.query_log.flush()
+        return response
+
+
+class ProfilingMiddleware:
+    """Выполняет отдельные запросы под профилировщиком
+    (core/profiling.py); остальные проходят без накладных расходов."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        memory = profiling.trigger(request)
+        if memory is None:
+            return self.get_response(request)
+        return profiling.profile(request, self.get_response, memory)
+
+
+STICKY_COOKIE = 'primary_until'
+
+
+class ReplicaMiddleware:
+    """Включает чтение с реплики для представлений REPLICA_READ_VIEWS,
+    если пользователь недавно ничего не записывал (core/db/router.py)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Сессия сохраняется уже после этого middleware: ее запись не
+        # должна перейти в следующий запрос потока.
+        router.reset()
+        try:
+            with wrap_all_connections(router.record_writes):
+                response = self.get_response(request)
+        finally:
+            wrote = router.reset()
+        if wrote and router.replicas():
+            sticky = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+            response.set_cookie(STICKY_COOKIE, str(int(time.time() + sticky)),
+                                max_age=sticky, httponly=True)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = get_url_name(request)
+        if url_name in getattr(settings, 'REPLICA_READ_VIEWS', ()) and \
+                not self.is_sticky(request) and router.replicas():
+            router.read_from_replica()
+
+    @staticmethod
+    def is_sticky(request):
+        try:
+            return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
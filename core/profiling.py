@@ -0,0 +1,175 @@
+"""Профилирование отдельных живых запросов.
+
+Запрос профилируется, если:
+
+* его прислал сотрудник с заголовком X-Profile (X-Profile: memory —
+  вместе с tracemalloc);
+* в нем есть подписанный флаг ?_profile=<токен> (manage.py
+  profile_token): такую ссылку можно отдать пользователю, у которого
+  страница тормозит, — токен можно привязать к нему;
+* он попал в случайную выборку PROFILING_SAMPLE_RATE среди
+  PROFILING_VIEWS.
+
+Такой запрос выполняется под cProfile, а в PROFILING_DIR пишутся
+<имя>.prof (pstats), <имя>.sql.txt с выполненными запросами и, при
+отслеживании памяти, <имя>.alloc.txt и снимок <имя>.tracemalloc.
+В каталоге хранятся последние PROFILING_KEEP профилей. Остальные
+запросы платят только за чтение заголовка и параметра и random().
+"""
+import cProfile
+import os
+import random
+import threading
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core import signing
+from django.urls import Resolver404, resolve
+
+from .queries import wrap_all_connections
+
+
+HEADER = 'HTTP_X_PROFILE'
+QUERY_PARAM = '_profile'
+TOKEN_SALT = 'core.profiling'
+SUFFIXES = ('.prof', '.sql.txt', '.alloc.txt', '.tracemalloc')
+
+# cProfile и tracemalloc не рассчитаны на несколько профилей сразу:
+# пока один запрос профилируется, остальные идут как обычно.
+_busy = threading.Lock()
+
+
+def make_token(user_id=None, memory=False):
+    """Подписанное значение флага ?_profile=; user_id — только для него."""
+    return signing.dumps({'user': user_id, 'memory': memory},
+                         salt=TOKEN_SALT)
+
+
+def _url_name(request):
+    try:
+        return resolve(request.path_info).url_name
+    except Resolver404:
+        return None
+
+
+def trigger(request):
+    """None — не профилировать, иначе True/False: следить ли за памятью."""
+    header = request.META.get(HEADER)
+    if header is not None and request.user.is_staff:
+        return header.lower() == 'memory'
+    token = request.GET.get(QUERY_PARAM)
+    if token:
+        try:
+            data = signing.loads(
+                token, salt=TOKEN_SALT,
+                max_age=getattr(settings, 'PROFILING_TOKEN_MAX_AGE', 86400))
+        except signing.BadSignature:
+            return None
+        if data['user'] in (None, request.user.pk):
+            return data['memory']
+        return None
+    rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+    if rate and random.random() < rate:
+        views = getattr(settings, 'PROFILING_VIEWS', ())
+        if not views or _url_name(request) in views:
+            return getattr(settings, 'PROFILING_SAMPLE_MEMORY', False)
+    return None
+
+
+class TimedStatementLog:
+    """execute_wrapper, запоминающий SQL, параметры и время запросов."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.statements.append(
+                (time.perf_counter() - started, sql, params))
+
+
+def _write_sql(path, request, elapsed, log):
+    total = sum(duration for duration, _, _ in log.statements)
+    with open(path, 'w') as file:
+        file.write(f'{request.method} {request.get_full_path()}\n'
+                   f'request {elapsed * 1000:.1f} ms, '
+                   f'{len(log.statements)} queries, '
+                   f'SQL {total * 1000:.1f} ms\n\n')
+        for duration, sql, params in log.statements:
+            file.write(f'{duration * 1000:.2f} ms\n{sql}\n{params!r}\n\n')
+
+
+def _write_allocations(base, snapshot, limit=50):
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ])
+    snapshot.dump(base + '.tracemalloc')
+    stats = snapshot.statistics('lineno')
+    with open(base + '.alloc.txt', 'w') as file:
+        file.write(f'{sum(stat.size for stat in stats) / 1024:.1f} KiB '
+                   f'in {sum(stat.count for stat in stats)} blocks\n\n')
+        for stat in stats[:limit]:
+            file.write(f'{stat}\n')
+
+
+def rotate(directory, keep):
+    """Оставляет в каталоге keep последних профилей."""
+    bases = {}
+    for entry in os.scandir(directory):
+        for suffix in SUFFIXES:
+            if entry.name.endswith(suffix):
+                base = entry.name[:-len(suffix)]
+                bases.setdefault(base, []).append(entry.path)
+                break
+    for base in sorted(bases)[:-keep or None]:
+        for path in bases[base]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def profile(request, get_response, memory=False):
+    """Выполняет запрос под профилировщиком и сохраняет результаты."""
+    if not _busy.acquire(blocking=False):
+        return get_response(request)
+    started_tracing = memory and not tracemalloc.is_tracing()
+    try:
+        if started_tracing:
+            tracemalloc.start(getattr(settings, 'PROFILING_TRACEBACK', 10))
+        log = TimedStatementLog()
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        with wrap_all_connections(log):
+            profiler.enable()
+            try:
+                response = get_response(request)
+            finally:
+                profiler.disable()
+        elapsed = time.perf_counter() - started
+        snapshot = tracemalloc.take_snapshot() if memory else None
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        _busy.release()
+
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    # Имена сортируются по времени: по ним же работает ротация.
+    now = time.time_ns()
+    name = '{}-{:09d}-{}-{}'.format(
+        time.strftime('%Y%m%d-%H%M%S', time.localtime(now // 10 ** 9)),
+        now % 10 ** 9, _url_name(request) or 'unmatched', os.getpid())
+    base = os.path.join(directory, name)
+    profiler.dump_stats(base + '.prof')
+    _write_sql(base + '.sql.txt', request, elapsed, log)
+    if snapshot is not None:
+        _write_allocations(base, snapshot)
+    rotate(directory, getattr(settings, 'PROFILING_KEEP', 50))
+    response['X-Profile-Id'] = name
+    return response
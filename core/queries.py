@@ -0,0 +1,64 @@
+import contextlib
+import re
+import time
+
+from django.db import connections
+
+
+class QueryRecorder:
+    """execute_wrapper, считающий запросы и время SQL."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+@contextlib.contextmanager
+def wrap_all_connections(wrapper):
+    """Подключает wrapper ко всем настроенным базам данных."""
+    with contextlib.ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(wrapper))
+        yield wrapper
+
+
+class StatementLog:
+    """execute_wrapper, запоминающий SQL и параметры запросов."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+# Строки EXPLAIN QUERY PLAN в SQLite: «SCAN posts_post» (в старых версиях
+# «SCAN TABLE posts_post») без USING INDEX — полный просмотр таблицы.
+# subquery — псевдоним, под которым Django оборачивает запрос для
+# COUNT(*); план самого подзапроса проверяется отдельными строками.
+FULL_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(?!subquery$)\w+$')
+TEMP_SORT_RE = re.compile(r'USE TEMP B-TREE FOR (?:RIGHT PART OF |LAST )?'
+                          r'(?:TERM OF )?ORDER BY')
+
+
+def explain_query_plan(sql, params=None, using='default'):
+    """Строки плана запроса SQLite (столбец detail)."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_problems(plan):
+    """Строки плана с полным просмотром таблицы или сортировкой во
+    временном B-дереве."""
+    return [line for line in plan
+            if FULL_SCAN_RE.match(line) or TEMP_SORT_RE.search(line)]
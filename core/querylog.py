@@ -0,0 +1,204 @@
+"""Сводка SQL по отпечаткам запросов и журнал медленных запросов.
+
+Отпечаток — текст запроса без значений: параметры и числа заменены на
+?, списки IN (?, ?, ...) свернуты в IN (...). Запросы, которые
+отличаются только значениями (ленивый post.author в цикле шаблона),
+складываются в одну строку сводки с числом выполнений, общим временем,
+p95 и числом выполнений на запрос к представлению — N+1 сразу видно по
+последнему.
+
+Сводка копится в памяти процесса и, если задан QUERY_LOG_DIR, не чаще
+раза в QUERY_LOG_FLUSH_INTERVAL секунд сбрасывается туда (файл
+<pid>.json); manage.py query_report складывает файлы всех процессов.
+Запросы дольше SLOW_QUERY_THRESHOLD секунд сразу пишутся в лог
+yatube.slow_queries с параметрами и фрагментом стека из кода проекта.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from collections import deque
+
+from django.conf import settings
+
+
+logger = logging.getLogger('yatube.slow_queries')
+
+# Сколько последних длительностей хранить для p95 по каждой строке.
+SAMPLES = 200
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+PARAM_RE = re.compile(r'%s|\?')
+IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+SPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = PARAM_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('(...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint_id(text):
+    return hashlib.md5(text.encode()).hexdigest()[:12]
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1,
+                       int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+def stack_snippet(limit=5):
+    """Последние кадры стека из кода проекта, без Django и библиотек."""
+    base = str(settings.BASE_DIR)
+    frames = [frame for frame in traceback.extract_stack()[:-2]
+              if frame.filename.startswith(base)
+              and 'site-packages' not in frame.filename
+              and not frame.filename.endswith(os.path.join('core',
+                                                           'querylog.py'))]
+    return ''.join(traceback.format_list(frames[-limit:]))
+
+
+class QueryLog:
+    """Сводка по (отпечаток, представление) и число запросов к каждому
+    представлению."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queries = {}
+        self._requests = {}
+        self._flushed = 0
+
+    def record(self, view, statements):
+        with self._lock:
+            self._requests[view] = self._requests.get(view, 0) + 1
+            for text, duration in statements:
+                stat = self._queries.get((text, view))
+                if stat is None:
+                    stat = self._queries[text, view] = {
+                        'count': 0, 'total': 0.0, 'max': 0.0,
+                        'samples': deque(maxlen=SAMPLES)}
+                stat['count'] += 1
+                stat['total'] += duration
+                stat['max'] = max(stat['max'], duration)
+                stat['samples'].append(duration)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': dict(self._requests),
+                'queries': [[text, view, stat['count'], stat['total'],
+                             stat['max'], list(stat['samples'])]
+                            for (text, view), stat in self._queries.items()],
+            }
+
+    def reset(self):
+        with self._lock:
+            self._queries.clear()
+            self._requests.clear()
+
+    def flush(self, force=False):
+        directory = getattr(settings, 'QUERY_LOG_DIR', None)
+        interval = getattr(settings, 'QUERY_LOG_FLUSH_INTERVAL', 5)
+        now = time.monotonic()
+        if not directory or not force and now - self._flushed < interval:
+            return
+        self._flushed = now
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as file:
+            json.dump(self.snapshot(), file)
+        os.replace(path + '.tmp', path)
+
+
+query_log = QueryLog()
+
+
+class RequestQueries:
+    """execute_wrapper одного запроса к сайту: копит отпечатки и пишет
+    в лог медленные запросы."""
+
+    def __init__(self, request):
+        self.request = request
+        self.statements = []
+        self.threshold = getattr(settings, 'SLOW_QUERY_THRESHOLD', 0.1)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            text = fingerprint(sql)
+            self.statements.append((text, duration))
+            if duration >= self.threshold:
+                match = getattr(self.request, 'resolver_match', None)
+                logger.warning(
+                    'Slow query %.1f ms in %s [%s]\n%s\nparams: %r\n%s',
+                    duration * 1000, match.view_name if match else '-',
+                    fingerprint_id(text), sql, params, stack_snippet())
+
+
+def merge(snapshots):
+    """Сводка нескольких процессов: (requests, {(отпечаток, вид): stat})."""
+    requests = {}
+    queries = {}
+    for snapshot in snapshots:
+        for view, count in snapshot['requests'].items():
+            requests[view] = requests.get(view, 0) + count
+        for text, view, count, total, longest, samples in \
+                snapshot['queries']:
+            stat = queries.setdefault((text, view), {
+                'count': 0, 'total': 0.0, 'max': 0.0, 'samples': []})
+            stat['count'] += count
+            stat['total'] += total
+            stat['max'] = max(stat['max'], longest)
+            stat['samples'].extend(samples)
+    return requests, queries
+
+
+def load(directory):
+    snapshots = []
+    if not os.path.isdir(directory):
+        return snapshots
+    for entry in os.scandir(directory):
+        if entry.name.endswith('.json'):
+            try:
+                with open(entry.path) as file:
+                    snapshots.append(json.load(file))
+            except (OSError, ValueError):
+                continue
+    return snapshots
+
+
+def report(snapshots, top=20, sort='total', view=None):
+    """Строки отчета, отсортированные по sort: total, count, p95 или
+    per_request."""
+    requests, queries = merge(snapshots)
+    rows = []
+    for (text, query_view), stat in queries.items():
+        if view is not None and query_view != view:
+            continue
+        rows.append({
+            'id': fingerprint_id(text),
+            'view': query_view,
+            'count': stat['count'],
+            'total': stat['total'],
+            'p95': percentile(stat['samples'], 95),
+            'max': stat['max'],
+            'per_request': stat['count'] / max(requests.get(query_view, 0),
+                                               1),
+            'sql': text,
+        })
+    rows.sort(key=lambda row: row[sort], reverse=True)
+    return rows[:top]
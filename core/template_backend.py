@@ -0,0 +1,29 @@
+"""Шаблоны Django с замером времени рендеринга (core/metrics.py)."""
+import time
+
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import metrics
+
+
+class InstrumentedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.observe('yatube_template_render_seconds',
+                            time.perf_counter() - started,
+                            template=self.template.name or 'string')
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(
+            self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
@@ -0,0 +1,47 @@
+from django import template
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags.cache import CacheNode
+
+from core.cache import get_or_compute
+from core.db import router
+
+register = template.Library()
+
+
+class ComputeCacheNode(CacheNode):
+    """{% cache %}, который пересчитывает фрагмент через get_or_compute:
+    истекший горячий фрагмент рендерит один воркер, а не все сразу.
+    Фрагмент, собранный из реплики, не сохраняется (core/db/router.py)."""
+
+    def render(self, context):
+        try:
+            expire_time = self.expire_time_var.resolve(context)
+            vary_on = [var.resolve(context) for var in self.vary_on]
+        except template.VariableDoesNotExist as error:
+            raise template.TemplateSyntaxError(
+                f'"computecache" tag got an unknown variable: {error}')
+        if expire_time is not None:
+            expire_time = int(expire_time)
+        try:
+            fragment_cache = caches['template_fragments']
+        except InvalidCacheBackendError:
+            fragment_cache = caches['default']
+        return get_or_compute(
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context), expire_time,
+            cache=fragment_cache, store=not router.replica_used())
+
+
+@register.tag('computecache')
+def do_compute_cache(parser, token):
+    """{% computecache [expire_time] [fragment_name] [var1] .. %}"""
+    nodelist = parser.parse(('endcomputecache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]!r} tag requires at least 2 arguments.')
+    return ComputeCacheNode(
+        nodelist, parser.compile_filter(tokens[1]), tokens[2],
+        [parser.compile_filter(t) for t in tokens[3:]], None)
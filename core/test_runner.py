@@ -0,0 +1,37 @@
+"""Тесты с отдельным кэшем.
+
+Общий кэш (core/cache/sqlite.py) — файл в корне проекта, а тесты
+очищают кэш перед каждым тестом и стерли бы кэш запущенного сервера.
+На время тестов файлы кэша переносятся во временный каталог.
+"""
+import copy
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner as BaseDiscoverRunner
+from django.test.utils import override_settings
+
+
+def isolated_caches(directory):
+    """override_settings с файлами SQLite-кэшей внутри directory."""
+    caches = copy.deepcopy(settings.CACHES)
+    for alias, options in caches.items():
+        if options['BACKEND'] == 'core.cache.sqlite.SQLiteCache':
+            options['LOCATION'] = os.path.join(directory, f'{alias}.sqlite3')
+    return override_settings(CACHES=caches)
+
+
+class DiscoverRunner(BaseDiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_dir = tempfile.mkdtemp(prefix='yatube-cache-')
+        self._caches = isolated_caches(self._cache_dir)
+        self._caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._caches.disable()
+        shutil.rmtree(self._cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
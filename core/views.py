@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+from . import metrics
+
+
+def metrics_view(request):
+    """Метрики всех воркеров в текстовом формате Prometheus; доступны
+    с адресов METRICS_ALLOWED_IPS и сотрудникам."""
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', ())
+    if request.META.get('REMOTE_ADDR') not in allowed and \
+            not request.user.is_staff:
+        raise Http404
+    return HttpResponse(metrics.render(metrics.collect()),
+                        content_type='text/plain; version=0.0.4')
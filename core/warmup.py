@@ -0,0 +1,178 @@
+"""Прогрев воркера перед приемом трафика.
+
+После перезапуска первые запросы платят за компиляцию шаблонов, импорт
+sorl-thumbnail и Pillow, заполнение словарей URL-резолвера, открытие
+соединений с базой и пустые кэши. warm_up() делает всё это заранее:
+
+* импортирует тяжелые модули и движок миниатюр;
+* компилирует все шаблоны всех движков (при DEBUG = False они остаются
+  в кэширующем загрузчике);
+* заполняет резолвер и строит URL всех маршрутов без параметров;
+* запрашивает первые страницы главной ленты и самых больших групп, что
+  заполняет общий кэш фрагментов и кэш страниц для анонимов.
+
+Команда manage.py warmup печатает время каждого шага; при
+WARMUP_ON_START прогрев выполняется при загрузке yatube/wsgi.py — с
+preload_app в gunicorn один раз в мастере, иначе в каждом воркере.
+"""
+import importlib
+import logging
+import os
+import sys
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, \
+    engines
+from django.test import Client
+from django.urls import NoReverseMatch, URLResolver, get_resolver, reverse
+
+
+logger = logging.getLogger('yatube.warmup')
+
+IMPORTS = ('PIL.Image', 'sorl.thumbnail', 'posts.views', 'posts.images',
+           'core.views')
+TEMPLATE_SUFFIXES = ('.html', '.txt')
+
+
+def import_modules():
+    """Время импорта тяжелых модулей; уже загруженные отмечаются."""
+    timings = []
+    for name in IMPORTS:
+        loaded = name in sys.modules
+        started = time.perf_counter()
+        importlib.import_module(name)
+        timings.append((f'import {name}', time.perf_counter() - started,
+                        'already loaded' if loaded else ''))
+    from sorl.thumbnail import default
+    started = time.perf_counter()
+    # Движок и хранилище миниатюр создаются лениво при первом обращении.
+    engine, kvstore = default.engine.__class__, default.kvstore.__class__
+    timings.append(('thumbnail engine', time.perf_counter() - started,
+                    f'{engine.__module__}, {kvstore.__module__}'))
+    return timings
+
+
+def _template_names(backend):
+    engine = getattr(backend, 'engine', None)
+    if engine is None:
+        return []
+    loaders = []
+    for loader in engine.template_loaders:
+        loaders.extend(getattr(loader, 'loaders', [loader]))
+    names = set()
+    for loader in loaders:
+        for directory in getattr(loader, 'get_dirs', list)():
+            for root, _, files in os.walk(str(directory)):
+                names.update(
+                    os.path.relpath(os.path.join(root, name), directory)
+                    .replace(os.sep, '/')
+                    for name in files if name.endswith(TEMPLATE_SUFFIXES))
+    return sorted(names)
+
+
+def compile_templates():
+    """Загружает все шаблоны; возвращает (число, ошибки)."""
+    compiled, errors = 0, []
+    for backend in engines.all():
+        for name in _template_names(backend):
+            try:
+                backend.get_template(name)
+                compiled += 1
+            except (TemplateDoesNotExist, TemplateSyntaxError) as error:
+                errors.append(f'{name}: {error}')
+    return compiled, errors
+
+
+def _route_names(patterns, namespace=None):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            inner = pattern.namespace
+            if namespace and inner:
+                inner = f'{namespace}:{inner}'
+            yield from _route_names(pattern.url_patterns,
+                                    inner or namespace)
+        elif pattern.name:
+            yield f'{namespace}:{pattern.name}' if namespace \
+                else pattern.name
+
+
+def resolve_routes():
+    """Заполняет резолвер; возвращает (маршрутов, построено URL)."""
+    names = set(_route_names(get_resolver().url_patterns))
+    reversed_count = 0
+    for name in names:
+        try:
+            reverse(name)
+            reversed_count += 1
+        except NoReverseMatch:
+            # Маршрут с параметрами: словари резолвера уже заполнены.
+            pass
+    return len(names), reversed_count
+
+
+def _host():
+    for host in settings.ALLOWED_HOSTS:
+        host = host.lstrip('.')
+        if host and '*' not in host:
+            return host
+    return 'localhost'
+
+
+def prime_pages(pages):
+    """Первые pages страниц главной и первые страницы pages самых больших
+    групп; возвращает число запрошенных страниц."""
+    from posts.models import Group
+
+    urls = [reverse('index')] + [
+        f'{reverse("index")}?page={number}'
+        for number in range(2, pages + 1)]
+    urls += [reverse('group', args=[slug]) for slug in Group.objects.annotate(
+        posts=Count('group')).order_by('-posts').values_list(
+            'slug', flat=True)[:pages]]
+    client = Client(HTTP_HOST=_host())
+    for url in urls:
+        response = client.get(url)
+        if response.status_code != 200:
+            logger.warning('Warm-up request %s returned %s',
+                           url, response.status_code)
+    return len(urls)
+
+
+def open_connections():
+    for alias in connections:
+        connections[alias].ensure_connection()
+    return len(connections.databases)
+
+
+def warm_up(pages=None):
+    """Прогревает процесс; возвращает [(шаг, секунды, подробности)]."""
+    if pages is None:
+        pages = getattr(settings, 'WARMUP_PAGES', 3)
+    steps = import_modules()
+
+    def timed(func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        return result, time.perf_counter() - started
+
+    count, seconds = timed(open_connections)
+    steps.append(('database connections', seconds, f'{count} databases'))
+    (compiled, errors), seconds = timed(compile_templates)
+    steps.append(('templates', seconds,
+                  f'{compiled} compiled, {len(errors)} failed'))
+    for error in errors:
+        logger.warning('Warm-up template error: %s', error)
+    (names, reversed_count), seconds = timed(resolve_routes)
+    steps.append(('url resolver', seconds,
+                  f'{names} routes, {reversed_count} reversed'))
+    if pages:
+        count, seconds = timed(prime_pages, pages)
+        steps.append(('feed and group pages', seconds, f'{count} pages'))
+    # Соединения не должны достаться дочерним процессам после fork.
+    connections.close_all()
+    logger.info('Warm-up finished in %.3f s',
+                sum(seconds for _, seconds, _ in steps))
+    return steps
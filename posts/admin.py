@@ -1,14 +1,23 @@
 from django.contrib import admin
 
-from .models import Post, Group, Comment, Follow
+from . import search
+from .models import Post, Group, Comment, Follow, AuthorStats, SearchPosting
 
 
 class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    list_display = ('pk', 'text', 'pub_date', 'author', 'group',
+                    'comment_count')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return super().get_search_results(
+                request, queryset, search_term)
+        return search.filter_matching(
+            queryset, search_term, SearchPosting.POST), False
+
 
 admin.site.register(Post, PostAdmin)
 
@@ -27,6 +36,13 @@ class CommentAdmin(admin.ModelAdmin):
     search_fields = ('text',)
     list_filter = ('created',)
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return super().get_search_results(
+                request, queryset, search_term)
+        return search.filter_matching(
+            queryset, search_term, SearchPosting.COMMENT), False
+
 
 admin.site.register(Comment, CommentAdmin)
 
@@ -38,3 +54,11 @@ class FollowAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Follow, FollowAdmin)
+
+
+class AuthorStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'post_count', 'follower_count', 'following_count')
+    search_fields = ('user__username',)
+
+
+admin.site.register(AuthorStats, AuthorStatsAdmin)
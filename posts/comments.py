@@ -0,0 +1,59 @@
+"""Ветка комментариев поста страницами фиксированного размера.
+
+Комментарии идут по (created, id): порядок стабилен и при одинаковом
+времени. Следующая страница выбирается условием «после последнего
+показанного комментария», поэтому «Показать ещё» не пропускает и не
+повторяет комментарии, добавленные между запросами.
+"""
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Comment
+from .pagination import decode_cursor, encode_key
+
+
+def page_size():
+    return getattr(settings, 'POSTS_COMMENTS_PAGE_SIZE', 50)
+
+
+def thread(post_id):
+    return Comment.objects.filter(post=post_id).select_related(
+        'author').order_by('created', 'id')
+
+
+def _cursor(items, size):
+    if len(items) < size:
+        return None
+    last = items[size - 1]
+    return encode_key(last.created, last.pk)
+
+
+def first_page(post):
+    """Первая страница для страницы поста: (QuerySet, токен или None).
+
+    Есть ли продолжение, видно по comment_count поста, поэтому лишний
+    комментарий не читается; QuerySet уже вычислен.
+    """
+    size = page_size()
+    comments = thread(post.pk)[:size]
+    if post.comment_count <= size:
+        return comments, None
+    return comments, _cursor(list(comments), size)
+
+
+def page_after(post_id, token):
+    """Страница после курсора token: (список комментариев, токен или None).
+
+    Битый или пустой токен дает первую страницу.
+    """
+    size = page_size()
+    comments = thread(post_id)
+    key = decode_cursor(token)
+    if key is not None:
+        created, pk = key
+        comments = comments.filter(
+            Q(created__gt=created) | Q(created=created, id__gt=pk))
+    items = list(comments[:size + 1])
+    if len(items) <= size:
+        return items, None
+    return items[:size], _cursor(items, size)
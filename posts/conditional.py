@@ -0,0 +1,140 @@
+"""Условные GET для лент и страницы поста.
+
+Валидаторы строятся из поколений областей лент (posts/feed_cache.py):
+поколение сдвигается при каждой записи, которая меняет ленты области, и
+равно метке времени этой записи. ETag — хэш поколений, страницы и
+зрителя, Last-Modified — самое свежее поколение. Дата последнего поста
+или комментария не годится сама по себе: правки и удаления ее не
+меняют, а поколение сдвигают.
+
+Проверка стоит одного чтения из кэша (и запроса за id автора или
+группы) и выполняется до основных запросов и рендеринга шаблона.
+"""
+import datetime
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.views.decorators.http import condition
+
+from . import feed_cache
+from .models import Group
+from .stats import get_stats
+from .timeline import followed_authors
+
+
+User = get_user_model()
+
+
+def _viewer(request):
+    # CSRF-токен в формах страницы зависит от cookie: при ее смене
+    # старая копия страницы не годится.
+    user = request.user.pk if request.user.is_authenticated else 0
+    return f'{user}:{request.COOKIES.get(settings.CSRF_COOKIE_NAME, "")}'
+
+
+def page_author(request, username):
+    """Автор страницы со счетчиками или None; загружается один раз за
+    запрос — и для валидаторов, и для самой страницы."""
+    if not hasattr(request, '_page_author'):
+        request._page_author = User.objects.select_related(
+            'stats').filter(username=username).first()
+    return request._page_author
+
+
+def _author_state(author):
+    stats = get_stats(author)
+    return [author.pk, stats.post_count, stats.follower_count,
+            stats.following_count]
+
+
+def _viewer_scopes(request):
+    # Кнопка «подписаться» зависит от подписок зрителя.
+    if request.user.is_authenticated:
+        return [feed_cache.follower_scope(request.user.pk)]
+    return []
+
+
+def index_state(request):
+    return [feed_cache.GLOBAL], ()
+
+
+def group_state(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    if group_id is None:
+        return None
+    return [feed_cache.group_scope(group_id)], ()
+
+
+def profile_state(request, username):
+    author = page_author(request, username)
+    if author is None:
+        return None
+    return ([feed_cache.author_scope(author.pk), *_viewer_scopes(request)],
+            _author_state(author))
+
+
+def post_state(request, username, post_id):
+    author = page_author(request, username)
+    if author is None:
+        return None
+    return ([feed_cache.author_scope(author.pk),
+             feed_cache.post_scope(post_id)], _author_state(author))
+
+
+def request_followed_authors(request):
+    """followed_authors зрителя, один запрос на запрос к странице."""
+    if not hasattr(request, '_followed_authors'):
+        request._followed_authors = followed_authors(request.user.pk)
+    return request._followed_authors
+
+
+def follow_scopes(request):
+    """Области ленты подписок: подписки зрителя и поколения всех его
+    авторов. Новый пост сдвигает только поколение автора, а не области
+    каждого из его подписчиков."""
+    followed, _ = request_followed_authors(request)
+    return [feed_cache.follower_scope(request.user.pk),
+            *(feed_cache.author_scope(author_id) for author_id in followed)]
+
+
+def follow_state(request):
+    return follow_scopes(request), ()
+
+
+def validators(request, state, *args, **kwargs):
+    """(ETag, Last-Modified) страницы или (None, None), если у нее нет
+    состояния (например, автора не существует)."""
+    cached = getattr(request, '_conditional_validators', None)
+    if cached is not None:
+        return cached
+    result = state(request, *args, **kwargs)
+    if result is None:
+        request._conditional_validators = (None, None)
+        return request._conditional_validators
+    scopes, extra = result
+    stamps = feed_cache.generations(*scopes)
+    # По этим же областям страница проверяется в кэше целых страниц.
+    request._page_scopes = dict(zip(scopes, stamps))
+    material = '|'.join([
+        state.__name__, request.META.get('QUERY_STRING', ''),
+        _viewer(request), *map(str, extra), *map(str, kwargs.values()),
+        *stamps])
+    last_modified = datetime.datetime.fromtimestamp(
+        max(int(stamp) for stamp in stamps) / 10 ** 9, datetime.timezone.utc)
+    request._conditional_validators = (
+        hashlib.md5(material.encode()).hexdigest(), last_modified)
+    return request._conditional_validators
+
+
+def conditional_page(state):
+    """condition() с валидаторами из state(request, *args, **kwargs),
+    которая возвращает (области, прочие данные для ETag) или None."""
+    def etag(request, *args, **kwargs):
+        return validators(request, state, *args, **kwargs)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return validators(request, state, *args, **kwargs)[1]
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
@@ -0,0 +1,38 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Post, Comment
+
+
+def comment_added(post_id):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=F('comment_count') + 1)
+
+
+def comment_removed(post_id):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=Greatest(F('comment_count') - 1, 0))
+
+
+def recount_comments(queryset=None, batch_size=1000):
+    """Пересчитывает comment_count пачками по первичному ключу.
+
+    Возвращает количество обработанных постов.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    counts = Comment.objects.filter(post=OuterRef('pk')).order_by().values(
+        'post').annotate(total=Count('id')).values('total')
+    ids = queryset.order_by('pk').values_list('pk', flat=True)
+    last_pk = 0
+    processed = 0
+    while True:
+        batch = list(ids.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return processed
+        with transaction.atomic():
+            Post.objects.filter(pk__in=batch).update(
+                comment_count=Coalesce(Subquery(counts), 0))
+        last_pk = batch[-1]
+        processed += len(batch)
@@ -0,0 +1,129 @@
+"""Потоковая выгрузка постов и комментариев в JSONL или CSV.
+
+Записи в том же формате, что читает posts.importer, поэтому выгрузку
+можно загрузить обратно, в том числе в пустую базу: перед постами идут
+их группы и все авторы постов и комментариев (без email и паролей).
+Строки читаются пачками по ключу (id больше последнего выданного),
+каждая пачка — через iterator(), а вывод сразу сжимается gzip: в памяти
+держится одна пачка при любом объеме.
+"""
+import csv
+import json
+
+from django.db.models import Q
+from django.utils.text import compress_sequence
+
+from .models import Post, Group, Comment, User
+
+
+BATCH_SIZE = 2000
+# Сколько байт копить перед отправкой: мелкие куски плохо сжимаются.
+CHUNK_SIZE = 64 * 1024
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {'jsonl': 'application/x-ndjson', 'csv': 'text/csv'}
+# CSV с полем type, как у JSONL: все записи в одном файле.
+CSV_FIELDS = ('type', 'username', 'first_name', 'last_name', 'slug',
+              'title', 'description', 'id', 'post', 'author', 'group',
+              'text', 'pub_date', 'created')
+
+
+def _keyset(queryset, fields, batch_size):
+    """Строки values_list(id, *fields) по возрастанию id пачками."""
+    last_id = 0
+    while True:
+        batch = queryset.filter(id__gt=last_id).order_by('id').values_list(
+            'id', *fields)[:batch_size]
+        count = 0
+        for row in batch.iterator(chunk_size=batch_size):
+            count += 1
+            last_id = row[0]
+            yield row
+        if count < batch_size:
+            return
+
+
+def select(author=None, group=None):
+    """Посты автора, группы или всего сайта и комментарии к ним."""
+    posts, comments = Post.objects.all(), Comment.objects.all()
+    if author is not None:
+        posts = posts.filter(author=author)
+        comments = comments.filter(post__author=author)
+    if group is not None:
+        posts = posts.filter(group=group)
+        comments = comments.filter(post__group=group)
+    return posts, comments
+
+
+def records(author=None, group=None, batch_size=BATCH_SIZE):
+    posts, comments = select(author, group)
+    users = User.objects.filter(
+        Q(pk__in=posts.values('author_id'))
+        | Q(pk__in=comments.values('author_id')))
+    for _, username, first_name, last_name in _keyset(
+            users, ('username', 'first_name', 'last_name'), batch_size):
+        yield {'type': 'user', 'username': username,
+               'first_name': first_name, 'last_name': last_name}
+    groups = Group.objects.filter(pk__in=posts.values('group_id'))
+    for _, slug, title, description in _keyset(
+            groups, ('slug', 'title', 'description'), batch_size):
+        yield {'type': 'group', 'slug': slug, 'title': title,
+               'description': description}
+    for post_id, username, slug, text, pub_date in _keyset(
+            posts, ('author__username', 'group__slug', 'text', 'pub_date'),
+            batch_size):
+        yield {'type': 'post', 'id': post_id, 'author': username,
+               'group': slug or '', 'text': text,
+               'pub_date': pub_date.isoformat()}
+    for _, post_id, username, text, created in _keyset(
+            comments, ('post_id', 'author__username', 'text', 'created'),
+            batch_size):
+        yield {'type': 'comment', 'post': post_id, 'author': username,
+               'text': text, 'created': created.isoformat()}
+
+
+def encode_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    """Файл для csv.writer, который возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def encode_csv(rows):
+    writer = csv.DictWriter(_Echo(), CSV_FIELDS, restval='')
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+ENCODERS = {'jsonl': encode_jsonl, 'csv': encode_csv}
+
+
+def _buffered(lines, size=CHUNK_SIZE):
+    buffer, length = [], 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(buffer).encode()
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def stream(author=None, group=None, file_format='jsonl', compress=True,
+           batch_size=BATCH_SIZE):
+    """Байтовые куски выгрузки для StreamingHttpResponse или файла."""
+    chunks = _buffered(ENCODERS[file_format](
+        records(author, group, batch_size)))
+    return compress_sequence(chunks) if compress else chunks
+
+
+def filename(author=None, group=None, file_format='jsonl', compress=True):
+    scope = (f'author-{author.username}' if author is not None else
+             f'group-{group.slug}' if group is not None else 'all')
+    return f'yatube-{scope}.{file_format}' + ('.gz' if compress else '')
@@ -0,0 +1,80 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+GENERATION_PREFIX = 'feedgen'
+PAGE_PARAMS = ('page', 'after', 'before')
+
+GLOBAL = 'global'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def follower_scope(user_id):
+    return f'follower:{user_id}'
+
+
+def timeout():
+    return getattr(settings, 'FEED_CACHE_TIMEOUT', 60 * 60)
+
+
+def _generation_key(scope):
+    return f'{GENERATION_PREFIX}:{scope}'
+
+
+def _new_generation():
+    # Новое поколение — это метка времени, а не счетчик: после вытеснения
+    # ключа из кэша оно не совпадет ни с одним из уже закэшированных.
+    return str(time.time_ns())
+
+
+def generations(*scopes):
+    keys = [_generation_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: _new_generation() for key in keys if key not in found}
+    for key, value in missing.items():
+        if not cache.add(key, value, None):
+            value = cache.get(key, value)
+        found[key] = value
+    return [found[key] for key in keys]
+
+
+def bump(*scopes):
+    """Сдвигает поколения: все фрагменты с этими областями устаревают."""
+    if scopes:
+        value = _new_generation()
+        cache.set_many(
+            {_generation_key(scope): value for scope in scopes}, None)
+
+
+def page_key(request, feed, *scopes):
+    """Ключ фрагмента ленты: тип ленты, страница или курсор, поколения
+    затронутых областей и пользователь (от него зависят кнопки в
+    карточках постов)."""
+    position = '&'.join(f'{param}={request.GET.get(param, "")}'
+                        for param in PAGE_PARAMS)
+    user = request.user.pk if request.user.is_authenticated else 0
+    return ':'.join([feed, position, str(user), *generations(*scopes)])
+
+
+def post_scopes(post):
+    """Области, в лентах которых виден пост."""
+    scopes = [GLOBAL, author_scope(post.author_id), post_scope(post.pk)]
+    if post.group_id is not None:
+        scopes.append(group_scope(post.group_id))
+    # Ленты подписок зависят от поколений всех авторов подписчика
+    # (conditional.follow_scopes), поэтому подписчиков по одному не
+    # сдвигаем: запись не зависит от их числа.
+    return scopes
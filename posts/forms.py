@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from .images import process
 from .models import Post, Comment
 
 
@@ -8,6 +10,20 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            image = process(image)
+            # Размеры нужны шаблону сразу, варианты построит воркер.
+            self.instance.image_width, self.instance.image_height = \
+                image.image_size
+            self.instance.image_variants = ''
+        elif not image:
+            # Картинку удалили: размеры и варианты ей больше не нужны.
+            self.instance.image_width = self.instance.image_height = None
+            self.instance.image_variants = ''
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,245 @@
+"""Приём картинок постов с ограниченным расходом памяти.
+
+Загрузка больше FILE_UPLOAD_MAX_MEMORY_SIZE лежит во временном файле на
+диске, Pillow читает из него только заголовок, пока мы не решили, что
+картинку стоит декодировать. JPEG декодируется сразу в уменьшенном виде
+через draft() (масштабирование DCT в 1/2, 1/4, 1/8), остальное
+уменьшается thumbnail() с reducing_gap, который сначала применяет
+дешевый reduce(). Результат кодируется в SpooledTemporaryFile и
+сохраняется в storage по кускам.
+
+Пик памяти на одну загрузку ограничен декодированным растром:
+для JPEG это не больше 4 * POSTS_IMAGE_MAX_SIZE ** 2 пикселей (draft не
+уменьшает ниже целевого размера), для прочих форматов — не больше
+POSTS_IMAGE_MAX_PIXELS пикселей; умножьте на 3-4 байта на пиксель.
+При настройках по умолчанию это около 60 МБ для JPEG и около 100 МБ для
+PNG/WebP плюс до IMAGE_SPOOL_SIZE байт закодированного результата.
+"""
+import json
+import logging
+import os
+import tempfile
+
+from PIL import Image, ImageOps
+from django.conf import settings
+from django.core.exceptions import SuspiciousOperation, ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+
+logger = logging.getLogger('yatube.images')
+
+IMAGE_SPOOL_SIZE = 1024 * 1024
+EXIF_ORIENTATION = 0x0112
+
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'progressive': True},
+    'PNG': {},
+    'WEBP': {'quality': 85},
+    'GIF': {},
+}
+
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+
+
+def max_size():
+    return getattr(settings, 'POSTS_IMAGE_MAX_SIZE', (1920, 1920))
+
+
+def max_pixels():
+    return getattr(settings, 'POSTS_IMAGE_MAX_PIXELS', 24 * 10 ** 6)
+
+
+def max_upload_size():
+    return getattr(settings, 'POSTS_IMAGE_MAX_UPLOAD_SIZE', 20 * 1024 ** 2)
+
+
+def inspect(upload):
+    """Проверяет размер файла и заголовок картинки без декодирования."""
+    if upload.size > max_upload_size():
+        raise ValidationError(
+            'Файл слишком большой: не более %(limit)d МБ.',
+            code='file_too_large',
+            params={'limit': max_upload_size() // 1024 ** 2})
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except (OSError, SyntaxError):
+        raise ValidationError('Загрузите корректное изображение.',
+                              code='invalid_image')
+    width, height = image.size
+    if width * height > max_pixels():
+        raise ValidationError(
+            'Изображение слишком большое: %(width)dx%(height)d.',
+            code='too_many_pixels',
+            params={'width': width, 'height': height})
+    return image
+
+
+def needs_resize(image):
+    limit_width, limit_height = max_size()
+    return image.width > limit_width or image.height > limit_height
+
+
+def _output_format(image):
+    if image.format in SAVE_OPTIONS and image.format != 'GIF':
+        return image.format
+    if image.mode in ('RGBA', 'LA', 'P'):
+        return 'PNG'
+    return 'JPEG'
+
+
+def process(upload):
+    """Возвращает File с уменьшенной картинкой без метаданных.
+
+    GIF, которые не надо уменьшать, остаются как есть, чтобы не терять
+    анимацию.
+    """
+    image = inspect(upload)
+    if image.format == 'GIF' and not needs_resize(image):
+        upload.seek(0)
+        upload.image_size = image.size
+        return upload
+
+    output_format = _output_format(image)
+    spool = tempfile.SpooledTemporaryFile(max_size=IMAGE_SPOOL_SIZE)
+    # Заголовок проверен в inspect(), но обрезанный или испорченный
+    # растр обнаруживается только при декодировании.
+    try:
+        if image.format == 'JPEG':
+            image.draft('RGB', max_size())
+        if image.getexif().get(EXIF_ORIENTATION, 1) != 1:
+            image = ImageOps.exif_transpose(image)
+        if output_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.thumbnail(max_size(), Image.LANCZOS, reducing_gap=2.0)
+        # Сохраняем без exif/icc/info: метаданные в результат не попадают.
+        image.save(spool, output_format, **SAVE_OPTIONS[output_format])
+    except (OSError, Image.DecompressionBombError):
+        spool.close()
+        raise ValidationError('Загрузите корректное изображение.',
+                              code='invalid_image')
+    finally:
+        image.close()
+    spool.seek(0)
+    base, _ = os.path.splitext(os.path.basename(upload.name))
+    result = File(spool, name=f'{base}.{EXTENSIONS[output_format]}')
+    result.image_size = image.size
+    return result
+
+
+def variant_widths():
+    return getattr(settings, 'POSTS_IMAGE_VARIANT_WIDTHS', (320, 640, 960))
+
+
+def card_aspect():
+    return getattr(settings, 'POSTS_IMAGE_CARD_ASPECT', (960, 339))
+
+
+def variant_formats():
+    return getattr(settings, 'POSTS_IMAGE_VARIANT_FORMATS', ('WEBP', 'JPEG'))
+
+
+def build_variants(name, storage=default_storage):
+    """Строит кадрированные под карточку варианты картинки разной ширины.
+
+    Возвращает словарь для Post.image_variants: размеры оригинала и
+    списки (ширина, имя файла) по форматам.
+    """
+    aspect_width, aspect_height = card_aspect()
+    with storage.open(name) as source:
+        image = Image.open(source)
+        original_size = image.size
+        widest = max(variant_widths())
+        if image.format == 'JPEG':
+            image.draft('RGB', (widest, widest * aspect_height //
+                                aspect_width))
+        if image.getexif().get(EXIF_ORIENTATION, 1) != 1:
+            image = ImageOps.exif_transpose(image)
+        image = image.convert('RGB')
+        base, _ = os.path.splitext(os.path.basename(name))
+        variants = {'width': original_size[0], 'height': original_size[1]}
+        # Шире кадра, который помещается в оригинал, варианты не строим:
+        # увеличение только раздувает файл. Маленькой картинке хватит
+        # одного варианта в ее собственную ширину.
+        widest_frame = max(1, min(original_size[0],
+                                  original_size[1] * aspect_width //
+                                  aspect_height))
+        widths = [width for width in sorted(variant_widths())
+                  if width <= widest_frame] or [widest_frame]
+        for width in widths:
+            size = (width, max(1, round(width * aspect_height /
+                                        aspect_width)))
+            frame = ImageOps.fit(image, size, Image.LANCZOS)
+            for image_format in variant_formats():
+                spool = tempfile.SpooledTemporaryFile(
+                    max_size=IMAGE_SPOOL_SIZE)
+                frame.save(spool, image_format,
+                           **SAVE_OPTIONS[image_format])
+                spool.seek(0)
+                saved = storage.save(
+                    f'posts/variants/{base}_{width}w.'
+                    f'{EXTENSIONS[image_format]}', File(spool))
+                variants.setdefault(image_format.lower(), []).append(
+                    [size[0], size[1], saved])
+            frame.close()
+        image.close()
+    return variants
+
+
+def delete_image(name, raw_variants, storage=default_storage):
+    """Удаляет оригинал и варианты картинки, которую пост больше не
+    показывает."""
+    names = [name] if name else []
+    if raw_variants:
+        data = json.loads(raw_variants)
+        for image_format in variant_formats():
+            names += [saved for _, _, saved
+                      in data.get(image_format.lower(), ())]
+    # Неудачная уборка не должна ломать запрос, сохранивший пост.
+    for name in names:
+        try:
+            storage.delete(name)
+        except (OSError, SuspiciousOperation) as error:
+            logger.warning('Could not delete %s: %r', name, error)
+
+
+class ImageVariants:
+    """Готовые для шаблона srcset/src/размеры из Post.image_variants."""
+
+    def __init__(self, data, storage=default_storage):
+        self.data = data
+        self.storage = storage
+
+    @classmethod
+    def from_json(cls, raw):
+        if not raw:
+            return None
+        return cls(json.loads(raw))
+
+    def _srcset(self, key):
+        return ', '.join(f'{self.storage.url(name)} {width}w'
+                         for width, _, name in self.data.get(key, ()))
+
+    @property
+    def webp_srcset(self):
+        return self._srcset('webp')
+
+    @property
+    def srcset(self):
+        return self._srcset('jpeg')
+
+    def _largest(self):
+        return (self.data.get('jpeg') or self.data.get('webp'))[-1]
+
+    @property
+    def src(self):
+        return self.storage.url(self._largest()[2])
+
+    @property
+    def width(self):
+        return self._largest()[0]
+
+    @property
+    def height(self):
+        return self._largest()[1]
@@ -0,0 +1,87 @@
+"""Пересчет производных данных после массовой записи мимо сигналов:
+генератором данных и импортом."""
+import contextlib
+
+from django.db import transaction
+from django.db.models import QuerySet
+
+from . import feed_cache, search, timeline
+from .counters import recount_comments
+from .models import Follow, Post
+from .stats import check_stats
+
+
+def _no_progress(phase, done, total):
+    pass
+
+
+@contextlib.contextmanager
+def explicit_dates(*fields):
+    """Отключает auto_now_add, чтобы bulk_create записал заданные даты."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def rebuild_derived(user_ids=None, batch_size=1000, progress=None,
+                    posts=None):
+    """Пересчитывает то, что при обычной записи обновляют сигналы:
+    счетчики, ленты подписок и поисковый индекс.
+
+    user_ids — чьи счетчики и ленты пересчитать, по умолчанию всех
+    (ленты — всех, у кого есть подписки); posts — QuerySet или
+    коллекция id постов, чьи счетчики комментариев и поисковый индекс
+    пересчитать, по умолчанию все. Генератор данных и импорт передают
+    только то, что записали сами, и пересчет не растет вместе с базой.
+    progress(phase, done, total) вызывается по ходу работы.
+    """
+    progress = progress or _no_progress
+    if posts is None or isinstance(posts, QuerySet):
+        post_batches = [posts]
+    else:
+        # Пачками: длинный список id не влезет в один запрос.
+        posts = sorted(posts)
+        post_batches = [Post.objects.filter(
+            pk__in=posts[start:start + batch_size])
+            for start in range(0, len(posts), batch_size)]
+    stats_user_ids = user_ids
+    if user_ids is None:
+        user_ids = Follow.objects.order_by('user_id').values_list(
+            'user_id', flat=True).distinct()
+        total = user_ids.count()
+        user_ids = user_ids.iterator(chunk_size=batch_size)
+    else:
+        total = len(user_ids)
+    with transaction.atomic():
+        check_stats(fix=True, batch_size=batch_size,
+                    user_ids=stats_user_ids)
+        for batch in post_batches:
+            recount_comments(batch, batch_size=batch_size)
+        done = 0
+        for done, user_id in enumerate(user_ids, 1):
+            timeline.rebuild(user_id)
+            if done % batch_size == 0:
+                progress('timeline', done, total)
+        progress('timeline', done, total)
+        progress('search', 0, 1)
+        for batch in post_batches:
+            search.rebuild(batch_size, batch)
+        progress('search', 1, 1)
+
+
+def invalidate_feeds(group_ids=(), user_ids=()):
+    """Сдвигает поколения общей ленты, групп, авторов и подписчиков.
+
+    Ленты подписок зависят от поколений всех авторов подписчика
+    (conditional.follow_scopes), поэтому прежние подписчики авторов из
+    user_ids тоже увидят новые посты.
+    """
+    feed_cache.bump(
+        feed_cache.GLOBAL,
+        *(feed_cache.group_scope(group_id) for group_id in group_ids),
+        *(feed_cache.author_scope(user_id) for user_id in user_ids),
+        *(feed_cache.follower_scope(user_id) for user_id in user_ids))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.stats import check_stats
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счетчики авторов с данными и исправляет расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true',
+                            help='Записать пересчитанные значения')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        drifted = check_stats(fix=options['fix'],
+                              batch_size=options['batch_size'])
+        action = 'Исправлено' if options['fix'] else 'Расхождений'
+        self.stdout.write(f'{action}: {len(drifted)}')
@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from posts import exporter
+from posts.models import Group
+
+
+class Command(BaseCommand):
+    help = ('Выгружает посты и комментарии автора, группы или всего сайта '
+            'в JSONL или CSV, по умолчанию со сжатием gzip')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки; формат и сжатие '
+                                         'по умолчанию — по расширению')
+        parser.add_argument('--author', help='Username автора')
+        parser.add_argument('--group', help='Slug группы')
+        parser.add_argument('--format', choices=exporter.FORMATS)
+        parser.add_argument('--batch-size', type=int,
+                            default=exporter.BATCH_SIZE)
+
+    # Без DEBUG запросы не копятся в connection.queries.
+    @override_settings(DEBUG=False)
+    def handle(self, *args, **options):
+        path = options['path']
+        compress = path.endswith('.gz')
+        name = path[:-3] if compress else path
+        file_format = options['format'] or (
+            'csv' if name.lower().endswith('.csv') else 'jsonl')
+        author = group = None
+        try:
+            if options['author']:
+                author = get_user_model().objects.get(
+                    username=options['author'])
+            if options['group']:
+                group = Group.objects.get(slug=options['group'])
+        except (get_user_model().DoesNotExist, Group.DoesNotExist) as error:
+            raise CommandError(error)
+
+        written = 0
+        with open(path, 'wb') as output:
+            for chunk in exporter.stream(author, group, file_format,
+                                         compress, options['batch_size']):
+                output.write(chunk)
+                written += len(chunk)
+        self.stdout.write(f'Записано {written} байт в {path}')
@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from posts.importer import (BATCH_SIZE, KINDS, Checkpoint, Importer,
+                            read_records)
+from posts.maintenance import invalidate_feeds, rebuild_derived
+
+
+MAX_REPORTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = ('Импортирует пользователей, группы, посты, комментарии и '
+            'подписки из JSONL или CSV пачками в транзакциях')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .jsonl или .csv')
+        parser.add_argument('--kind', choices=list(KINDS),
+                            help='Тип записей, если в них нет поля type')
+        parser.add_argument('--format', choices=('jsonl', 'csv'),
+                            help='По умолчанию — по расширению файла')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--checkpoint',
+                            help='Файл контрольной точки для продолжения')
+        parser.add_argument('--no-rebuild', action='store_true',
+                            help='Не пересчитывать счетчики, ленты и '
+                                 'поисковый индекс после импорта')
+
+    # Без DEBUG запросы не копятся в connection.queries.
+    @override_settings(DEBUG=False)
+    def handle(self, *args, **options):
+        checkpoint = Checkpoint(options['checkpoint'], options['path'])
+        offset, stats = checkpoint.load()
+        if offset:
+            self.stdout.write(f'Продолжаем с байта {offset}')
+        self.errors = 0
+        self.started = time.monotonic()
+        importer = Importer(options['batch_size'], options['kind'],
+                            on_error=self.report_error)
+        importer.stats.update(stats)
+        self.resumed = self.created(stats)
+        records = read_records(options['path'], options['format'], offset)
+        stats = importer.run(records, checkpoint, self.progress)
+        self.stdout.write('')
+
+        if not options['no_rebuild']:
+            self.stdout.write('Пересчет счетчиков, лент и индекса...')
+            if offset:
+                # Что записал прерванный запуск, неизвестно: пересчитываем
+                # всё.
+                rebuild_derived(batch_size=options['batch_size'])
+            else:
+                rebuild_derived(importer.touched_user_ids(),
+                                options['batch_size'],
+                                posts=importer.post_ids)
+        invalidate_feeds(importer.group_ids, importer.user_ids)
+        checkpoint.clear()
+        for key, value in sorted(stats.items()):
+            self.stdout.write(f'{key}: {value}')
+
+    @staticmethod
+    def created(stats):
+        return sum(value for key, value in stats.items()
+                   if key.startswith('created:'))
+
+    def progress(self, stats):
+        created = self.created(stats)
+        elapsed = time.monotonic() - self.started
+        rate = (created - self.resumed) / elapsed if elapsed else 0
+        self.stdout.write(f'\rзаписано {created:>10}  {rate:>8.0f}/с',
+                          ending='')
+        self.stdout.flush()
+
+    def report_error(self, offset, kind, message):
+        self.errors += 1
+        if self.errors <= MAX_REPORTED_ERRORS:
+            self.stderr.write(f'байт {offset}, {kind}: {message}')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount_comments
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики комментариев у постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        processed = recount_comments(batch_size=options['batch_size'])
+        self.stdout.write(f'Пересчитано постов: {processed}')
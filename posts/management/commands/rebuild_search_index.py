@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Переиндексирует посты и комментарии для поиска'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        indexed = search.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(
+            f'Проиндексировано записей: {indexed} '
+            f'({search.get_backend().name})')
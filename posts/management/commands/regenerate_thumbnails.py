@@ -0,0 +1,40 @@
+from concurrent.futures import as_completed
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Заново строит миниатюры и адаптивные варианты картинок '
+            'постов в пуле процессов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Число процессов (по умолчанию — по ядрам)')
+        parser.add_argument('--window', type=int, default=1000,
+                            help='Сколько задач держать в пуле одновременно')
+
+    def handle(self, *args, **options):
+        images = Post.objects.exclude(image='').exclude(
+            image__isnull=True).order_by('pk').values_list(
+            'pk', 'image').iterator()
+        done = failed = 0
+        with thumbnails.make_executor(options['workers']) as executor:
+            while True:
+                batch = list(islice(images, options['window']))
+                if not batch:
+                    break
+                futures = {
+                    executor.submit(thumbnails.prepare_post_image, pk, name):
+                    name for pk, name in batch}
+                for future in as_completed(futures):
+                    if future.exception() is not None:
+                        failed += 1
+                        self.stderr.write(
+                            f'{futures[future]}: {future.exception()!r}')
+                    else:
+                        done += 1
+                self.stdout.write(f'Готово: {done}, ошибок: {failed}')
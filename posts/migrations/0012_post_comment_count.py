@@ -0,0 +1,30 @@
+# Generated by Django 2.2.6 on 2026-10-18 04:39
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_comment_count(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    counts = Comment.objects.filter(
+        post=models.OuterRef('pk')).order_by().values('post').annotate(
+        total=models.Count('id')).values('total')
+    Post.objects.update(comment_count=Coalesce(models.Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.RunPython(fill_comment_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.6 on 2026-10-18 04:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def fill_author_stats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+
+    def count(queryset, field):
+        return Coalesce(models.Subquery(
+            queryset.filter(**{field: models.OuterRef('pk')}).order_by()
+            .values(field).annotate(total=models.Count('id'))
+            .values('total')), 0)
+
+    users = User.objects.annotate(
+        post_total=count(Post.objects, 'author'),
+        follower_total=count(Follow.objects, 'author'),
+        following_total=count(Follow.objects, 'user'),
+    ).values_list('pk', 'post_total', 'follower_total', 'following_total')
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(user_id=pk, post_count=posts, follower_count=followers,
+                     following_count=following)
+         for pk, posts, followers, following in users.iterator()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0012_post_comment_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    primary_key=True, related_name='stats', serialize=False,
+                    to=settings.AUTH_USER_MODEL)),
+                ('post_count', models.PositiveIntegerField(
+                    default=0, verbose_name='Записей')),
+                ('follower_count', models.PositiveIntegerField(
+                    default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(
+                    default=0, verbose_name='Подписан')),
+            ],
+        ),
+        migrations.RunPython(fill_author_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 2.2.6 on 2026-10-18 04:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+FTS_TABLE = 'posts_search_fts'
+
+
+def fts5_supported(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return ('ENABLE_FTS5',) in cursor.fetchall()
+
+
+def create_fts_table(apps, schema_editor):
+    connection = schema_editor.connection
+    if not fts5_supported(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"text, post_id UNINDEXED, tokenize = 'unicode61')")
+        # rowid = id * 2 для постов и id * 2 + 1 для комментариев
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text, post_id) '
+            f'SELECT id * 2, text, id FROM posts_post '
+            f'UNION ALL '
+            f'SELECT id * 2 + 1, text, post_id FROM posts_comment')
+
+
+def drop_fts_table(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('kind', models.PositiveSmallIntegerField(choices=[(0, 'Публикация'), (1, 'Комментарий')])),
+                ('object_id', models.PositiveIntegerField()),
+                ('frequency', models.PositiveIntegerField(default=1)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='posts.Post')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='searchposting',
+            index=models.Index(fields=['term', 'post'], name='search_term_post'),
+        ),
+        migrations.AddIndex(
+            model_name='searchposting',
+            index=models.Index(fields=['kind', 'object_id'], name='search_kind_object'),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
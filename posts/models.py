@@ -1,8 +1,11 @@
 from django.db import models
+from django.utils.functional import cached_property
 
 from django.contrib.auth import get_user_model
 from django.utils.text import Truncator
 
+from .images import ImageVariants
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200, verbose_name='Заголовок',
@@ -29,15 +32,38 @@ class Post(models.Model):
                               verbose_name='Группа')
     image = models.ImageField(upload_to='posts/', blank=True, null=True,
                               verbose_name='Картинка')
+    image_width = models.PositiveIntegerField(
+        blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(
+        blank=True, null=True, editable=False)
+    image_variants = models.TextField(
+        blank=True, default='', editable=False)
+    comment_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Комментариев')
     objects = models.Manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        # Ленты читаются по убыванию (pub_date, id): SQLite идет по этим
+        # индексам в обратном порядке, id в них уже есть как rowid.
+        indexes = [
+            models.Index(fields=('pub_date',), name='post_pub_date'),
+            models.Index(fields=('author', 'pub_date'),
+                         name='post_author_pub_date'),
+            models.Index(fields=('group', 'pub_date'),
+                         name='post_group_pub_date'),
+        ]
 
     def __str__(self):
         self.text = Truncator(self.text).words(10)
         return self.text[:15]
 
+    @cached_property
+    def variants(self):
+        if not self.image:
+            return None
+        return ImageVariants.from_json(self.image_variants)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -51,6 +77,10 @@ class Comment(models.Model):
     created = models.DateTimeField(verbose_name="Дата публикации",
                                    auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=('post', 'created'),
+                                name='comment_post_created')]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -61,3 +91,61 @@ class Follow(models.Model):
     class Meta:
         constraints = [models.UniqueConstraint(
             fields=('user', 'author'), name='unique follow')]
+        indexes = [models.Index(fields=('author', 'user'),
+                                name='follow_author_user')]
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: пост, разосланный подписчику."""
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='timeline')
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    pub_date = models.DateTimeField('date published')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        constraints = [models.UniqueConstraint(
+            fields=('user', 'post'), name='unique timeline entry')]
+        indexes = [models.Index(
+            fields=('user', 'pub_date', 'post'),
+            name='timeline_user_pub_date_post')]
+
+
+class AuthorStats(models.Model):
+    """Счетчики для карточки автора, обновляются при записи."""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True,
+        related_name='stats')
+    post_count = models.PositiveIntegerField(
+        default=0, verbose_name='Записей')
+    follower_count = models.PositiveIntegerField(
+        default=0, verbose_name='Подписчиков')
+    following_count = models.PositiveIntegerField(
+        default=0, verbose_name='Подписан')
+
+    def __str__(self):
+        return f'{self.user}: {self.post_count}/{self.follower_count}/' \
+               f'{self.following_count}'
+
+
+class SearchPosting(models.Model):
+    """Постинг обратного индекса поиска (для баз без SQLite FTS5)."""
+    POST = 0
+    COMMENT = 1
+    KIND_CHOICES = ((POST, 'Публикация'), (COMMENT, 'Комментарий'))
+
+    term = models.CharField(max_length=64)
+    kind = models.PositiveSmallIntegerField(choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='search_postings')
+    frequency = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=('term', 'post'),
+                         name='search_term_post'),
+            models.Index(fields=('kind', 'object_id'),
+                         name='search_kind_object'),
+        ]
@@ -0,0 +1,140 @@
+"""Кэш целых страниц для анонимных посетителей.
+
+Страница кэшируется вместе со своими суррогатными ключами — областями
+лент (posts/feed_cache.py), из которых собраны ее валидаторы: лента
+целиком, группа, автор, пост. Записи через сигналы сдвигают поколения
+именно этих областей, поэтому новый пост, правка или комментарий
+(из представлений или из админки) вычищают только затронутые страницы.
+Копия отдается, пока поколения ее ключей не изменились; проверка стоит
+одного чтения из кэша и не трогает базу.
+
+Анонимным считается запрос без cookie сессии: пользователь при этом не
+загружается. Ответы, которые ставят cookie, не кэшируются.
+"""
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import parse_http_date_safe
+
+from core import metrics
+from core.db import router
+from core.middleware import get_url_name
+
+from . import feed_cache
+
+
+KEY_PREFIX = 'page'
+# Заголовки, которые ставит сама страница, а не внешние middleware.
+SKIP_HEADERS = ('content-length', 'x-page-cache')
+
+
+class PageCacheStats:
+    """Попадания и промахи кэша страниц по имени URL."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, url_name, hit):
+        with self._lock:
+            stat = self._stats.setdefault(url_name, {'hits': 0, 'misses': 0})
+            stat['hits' if hit else 'misses'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(stat) for name, stat in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+page_cache_stats = PageCacheStats()
+
+
+def timeout():
+    return getattr(settings, 'PAGE_CACHE_TIMEOUT', 10 * 60)
+
+
+def page_key(request, url_name):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'{KEY_PREFIX}:{url_name}:{path}'
+
+
+def is_anonymous(request):
+    return settings.SESSION_COOKIE_NAME not in request.COOKIES
+
+
+def _fresh(entry):
+    scopes = list(entry['scopes'])
+    return feed_cache.generations(*scopes) == [
+        entry['scopes'][scope] for scope in scopes]
+
+
+def _restore(entry):
+    response = HttpResponse(entry['content'], status=entry['status'])
+    for header, value in entry['headers']:
+        response[header] = value
+    return response
+
+
+def store(key, request, response):
+    """Кладет ответ в кэш, если он общий для всех анонимных посетителей."""
+    scopes = getattr(request, '_page_scopes', None)
+    # Собранная из отстающей реплики страница легла бы под уже новые
+    # поколения (core/db/router.py).
+    if not scopes or router.replica_used() or \
+            response.status_code != 200 or response.streaming \
+            or response.cookies or response.has_header('Cache-Control'):
+        return
+    cache.set(key, {
+        'content': response.content,
+        'status': response.status_code,
+        'headers': [(header, value) for header, value in response.items()
+                    if header.lower() not in SKIP_HEADERS],
+        'scopes': scopes,
+    }, timeout())
+
+
+class PageCacheMiddleware:
+    """Отдает анонимным посетителям готовые страницы PAGE_CACHE_VIEWS
+    и сохраняет новые; заголовок X-Page-Cache — hit или miss."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        key = getattr(request, '_page_cache_key', None)
+        if key is not None and not getattr(request, '_page_cache_hit', False):
+            store(key, request, response)
+            response['X-Page-Cache'] = 'miss'
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = get_url_name(request)
+        if request.method != 'GET' or not is_anonymous(request) or \
+                url_name not in getattr(settings, 'PAGE_CACHE_VIEWS', ()):
+            return None
+        key = request._page_cache_key = page_key(request, url_name)
+        entry = cache.get(key)
+        hit = entry is not None and _fresh(entry)
+        page_cache_stats.record(url_name, hit)
+        metrics.inc('yatube_page_cache_total', view=url_name,
+                    result='hit' if hit else 'miss')
+        if not hit:
+            return None
+        request._page_cache_hit = True
+        response = _restore(entry)
+        response = get_conditional_response(
+            request, etag=response.get('ETag'),
+            last_modified=parse_http_date_safe(
+                response.get('Last-Modified')),
+            response=response)
+        patch_vary_headers(response, ('Cookie',))
+        response['X-Page-Cache'] = 'hit'
+        return response
@@ -0,0 +1,186 @@
+import base64
+import binascii
+import datetime
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+
+CURSOR_PARAMS = ('after', 'before')
+
+
+def encode_key(moment, pk):
+    """Упаковывает позицию записи (дата, id) в непрозрачный токен."""
+    delta = moment - datetime.datetime(1970, 1, 1, tzinfo=timezone.utc)
+    micros = (delta.days * 86400 + delta.seconds) * 10 ** 6 + \
+        delta.microseconds
+    raw = f'{micros}.{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def encode_cursor(post):
+    """Упаковывает позицию поста (pub_date, id) в непрозрачный токен."""
+    return encode_key(post.pub_date, post.pk)
+
+
+def decode_cursor(token):
+    """Возвращает (дата, id) из токена или None, если токен битый."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        micros, pk = (int(part) for part in raw.decode().split('.'))
+        pub_date = datetime.datetime(1970, 1, 1, tzinfo=timezone.utc) + \
+            datetime.timedelta(microseconds=micros)
+    except (binascii.Error, UnicodeDecodeError, ValueError, OverflowError):
+        return None
+    # id вне диапазона INTEGER не поместится в параметр запроса.
+    if not 0 <= pk < 2 ** 63:
+        return None
+    return pub_date, pk
+
+
+class CursorPage:
+    """Страница ленты без общего количества записей.
+
+    Повторяет ту часть интерфейса django.core.paginator.Page, которую
+    используют шаблоны, и добавляет токены соседних страниц.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return encode_cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return encode_cursor(self.object_list[0])
+        return None
+
+
+class LazyCursorPage(CursorPage):
+    """CursorPage, которая читает записи при первом обращении.
+
+    Ленты рендерятся внутри кэшируемого фрагмента: если фрагмент взят из
+    кэша, к странице никто не обращается и запроса к базе нет.
+    """
+
+    def __init__(self, load):
+        self._load = load
+
+    def __repr__(self):
+        if '_loaded' not in self.__dict__:
+            return '<LazyCursorPage (not loaded)>'
+        return super().__repr__()
+
+    @cached_property
+    def _loaded(self):
+        return self._load()
+
+    @property
+    def object_list(self):
+        return self._loaded[0]
+
+    @property
+    def _has_next(self):
+        return self._loaded[1]
+
+    @property
+    def _has_previous(self):
+        return self._loaded[2]
+
+
+class CursorPaginator:
+    """Keyset-пагинация по (pub_date, id).
+
+    Каждая страница читается одним запросом с LIMIT per_page + 1, без
+    COUNT(*) и OFFSET, поэтому глубина прокрутки на стоимость не влияет.
+    keys — поля или аннотации с теми же значениями, что pub_date и id
+    поста, по которым запросу удобнее сортировать.
+    """
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'id')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.date_key, self.id_key = keys
+
+    def get_page(self, after=None, before=None):
+        after_key = decode_cursor(after)
+        before_key = decode_cursor(before)
+        if before_key is not None and after_key is None:
+            return LazyCursorPage(lambda: self._page_before(*before_key))
+        return LazyCursorPage(lambda: self._page_after(after_key))
+
+    def _beyond(self, key, lookup):
+        pub_date, pk = key
+        return Q(**{f'{self.date_key}__{lookup}': pub_date}) | Q(
+            **{self.date_key: pub_date, f'{self.id_key}__{lookup}': pk})
+
+    def _page_after(self, key):
+        queryset = self.object_list.order_by(
+            f'-{self.date_key}', f'-{self.id_key}')
+        if key is not None:
+            queryset = queryset.filter(self._beyond(key, 'lt'))
+        items = list(queryset[:self.per_page + 1])
+        has_next = len(items) > self.per_page
+        return items[:self.per_page], has_next, key is not None
+
+    def _page_before(self, pub_date, pk):
+        queryset = self.object_list.order_by(
+            self.date_key, self.id_key).filter(
+                self._beyond((pub_date, pk), 'gt'))
+        items = list(queryset[:self.per_page + 1])
+        has_previous = len(items) > self.per_page
+        items = items[:self.per_page]
+        items.reverse()
+        return items, True, has_previous
+
+
+def get_feed_page(request, post_list, per_page, keys=('pub_date', 'id')):
+    """Возвращает (page, paginator) для ленты постов.
+
+    Курсорный режим включается параметрами ?after=/?before= или
+    настройкой POSTS_CURSOR_PAGINATION, иначе работает обычный Paginator.
+    """
+    if getattr(settings, 'POSTS_CURSOR_PAGINATION', False) or any(
+            param in request.GET for param in CURSOR_PARAMS):
+        paginator = CursorPaginator(post_list, per_page, keys)
+        page = paginator.get_page(after=request.GET.get('after'),
+                                  before=request.GET.get('before'))
+        return page, paginator
+
+    paginator = Paginator(post_list, per_page)
+    page = paginator.get_page(request.GET.get('page'))
+    return page, paginator
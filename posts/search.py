@@ -0,0 +1,276 @@
+import base64
+import binascii
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, Count, F, FloatField, Q, Sum, When
+
+from .models import Post, Comment, SearchPosting
+from .pagination import CursorPage
+
+
+FTS_TABLE = 'posts_search_fts'
+WORD_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 10
+
+
+def tokenize(text):
+    return [word for word in WORD_RE.findall(text.lower())
+            if len(word) <= MAX_TERM_LENGTH]
+
+
+def query_terms(query):
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+
+
+def encode_rank_cursor(score, post_id):
+    raw = f'{score!r}|{post_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_rank_cursor(token):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        score, post_id = raw.decode().split('|')
+        return float(score), int(post_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+class Fts5Backend:
+    """Индекс в виртуальной таблице SQLite FTS5, ранжирование bm25.
+
+    rowid строки — id * 2 для поста и id * 2 + 1 для комментария, так
+    что обновление и удаление идут по первичному ключу.
+    """
+    name = 'fts5'
+
+    @staticmethod
+    def _rowid(kind, object_id):
+        return object_id * 2 + kind
+
+    @staticmethod
+    def _match(terms):
+        return ' '.join('"{}"'.format(term.replace('"', '""'))
+                        for term in terms)
+
+    def index(self, kind, object_id, post_id, text, created=False):
+        rowid = self._rowid(kind, object_id)
+        with connection.cursor() as cursor:
+            if not created:
+                cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                               [rowid])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text, post_id) '
+                f'VALUES (%s, %s, %s)', [rowid, text, post_id])
+
+    def remove(self, kind, object_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [self._rowid(kind, object_id)])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def rank(self, terms, limit, after=None):
+        # bm25() нельзя звать внутри агрегата, поэтому сначала ранжируем
+        # документы, а потом берем лучший документ для каждого поста.
+        # LIMIT -1 не дает SQLite развернуть подзапрос во внешний.
+        sql = (f'SELECT post_id, MIN(score) AS score FROM ('
+               f'SELECT post_id, bm25({FTS_TABLE}) AS score '
+               f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT -1'
+               f') GROUP BY post_id')
+        params = [self._match(terms)]
+        if after is not None:
+            sql += ' HAVING score > %s OR (score = %s AND post_id > %s)'
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY score, post_id LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def filter_matching(self, queryset, terms, kind):
+        quote = connection.ops.quote_name
+        pk = '{}.{}'.format(quote(queryset.model._meta.db_table),
+                            quote(queryset.model._meta.pk.column))
+        return queryset.extra(
+            where=[f'{pk} IN (SELECT rowid / 2 FROM {FTS_TABLE} '
+                   f'WHERE {FTS_TABLE} MATCH %s AND rowid %% 2 = %s)'],
+            params=[self._match(terms), kind])
+
+
+class InvertedIndexBackend:
+    """Обратный индекс в обычной таблице: токенизация в Python,
+    ранжирование tf-idf агрегатом в базе."""
+    name = 'inverted'
+
+    def index(self, kind, object_id, post_id, text, created=False):
+        if not created:
+            self.remove(kind, object_id)
+        SearchPosting.objects.bulk_create([
+            SearchPosting(term=term, kind=kind, object_id=object_id,
+                          post_id=post_id, frequency=frequency)
+            for term, frequency in Counter(tokenize(text)).items()])
+
+    def remove(self, kind, object_id):
+        SearchPosting.objects.filter(kind=kind, object_id=object_id).delete()
+
+    def clear(self):
+        SearchPosting.objects.all().delete()
+
+    def _scored(self, terms, kind=None):
+        postings = SearchPosting.objects.filter(term__in=terms)
+        if kind is not None:
+            postings = postings.filter(kind=kind)
+        document_frequency = dict(
+            postings.order_by().values_list('term').annotate(
+                Count('post', distinct=True)))
+        if len(document_frequency) < len(terms):
+            return None
+        total = Post.objects.count() or 1
+        # Отрицательный вес: меньше — лучше, как у bm25 в FTS5.
+        weight = Case(
+            *[When(term=term, then=-math.log(1 + total / frequency))
+              for term, frequency in document_frequency.items()],
+            output_field=FloatField())
+        return postings, weight
+
+    def rank(self, terms, limit, after=None):
+        scored = self._scored(terms)
+        if scored is None:
+            return []
+        postings, weight = scored
+        ranked = postings.values('post_id').annotate(
+            score=Sum(F('frequency') * weight, output_field=FloatField()),
+            matched=Count('term', distinct=True),
+        ).filter(matched=len(terms))
+        if after is not None:
+            score, post_id = after
+            ranked = ranked.filter(
+                Q(score__gt=score) | Q(score=score, post_id__gt=post_id))
+        return list(ranked.order_by('score', 'post_id').values_list(
+            'post_id', 'score')[:limit])
+
+    def filter_matching(self, queryset, terms, kind):
+        return queryset.filter(pk__in=SearchPosting.objects.filter(
+            term__in=terms, kind=kind).values('object_id').annotate(
+            matched=Count('term', distinct=True),
+        ).filter(matched=len(terms)).values('object_id'))
+
+
+_fts_tables = {}
+
+
+def fts5_available():
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts_tables:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                "AND name = %s", [FTS_TABLE])
+            _fts_tables[name] = cursor.fetchone() is not None
+    return _fts_tables[name]
+
+
+def get_backend():
+    """SEARCH_BACKEND: 'fts5', 'inverted' или 'auto' (FTS5, если есть)."""
+    choice = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    if choice == 'fts5' or (choice == 'auto' and fts5_available()):
+        return Fts5Backend()
+    return InvertedIndexBackend()
+
+
+def index_post(post, created=False):
+    """created=True — объект новый, старую запись можно не удалять."""
+    get_backend().index(SearchPosting.POST, post.pk, post.pk, post.text,
+                        created)
+
+
+def index_comment(comment, created=False):
+    get_backend().index(SearchPosting.COMMENT, comment.pk, comment.post_id,
+                        comment.text, created)
+
+
+def remove_post(post_id):
+    get_backend().remove(SearchPosting.POST, post_id)
+
+
+def remove_comment(comment_id):
+    get_backend().remove(SearchPosting.COMMENT, comment_id)
+
+
+class SearchPage(CursorPage):
+    """Страница выдачи; курсор — (ранг, id) последнего поста."""
+
+    def __init__(self, object_list, scores, has_next):
+        super().__init__(object_list, has_next, False)
+        self.scores = scores
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return encode_rank_cursor(self.scores[-1],
+                                      self.object_list[-1].pk)
+        return None
+
+
+def search_posts(query, per_page, after=None):
+    """Посты, в тексте которых или в комментариях к которым есть все
+    слова запроса, по убыванию релевантности."""
+    terms = query_terms(query)
+    if not terms:
+        return SearchPage([], [], False)
+    ranked = get_backend().rank(terms, per_page + 1,
+                                decode_rank_cursor(after))
+    has_next = len(ranked) > per_page
+    ranked = ranked[:per_page]
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [post_id for post_id, _ in ranked])
+    hits = [(posts[post_id], score) for post_id, score in ranked
+            if post_id in posts]
+    return SearchPage([post for post, _ in hits],
+                      [score for _, score in hits], has_next)
+
+
+def filter_matching(queryset, query, kind):
+    """Оставляет в queryset постов или комментариев все записи со всеми
+    словами запроса: индекс читается подзапросом, без ограничения
+    числа найденных."""
+    terms = query_terms(query)
+    if not terms:
+        return queryset.none()
+    return get_backend().filter_matching(queryset, terms, kind)
+
+
+def rebuild(batch_size=1000, posts=None):
+    """Переиндексирует пачками все посты и комментарии или, если задан
+    QuerySet posts, только эти посты и комментарии к ним."""
+    backend = get_backend()
+    if posts is None:
+        backend.clear()
+        querysets = ((SearchPosting.POST, Post.objects.all()),
+                     (SearchPosting.COMMENT, Comment.objects.all()))
+    else:
+        querysets = ((SearchPosting.POST, posts),
+                     (SearchPosting.COMMENT,
+                      Comment.objects.filter(post__in=posts.values('pk'))))
+    indexed = 0
+    for kind, queryset in querysets:
+        post_field = 'pk' if kind == SearchPosting.POST else 'post_id'
+        rows = queryset.order_by('pk').values_list('pk', post_field, 'text')
+        for object_id, post_id, text in rows.iterator(chunk_size=batch_size):
+            # После clear() старых записей нет, иначе их надо заменить.
+            backend.index(kind, object_id, post_id, text,
+                          created=posts is None)
+            indexed += 1
+    return indexed
@@ -0,0 +1,155 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import counters, feed_cache, search, stats, timeline
+from .images import delete_image
+from .models import Post, Group, Comment, Follow, User
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.bump(instance.author_id, post_count=1)
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    stats.bump(instance.author_id, post_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.bump(instance.author_id, follower_count=1)
+        stats.bump(instance.user_id, following_count=1)
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def purge_timeline(sender, instance, **kwargs):
+    stats.bump(instance.author_id, follower_count=-1)
+    stats.bump(instance.user_id, following_count=-1)
+    timeline.purge(instance.user_id, instance.author_id)
+    timeline.follower_removed(instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.comment_added(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.comment_removed(instance.post_id)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_post(sender, instance, raw=False, **kwargs):
+    if instance.pk is None or raw:
+        return
+    previous = Post.objects.filter(pk=instance.pk).values_list(
+        'group_id', 'image', 'image_variants').first()
+    if previous is not None:
+        instance._previous_group_id = previous[0]
+        instance._previous_image = previous[1:]
+
+
+@receiver(post_save, sender=Post)
+def delete_replaced_image(sender, instance, raw=False, **kwargs):
+    # Файлы удаляются после коммита: при откате пост остается со
+    # старой картинкой.
+    name, raw_variants = getattr(instance, '_previous_image', ('', ''))
+    if not raw and name and name != instance.image.name:
+        transaction.on_commit(lambda: delete_image(name, raw_variants))
+
+
+@receiver(post_delete, sender=Post)
+def delete_post_image(sender, instance, **kwargs):
+    if instance.image:
+        name, raw_variants = instance.image.name, instance.image_variants
+        transaction.on_commit(lambda: delete_image(name, raw_variants))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    scopes = feed_cache.post_scopes(instance)
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id not in (None, instance.group_id):
+        scopes.append(feed_cache.group_scope(previous_group_id))
+    feed_cache.bump(*scopes)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_feeds(sender, instance, raw=False, **kwargs):
+    if Comment.post.is_cached(instance):
+        post = instance.post
+    else:
+        post = Post.objects.filter(pk=instance.post_id).first()
+    if post is not None and not raw:
+        feed_cache.bump(*feed_cache.post_scopes(post))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_feeds(sender, instance, raw=False, created=False,
+                           **kwargs):
+    # Название группы выводится и на страницах постов, профилей и в
+    # лентах подписок: все они зависят от поколений авторов. Посты
+    # удаленной группы удаляются каскадом и сбрасывают их сами.
+    if raw:
+        return
+    author_ids = () if created else Post.objects.filter(
+        group_id=instance.pk).values_list('author_id', flat=True).distinct()
+    feed_cache.bump(
+        feed_cache.GLOBAL, feed_cache.group_scope(instance.pk),
+        *(feed_cache.author_scope(author_id) for author_id in author_ids))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_author_pages(sender, instance, raw=False,
+                            update_fields=None, **kwargs):
+    # Страницы автора кэшируются по имени: после переименования или
+    # удаления старая копия не должна отдаваться. Вход пользователя
+    # меняет только last_login.
+    if not raw and set(update_fields or ()) != {'last_login'}:
+        feed_cache.bump(feed_cache.author_scope(instance.pk))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        # Счетчики подписок видны в карточках обоих авторов.
+        feed_cache.bump(feed_cache.follower_scope(instance.user_id),
+                        feed_cache.author_scope(instance.author_id),
+                        feed_cache.author_scope(instance.user_id))
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, created=False, raw=False, **kwargs):
+    if not raw:
+        search.index_post(instance, created)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, created=False, raw=False, **kwargs):
+    if not raw:
+        search.index_comment(instance, created)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    search.remove_comment(instance.pk)
@@ -0,0 +1,117 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Post, Follow, AuthorStats
+
+
+User = get_user_model()
+
+STAT_FIELDS = ('post_count', 'follower_count', 'following_count')
+
+
+def _count(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(total=Count('id')).values('total')), 0)
+
+
+def with_actual_stats(users):
+    """Аннотирует пользователей честно посчитанными значениями."""
+    return users.annotate(
+        actual_post_count=_count(Post.objects, 'author'),
+        actual_follower_count=_count(Follow.objects, 'author'),
+        actual_following_count=_count(Follow.objects, 'user'),
+    )
+
+
+def compute(user_id):
+    user = with_actual_stats(User.objects.filter(pk=user_id)).get()
+    return {field: getattr(user, f'actual_{field}') for field in STAT_FIELDS}
+
+
+def bump(user_id, **deltas):
+    """Атомарно меняет счетчики пользователя на заданные приращения.
+
+    Если записи еще нет, она создается с пересчитанными значениями:
+    сигнал приходит после сохранения, так что пересчет уже учитывает
+    изменение. Отрицательные приращения запись не создают — так удаление
+    пользователя каскадом не воскрешает его статистику.
+    """
+    updates = {field: Greatest(F(field) + delta, 0)
+               for field, delta in deltas.items()}
+    if AuthorStats.objects.filter(user_id=user_id).update(**updates):
+        return
+    if all(delta < 0 for delta in deltas.values()):
+        return
+    try:
+        with transaction.atomic():
+            AuthorStats.objects.create(user_id=user_id, **compute(user_id))
+    except IntegrityError:
+        AuthorStats.objects.filter(user_id=user_id).update(**updates)
+
+
+def get_stats(user):
+    """Счетчики автора; пользователь, загруженный через
+    select_related('stats'), не стоит ни одного запроса."""
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        stats, _ = AuthorStats.objects.get_or_create(
+            user_id=user.pk, defaults=compute(user.pk))
+        user.stats = stats
+        return stats
+
+
+def _user_batches(batch_size, user_ids=None):
+    if user_ids is not None:
+        user_ids = sorted(user_ids)
+        for start in range(0, len(user_ids), batch_size):
+            yield list(with_actual_stats(User.objects.filter(
+                pk__in=user_ids[start:start + batch_size]).order_by('pk')
+            ).select_related('stats'))
+        return
+    last_pk = 0
+    while True:
+        users = list(with_actual_stats(
+            User.objects.filter(pk__gt=last_pk).order_by('pk')
+        ).select_related('stats')[:batch_size])
+        if not users:
+            return
+        yield users
+        last_pk = users[-1].pk
+
+
+def check_stats(fix=False, batch_size=1000, user_ids=None):
+    """Сверяет счетчики с реальными данными пачками пользователей.
+
+    Возвращает список id пользователей с расхождениями; при fix=True
+    исправляет их одним bulk_update/bulk_create на пачку. user_ids —
+    проверить только этих пользователей, а не всех.
+    """
+    drifted = []
+    for users in _user_batches(batch_size, user_ids):
+        to_update, to_create = [], []
+        for user in users:
+            actual = {field: getattr(user, f'actual_{field}')
+                      for field in STAT_FIELDS}
+            try:
+                stats = user.stats
+            except AuthorStats.DoesNotExist:
+                if not any(actual.values()):
+                    continue
+                drifted.append(user.pk)
+                to_create.append(AuthorStats(user=user, **actual))
+                continue
+            if any(getattr(stats, field) != value
+                   for field, value in actual.items()):
+                drifted.append(user.pk)
+                for field, value in actual.items():
+                    setattr(stats, field, value)
+                to_update.append(stats)
+        if fix:
+            with transaction.atomic():
+                AuthorStats.objects.bulk_update(to_update, STAT_FIELDS)
+                AuthorStats.objects.bulk_create(to_create)
+    return drifted
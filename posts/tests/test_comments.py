@@ -0,0 +1,97 @@
+import base64
+import datetime
+
+from django.core.cache import cache
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.counters import recount_comments
+from posts.models import Post, Comment, User
+from . import constants as c
+
+
+@override_settings(POSTS_COMMENTS_PAGE_SIZE=3)
+class CommentPagesTest(TestCase):
+
+    COMMENTS_COUNT = 8
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username=c.USERNAME_AUTHOR)
+        self.post = Post.objects.create(text='Пост', author=self.author)
+        Comment.objects.bulk_create([Comment(
+            post=self.post, author=self.author, text=f'Комментарий {i}')
+            for i in range(self.COMMENTS_COUNT)])
+        # Половина комментариев с одинаковым временем: порядок держит id.
+        moment = timezone.now() - datetime.timedelta(hours=1)
+        Comment.objects.filter(
+            pk__in=Comment.objects.order_by('id').values('id')[:4]).update(
+                created=moment)
+        recount_comments()
+        self.post_url = reverse('post', args=[self.author.username,
+                                              self.post.pk])
+        self.comments_url = reverse(
+            'post_comments', args=[self.author.username, self.post.pk])
+
+    def test_post_page_shows_first_page(self):
+        """Страница поста показывает первую страницу и кнопку продолжения."""
+        response = self.client.get(self.post_url)
+        comments = response.context['comments']
+        self.assertIsInstance(comments, QuerySet)
+        self.assertEqual(len(comments), 3)
+        self.assertContains(response, self.comments_url + '?after=' +
+                            response.context['comments_cursor'])
+
+    def test_load_more_walks_whole_thread(self):
+        """«Показать ещё» отдает все комментарии по (created, id)
+        без повторов и пропусков."""
+        response = self.client.get(self.post_url)
+        cursor = response.context['comments_cursor']
+        seen = list(response.context['comments'])
+        while cursor:
+            response = self.client.get(self.comments_url, {'after': cursor})
+            seen.extend(response.context['comments'])
+            cursor = response.context['comments_cursor']
+        expected = list(Comment.objects.order_by('created', 'id'))
+        self.assertEqual(seen, expected)
+
+    def test_json_format(self):
+        """?format=json возвращает страницу и курсор следующей."""
+        cursor = self.client.get(self.post_url).context['comments_cursor']
+        data = self.client.get(
+            self.comments_url, {'after': cursor, 'format': 'json'}).json()
+        self.assertEqual(len(data['comments']), 3)
+        self.assertEqual(data['comments'][0]['author'], self.author.username)
+        last = self.client.get(self.comments_url, {
+            'after': data['next'], 'format': 'json'}).json()
+        self.assertEqual(len(last['comments']), 2)
+        self.assertIsNone(last['next'])
+
+    def test_bad_cursor_returns_first_page(self):
+        """Битый токен или токен вне диапазона дает первую страницу."""
+        first = self.client.get(self.comments_url, {'format': 'json'}).json()
+        huge = base64.urlsafe_b64encode(
+            b'99999999999999999999999.1').decode().rstrip('=')
+        for token in ('!!!', huge):
+            with self.subTest(token=token):
+                response = self.client.get(
+                    self.comments_url, {'after': token, 'format': 'json'})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), first)
+
+    def test_fragment_has_no_layout(self):
+        """Фрагмент — только комментарии, без шапки сайта."""
+        response = self.client.get(self.comments_url)
+        self.assertTemplateUsed(response, 'comment_page.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+
+    def test_missing_post_is_404(self):
+        """Чужой или несуществующий пост — 404."""
+        other = User.objects.create(username=c.USERNAME)
+        for url in (reverse('post_comments', args=[other.username,
+                                                   self.post.pk]),
+                    reverse('post_comments', args=['nobody', self.post.pk])):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,82 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, Group, Comment, Follow, User
+from . import constants as c
+
+
+@override_settings(PAGE_CACHE_VIEWS=())
+class ConditionalGetTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username=c.USERNAME_AUTHOR)
+        self.reader = User.objects.create(username=c.USERNAME)
+        self.group = Group.objects.create(
+            title='Группа', slug=c.SLUG, description='Описание')
+        self.post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group)
+        self.post_url = reverse('post', args=[self.author.username,
+                                              self.post.pk])
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_pages_return_304(self):
+        """Повторный запрос с ETag неизменной страницы — 304 без тела."""
+        for url in (c.INDEX_URL, c.GROUP_URL, c.PROFILE_AUTHOR_URL,
+                    self.post_url):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('Last-Modified', response)
+                with self.assertNumQueries(0 if url == c.INDEX_URL else 1):
+                    repeated = self.revalidate(url, response)
+                self.assertEqual(repeated.status_code, 304)
+                self.assertEqual(repeated.content, b'')
+
+    def test_if_modified_since(self):
+        """Клиент без ETag получает 304 по Last-Modified."""
+        response = self.client.get(c.INDEX_URL)
+        repeated = self.client.get(
+            c.INDEX_URL, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(repeated.status_code, 304)
+
+    def test_writes_change_validators(self):
+        """Комментарий и правка поста меняют ETag страниц, где он виден."""
+        index = self.client.get(c.INDEX_URL)
+        post = self.client.get(self.post_url)
+        Comment.objects.create(post=self.post, author=self.reader, text='1')
+        self.assertEqual(self.revalidate(c.INDEX_URL, index).status_code, 200)
+        self.assertEqual(self.revalidate(self.post_url, post).status_code, 200)
+
+        group = self.client.get(c.GROUP_URL)
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        self.assertContains(self.revalidate(c.GROUP_URL, group),
+                            'Исправленный пост')
+
+    def test_viewer_is_part_of_etag(self):
+        """Анонимная копия страницы не подходит вошедшему пользователю,
+        а подписка меняет кнопку на странице автора."""
+        anonymous = self.client.get(c.PROFILE_AUTHOR_URL)
+        self.client.force_login(self.reader)
+        profile = self.client.get(c.PROFILE_AUTHOR_URL)
+        self.assertNotEqual(anonymous['ETag'], profile['ETag'])
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            self.revalidate(c.PROFILE_AUTHOR_URL, profile).status_code, 200)
+
+    def test_follow_feed(self):
+        """Лента подписок обновляется после новой подписки."""
+        self.client.force_login(self.reader)
+        url = reverse('follow_index')
+        response = self.client.get(url)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertContains(self.revalidate(url, response), 'Пост')
+
+    def test_missing_author_is_404(self):
+        """Профиль несуществующего автора — 404."""
+        self.assertEqual(self.client.get(
+            reverse('profile', args=['nobody'])).status_code, 404)
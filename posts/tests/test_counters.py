@@ -0,0 +1,41 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Post, Comment, User
+
+
+class CommentCountTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='author')
+        self.post = Post.objects.create(text='Пост', author=self.user)
+        self.client.force_login(self.user)
+
+    def test_add_and_delete_comment_update_counter(self):
+        """add_comment и удаление комментария меняют счетчик."""
+        self.client.post(
+            reverse('add_comment', args=[self.user, self.post.id]),
+            data={'text': 'Комментарий'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        Comment.objects.get().delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_rebuild_command_fixes_drift(self):
+        """Команда пересчета восстанавливает счетчики."""
+        Comment.objects.create(post=self.post, author=self.user, text='1')
+        Comment.objects.create(post=self.post, author=self.user, text='2')
+        Post.objects.update(comment_count=42)
+        call_command('rebuild_comment_counts', batch_size=1, stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+
+    def test_feed_renders_counter(self):
+        """Лента показывает счетчик без запросов к комментариям."""
+        Comment.objects.create(post=self.post, author=self.user, text='1')
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'Комментариев: 1')
@@ -0,0 +1,130 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import exporter
+from posts.models import Post, Group, Comment, User
+
+
+EXPORT_URL = reverse('export')
+
+
+def jsonl(content):
+    return [json.loads(line) for line in content.decode().splitlines()]
+
+
+class ExportTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.other = User.objects.create(username='other')
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.posts = [
+            Post.objects.create(text=f'Пост {number}', author=cls.author,
+                                group=cls.group if number % 2 else None)
+            for number in range(5)]
+        cls.foreign = Post.objects.create(text='Чужой', author=cls.other)
+        cls.comment = Comment.objects.create(
+            post=cls.posts[0], author=cls.other, text='Комментарий')
+
+    def export(self, **params):
+        self.client.force_login(self.staff)
+        response = self.client.get(EXPORT_URL, params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_staff_only(self):
+        """Выгрузка доступна только персоналу."""
+        response = self.client.get(EXPORT_URL)
+        self.assertEqual(response.status_code, 302)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(EXPORT_URL).status_code, 302)
+
+    def test_author_export_is_gzipped_jsonl(self):
+        """Посты автора и комментарии к ним приходят сжатыми в gzip."""
+        response, content = self.export(author='author')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('yatube-author-author.jsonl.gz',
+                      response['Content-Disposition'])
+        rows = jsonl(gzip.decompress(content))
+        self.assertEqual([row['id'] for row in rows if row['type'] == 'post'],
+                         [post.pk for post in self.posts])
+        self.assertEqual(rows[-1], {
+            'type': 'comment', 'post': self.posts[0].pk, 'author': 'other',
+            'text': 'Комментарий',
+            'created': self.comment.created.isoformat()})
+
+    def test_group_export_as_plain_csv(self):
+        """CSV без сжатия по запросу, выборка по группе."""
+        response, content = self.export(group='group', format='csv', gzip=0)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = [row for row in csv.DictReader(io.StringIO(content.decode()))
+                if row['type'] == 'post']
+        self.assertEqual([int(row['id']) for row in rows],
+                         [self.posts[1].pk, self.posts[3].pk])
+        self.assertEqual(rows[0]['group'], 'group')
+
+    def test_unknown_format_and_scope(self):
+        """Неизвестный формат — 400, несуществующий автор — 404."""
+        self.client.force_login(self.staff)
+        self.assertEqual(
+            self.client.get(EXPORT_URL, {'format': 'xml'}).status_code, 400)
+        self.assertEqual(
+            self.client.get(EXPORT_URL, {'author': 'nobody'}).status_code,
+            404)
+
+    def test_keyset_batches_cover_all_rows(self):
+        """Пачки по ключу выдают все строки без повторов."""
+        rows = list(exporter.records(batch_size=2))
+        self.assertEqual(
+            [row['id'] for row in rows if row['type'] == 'post'],
+            [post.pk for post in self.posts] + [self.foreign.pk])
+        self.assertEqual(len(rows), 10)
+
+    def test_command_writes_file(self):
+        """Команда export_content сжимает файл по расширению .gz."""
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'all.jsonl.gz')
+        call_command('export_content', path, stdout=io.StringIO())
+        with gzip.open(path) as dump:
+            rows = jsonl(dump.read())
+        os.remove(path)
+        os.rmdir(directory)
+        posts = [row for row in rows if row['type'] == 'post']
+        self.assertEqual(len(posts), Post.objects.count())
+        self.assertEqual(posts[0]['pub_date'],
+                         self.posts[0].pub_date.isoformat())
+
+    def test_export_imports_into_empty_database(self):
+        """Выгрузка автора с чужими комментариями загружается в пустую
+        базу: авторы и группы выгружаются вместе с постами."""
+        _, content = self.export(author='author', gzip=0)
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'author.jsonl')
+        with open(path, 'wb') as dump:
+            dump.write(content)
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        stderr = io.StringIO()
+        call_command('import_content', path, stdout=io.StringIO(),
+                     stderr=stderr)
+        os.remove(path)
+        os.rmdir(directory)
+        self.assertEqual(stderr.getvalue(), '')
+        self.assertEqual(Post.objects.count(), len(self.posts))
+        comment = Comment.objects.get()
+        self.assertEqual(comment.author.username, 'other')
+        self.assertEqual(comment.post.group, None)
+        self.assertEqual(
+            set(User.objects.values_list('username', flat=True)),
+            {'author', 'other'})
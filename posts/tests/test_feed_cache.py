@@ -0,0 +1,109 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import feed_cache
+from posts.models import Post, Group, Comment, Follow, User
+from . import constants as c
+
+
+class FeedCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='author')
+        self.group = Group.objects.create(
+            title='Группа', slug=c.SLUG, description='Описание')
+        self.other_group = Group.objects.create(
+            title='Другая', slug='other', description='Описание')
+
+    def test_pages_are_cached_separately(self):
+        """Вторая страница не отдает закэшированную первую."""
+        posts = [Post.objects.create(text=f'Пост номер {i}', author=self.user)
+                 for i in range(11)]
+        self.client.get(c.INDEX_URL)
+        response = self.client.get(c.INDEX_URL + '?page=2')
+        self.assertContains(response, posts[0].text)
+        self.assertNotContains(response, posts[-1].text)
+
+    def test_new_post_invalidates_index(self):
+        """Новый пост сразу виден на закэшированной главной."""
+        self.client.get(c.INDEX_URL)
+        Post.objects.create(text='Свежий пост', author=self.user)
+        self.assertContains(self.client.get(c.INDEX_URL), 'Свежий пост')
+
+    def test_comment_invalidates_feed(self):
+        """Комментарий обновляет счетчик в закэшированной ленте."""
+        post = Post.objects.create(text='Пост', author=self.user)
+        self.client.get(c.INDEX_URL)
+        Comment.objects.create(post=post, author=self.user, text='1')
+        self.assertContains(self.client.get(c.INDEX_URL), 'Комментариев: 1')
+
+    def test_only_affected_generations_move(self):
+        """Пост в одной группе не сбрасывает кэш другой группы."""
+        group_scope = feed_cache.group_scope(self.group.pk)
+        other_scope = feed_cache.group_scope(self.other_group.pk)
+        before = feed_cache.generations(group_scope, other_scope)
+        Post.objects.create(text='Пост', author=self.user, group=self.group)
+        after = feed_cache.generations(group_scope, other_scope)
+        self.assertNotEqual(before[0], after[0])
+        self.assertEqual(before[1], after[1])
+
+    def test_moving_post_invalidates_old_group(self):
+        """Перенос поста в другую группу сбрасывает кэш обеих групп."""
+        post = Post.objects.create(text='Пост', author=self.user,
+                                   group=self.group)
+        self.client.get(reverse('group', args=[c.SLUG]))
+        post.group = self.other_group
+        post.save()
+        response = self.client.get(reverse('group', args=[c.SLUG]))
+        self.assertNotContains(response, 'name="post_')
+
+    def test_post_scopes_do_not_load_followers(self):
+        """Области поста не зависят от числа подписчиков автора."""
+        for i in range(3):
+            Follow.objects.create(
+                user=User.objects.create(username=f'reader{i}'),
+                author=self.user)
+        post = Post.objects.create(text='Пост', author=self.user)
+        with self.assertNumQueries(0):
+            scopes = feed_cache.post_scopes(post)
+        self.assertNotIn(feed_cache.follower_scope(post.author_id), scopes)
+
+    def test_new_post_invalidates_follow_feed(self):
+        """Пост автора сразу виден в закэшированной ленте подписчика."""
+        reader = User.objects.create(username='reader')
+        Follow.objects.create(user=reader, author=self.user)
+        self.client.force_login(reader)
+        self.client.get(reverse('follow_index'))
+        Post.objects.create(text='Свежий пост', author=self.user)
+        self.assertContains(self.client.get(reverse('follow_index')),
+                            'Свежий пост')
+
+    @override_settings(POSTS_CURSOR_PAGINATION=True, PAGE_CACHE_VIEWS=())
+    def test_cached_cursor_page_skips_feed_query(self):
+        """В курсорном режиме закэшированный фрагмент не читает посты."""
+        for i in range(11):
+            Post.objects.create(text=f'Пост номер {i}', author=self.user)
+        first = self.client.get(c.INDEX_URL)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(c.INDEX_URL)
+        self.assertEqual(second.content, first.content)
+        self.assertFalse(
+            [query['sql'] for query in queries.captured_queries
+             if 'FROM "posts_post"' in query['sql']])
+
+    def test_group_rename_invalidates_author_pages(self):
+        """Новое название группы сразу видно на странице поста и профиля."""
+        post = Post.objects.create(text='Пост', author=self.user,
+                                   group=self.group)
+        urls = [reverse('profile', args=[self.user.username]),
+                reverse('post', args=[self.user.username, post.pk])]
+        for url in urls:
+            self.client.get(url)
+        self.group.title = 'Переименованная'
+        self.group.save()
+        for url in urls:
+            self.assertContains(self.client.get(url), '#Переименованная')
@@ -0,0 +1,185 @@
+import json
+import shutil
+import tempfile
+from io import BytesIO
+
+from PIL import Image
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.forms import PostForm
+from posts.images import build_variants, process
+from posts.models import Post, User
+from . import constants as c
+
+
+def make_upload(name, size, image_format, **save_options):
+    buffer = BytesIO()
+    Image.new('RGB', size, color=(200, 10, 10)).save(
+        buffer, image_format, **save_options)
+    return SimpleUploadedFile(name, buffer.getvalue(),
+                              content_type=f'image/{image_format.lower()}')
+
+
+@override_settings(POSTS_IMAGE_MAX_SIZE=(64, 64))
+class ImageIngestionTest(TestCase):
+
+    def test_large_jpeg_is_downscaled_and_stripped(self):
+        """Большой JPEG уменьшается, EXIF удаляется."""
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        upload = make_upload('photo.jpeg', (400, 200), 'JPEG',
+                             exif=exif.tobytes())
+        result = Image.open(process(upload))
+        self.assertEqual(result.size, (64, 32))
+        self.assertNotIn('exif', result.info)
+
+    def test_small_gif_is_kept_as_is(self):
+        """Маленький GIF сохраняется без перекодирования."""
+        upload = SimpleUploadedFile('small.gif', c.SMALL_GIF,
+                                    content_type='image/gif')
+        self.assertIs(process(upload), upload)
+
+    @override_settings(POSTS_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels_rejected_before_decode(self):
+        """Картинка с огромным растром отклоняется по заголовку."""
+        upload = make_upload('huge.png', (20, 20), 'PNG')
+        with self.assertRaises(ValidationError):
+            process(upload)
+
+    def test_truncated_image_rejected(self):
+        """Обрезанный файл с целым заголовком — ошибка формы, а не 500."""
+        data = make_upload('photo.jpg', (400, 400), 'JPEG').read()[:1500]
+        with self.assertRaises(ValidationError) as raised:
+            process(SimpleUploadedFile('photo.jpg', data))
+        self.assertEqual(raised.exception.code, 'invalid_image')
+        form = PostForm(data={'text': 'Текст'}, files={
+            'image': SimpleUploadedFile('photo.jpg', data,
+                                        content_type='image/jpeg')})
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+    def test_form_stores_processed_image(self):
+        """PostForm отдает модели уже обработанный файл."""
+        form = PostForm(data={'text': 'Текст'}, files={
+            'image': make_upload('photo.bmp', (300, 300), 'BMP')})
+        self.assertTrue(form.is_valid(), form.errors)
+        image = form.cleaned_data['image']
+        self.assertEqual(image.name, 'photo.jpg')
+        self.assertEqual(Image.open(image).size, (64, 64))
+        self.assertEqual(
+            (form.instance.image_width, form.instance.image_height),
+            (64, 64))
+
+
+@override_settings(POSTS_IMAGE_VARIANT_WIDTHS=(100, 200),
+                   POSTS_IMAGE_CARD_ASPECT=(2, 1))
+class ImageVariantsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_variants_render_srcset_without_file_io(self):
+        """Карточка берет srcset и размеры из сохраненных вариантов."""
+        name = default_storage.save(
+            'posts/photo.jpg', make_upload('photo.jpg', (500, 400), 'JPEG'))
+        variants = build_variants(name)
+        self.assertEqual((variants.pop('width'), variants.pop('height')),
+                         (500, 400))
+        self.assertEqual([width for width, _, _ in variants['webp']],
+                         [100, 200])
+        user = User.objects.create(username='author')
+        post = Post.objects.create(
+            text='Пост', author=user, image=name,
+            image_variants=json.dumps(variants))
+        response = self.client.get(reverse('post', args=[user, post.id]))
+        self.assertContains(response, 'photo_200w.webp 200w')
+        self.assertContains(response, 'width="200" height="100"')
+        self.assertContains(response, 'loading="lazy"')
+
+    def test_small_image_is_not_upscaled(self):
+        """Варианты шире оригинала не строятся."""
+        name = default_storage.save(
+            'posts/small.jpg', make_upload('small.jpg', (150, 100), 'JPEG'))
+        variants = build_variants(name)
+        self.assertEqual([width for width, _, _ in variants['jpeg']], [100])
+        name = default_storage.save(
+            'posts/tiny.jpg', make_upload('tiny.jpg', (40, 40), 'JPEG'))
+        self.assertEqual(build_variants(name)['jpeg'][0][:2], [40, 20])
+
+    @override_settings(PAGE_CACHE_VIEWS=())
+    def test_cleared_image_drops_variants(self):
+        """После удаления картинки лента не показывает ее варианты."""
+        name = default_storage.save(
+            'posts/cleared.jpg',
+            make_upload('cleared.jpg', (500, 400), 'JPEG'))
+        variants = build_variants(name)
+        user = User.objects.create(username='author')
+        post = Post.objects.create(
+            text='Пост', author=user, image=name,
+            image_width=variants.pop('width'),
+            image_height=variants.pop('height'),
+            image_variants=json.dumps(variants))
+        self.assertContains(self.client.get(reverse('index')), '<picture>')
+
+        self.client.force_login(user)
+        self.client.post(reverse('post_edit', args=[user, post.id]),
+                         {'text': 'Пост', 'image-clear': 'on'})
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, '')
+        self.assertEqual(
+            (post.image_width, post.image_height, post.image_variants),
+            (None, None, ''))
+        self.assertNotContains(self.client.get(reverse('index')),
+                               '<picture>')
+
+
+@override_settings(POSTS_IMAGE_VARIANT_WIDTHS=(100,),
+                   POSTS_IMAGE_CARD_ASPECT=(2, 1), POSTS_THUMBNAIL_WORKERS=0,
+                   POSTS_THUMBNAIL_GEOMETRIES=(), PAGE_CACHE_VIEWS=())
+class ImageCleanupTest(TransactionTestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.media = override_settings(MEDIA_ROOT=self.media_root)
+        self.media.enable()
+        self.user = User.objects.create(username='author')
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        self.media.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def post_files(self, post):
+        post.refresh_from_db()
+        return [post.image.name] + [
+            name for _, _, name in json.loads(post.image_variants)['jpeg']]
+
+    def edit(self, post, **data):
+        self.client.post(reverse('post_edit', args=[self.user, post.id]),
+                         {'text': 'Пост', **data})
+
+    def test_replaced_and_cleared_images_are_deleted(self):
+        """Старые оригинал и варианты удаляются при замене и удалении
+        картинки."""
+        post = Post.objects.create(text='Пост', author=self.user)
+        self.edit(post, image=make_upload('first.jpg', (300, 200), 'JPEG'))
+        first = self.post_files(post)
+        self.edit(post, image=make_upload('second.jpg', (300, 200), 'JPEG'))
+        second = self.post_files(post)
+        self.assertFalse(any(map(default_storage.exists, first)))
+        self.assertTrue(all(map(default_storage.exists, second)))
+        self.edit(post, **{'image-clear': 'on'})
+        self.assertFalse(any(map(default_storage.exists, second)))
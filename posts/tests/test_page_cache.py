@@ -0,0 +1,80 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Post, Group, Comment, User
+from posts.page_cache import page_cache_stats
+from . import constants as c
+
+
+class PageCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        page_cache_stats.reset()
+        self.author = User.objects.create(username=c.USERNAME_AUTHOR)
+        self.other = User.objects.create(username=c.USERNAME)
+        self.group = Group.objects.create(
+            title='Группа', slug=c.SLUG, description='Описание')
+        self.post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group)
+        self.other_post = Post.objects.create(
+            text='Другой пост', author=self.other)
+        self.post_url = reverse('post', args=[self.author.username,
+                                              self.post.pk])
+        self.other_post_url = reverse('post', args=[self.other.username,
+                                                    self.other_post.pk])
+
+    def assertCached(self, url, cached=True):
+        self.assertEqual(self.client.get(url)['X-Page-Cache'],
+                         'hit' if cached else 'miss')
+
+    def test_anonymous_hit_skips_view(self):
+        """Повторный анонимный запрос отдается из кэша без SQL."""
+        first = self.client.get(self.post_url)
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            second = self.client.get(self.post_url)
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(
+            page_cache_stats.snapshot()['post'], {'hits': 1, 'misses': 1})
+
+    def test_hit_answers_conditional_get(self):
+        """Копия из кэша отвечает 304 на If-None-Match."""
+        etag = self.client.get(c.INDEX_URL)['ETag']
+        response = self.client.get(c.INDEX_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+
+    def test_comment_purges_only_affected_pages(self):
+        """Комментарий вычищает страницы своего поста, автора и ленты,
+        но не страницы чужого автора."""
+        urls = (c.INDEX_URL, c.GROUP_URL, c.PROFILE_AUTHOR_URL,
+                self.post_url, self.other_post_url, c.PROFILE_URL)
+        for url in urls:
+            self.client.get(url)
+        Comment.objects.create(post=self.post, author=self.other, text='1')
+        for url in urls[:4]:
+            with self.subTest(url=url):
+                self.assertCached(url, cached=False)
+        for url in urls[4:]:
+            with self.subTest(url=url):
+                self.assertCached(url)
+
+    def test_edit_purges_post_page(self):
+        """Правка поста (в том числе из админки) видна сразу."""
+        self.client.get(self.post_url)
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        self.assertContains(self.client.get(self.post_url),
+                            'Исправленный пост')
+
+    def test_logged_in_users_bypass_cache(self):
+        """Вошедшие пользователи получают страницу из представления."""
+        self.client.get(self.post_url)
+        self.client.force_login(self.other)
+        response = self.client.get(self.post_url)
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertIsNotNone(response.context)
@@ -0,0 +1,80 @@
+import base64
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.pagination import CursorPaginator, decode_cursor
+from . import constants as c
+
+
+@override_settings(PAGE_CACHE_VIEWS=())
+class CursorPaginatorTest(TestCase):
+
+    POSTS_IN_PAGE = 10
+    POSTS_COUNT = 25
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='cursor')
+
+        Post.objects.bulk_create([Post(
+            text=f'Тестовое сообщение{i}',
+            author=cls.user)
+            for i in range(cls.POSTS_COUNT)])
+
+    def test_walk_all_pages(self):
+        """Проход по токенам after отдает все посты без повторов."""
+        paginator = CursorPaginator(Post.objects.all(), self.POSTS_IN_PAGE)
+        page = paginator.get_page()
+        seen = list(page)
+        while page.has_next():
+            page = paginator.get_page(after=page.next_cursor)
+            seen.extend(page)
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        self.assertEqual(seen, expected)
+
+    def test_before_returns_previous_page(self):
+        """Токен before возвращает предыдущую страницу."""
+        paginator = CursorPaginator(Post.objects.all(), self.POSTS_IN_PAGE)
+        first = paginator.get_page()
+        second = paginator.get_page(after=first.next_cursor)
+        back = paginator.get_page(before=second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый токен не ломает страницу."""
+        self.assertIsNone(decode_cursor('!!!'))
+        response = self.client.get(c.INDEX_URL + '?after=!!!')
+        self.assertEqual(len(response.context.get('page')),
+                         self.POSTS_IN_PAGE)
+
+    def test_out_of_range_cursor_returns_first_page(self):
+        """Токен с датой или id вне допустимых значений не ломает ленты."""
+        tokens = [
+            base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+            for raw in ('99999999999999999999999.1',
+                        '-99999999999999999999999.1',
+                        f'0.{2 ** 64}', '0.1.2')]
+        for token in tokens:
+            self.assertIsNone(decode_cursor(token))
+        urls = [c.INDEX_URL,
+                reverse('profile', args=[self.user.username])]
+        for url in urls:
+            first = list(self.client.get(f'{url}?after=').context['page'])
+            for param in ('after', 'before'):
+                with self.subTest(url=url, param=param):
+                    response = self.client.get(
+                        f'{url}?{param}={tokens[0]}')
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(list(response.context['page']), first)
+
+    def test_index_cursor_mode(self):
+        """Главная страница в курсорном режиме не считает записи."""
+        response = self.client.get(c.INDEX_URL + '?after=')
+        page = response.context.get('page')
+        self.assertTrue(page.is_cursor)
+        self.assertContains(response, f'?after={page.next_cursor}')
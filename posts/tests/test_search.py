@@ -0,0 +1,80 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post, Comment, SearchPosting, User
+
+
+class SearchTestsMixin:
+
+    def setUp(self):
+        self.user = User.objects.create(username='author')
+        self.cat = Post.objects.create(
+            text='Кошка спит на диване. Кошка мурчит.', author=self.user)
+        self.dog = Post.objects.create(
+            text='Собака и кошка гуляют', author=self.user)
+        self.other = Post.objects.create(text='Про погоду', author=self.user)
+
+    def test_ranked_results(self):
+        """Все слова запроса обязательны, частое слово выше в выдаче."""
+        page = search.search_posts('кошка', 10)
+        self.assertEqual(list(page), [self.cat, self.dog])
+        self.assertEqual(list(search.search_posts('кошка собака', 10)),
+                         [self.dog])
+
+    def test_comments_and_deletes_update_index(self):
+        """Комментарии ищутся, удаленные записи пропадают из выдачи."""
+        comment = Comment.objects.create(
+            post=self.other, author=self.user, text='Дождь и кошка')
+        self.assertIn(self.other, search.search_posts('дождь', 10))
+        self.assertEqual(
+            list(search.filter_matching(
+                Comment.objects.all(), 'дождь', SearchPosting.COMMENT)),
+            [comment])
+        comment.delete()
+        self.cat.delete()
+        self.assertEqual(list(search.search_posts('кошка', 10)), [self.dog])
+
+    def test_edit_reindexes_post(self):
+        """Правка текста поста обновляет индекс."""
+        self.other.text = 'Про луну'
+        self.other.save()
+        self.assertEqual(list(search.search_posts('погоду', 10)), [])
+        self.assertEqual(list(search.search_posts('луну', 10)), [self.other])
+
+    def test_cursor_pagination(self):
+        """Курсор следующей страницы продолжает выдачу без повторов."""
+        first = search.search_posts('кошка', 1)
+        self.assertTrue(first.has_next())
+        second = search.search_posts('кошка', 1, after=first.next_cursor)
+        self.assertEqual(list(first) + list(second), [self.cat, self.dog])
+        self.assertFalse(second.has_next())
+
+    def test_admin_search_is_not_truncated(self):
+        """Поиск в админке находит все подходящие посты, а не первую
+        тысячу."""
+        Post.objects.bulk_create(
+            [Post(text=f'Кошка номер {i}', author=self.user)
+             for i in range(1000)])
+        search.rebuild()
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'кошка'})
+        self.assertEqual(response.context['cl'].result_count, 1002)
+
+    def test_search_view(self):
+        """Страница /search/ показывает найденные посты."""
+        response = self.client.get(reverse('search'), {'q': 'погоду'})
+        self.assertEqual(list(response.context['page']), [self.other])
+        self.assertContains(response, 'Про погоду')
+
+
+@override_settings(SEARCH_BACKEND='fts5')
+class Fts5SearchTest(SearchTestsMixin, TestCase):
+    pass
+
+
+@override_settings(SEARCH_BACKEND='inverted')
+class InvertedIndexSearchTest(SearchTestsMixin, TestCase):
+    pass
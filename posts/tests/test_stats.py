@@ -0,0 +1,48 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Post, Follow, AuthorStats, User
+from posts.stats import check_stats
+
+
+class AuthorStatsTest(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+        self.client.force_login(self.reader)
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        """Посты, подписки и отписки обновляют счетчики."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.client.get(reverse('profile_follow', args=[self.author]))
+        self.assertEqual(self.stats(self.author).post_count, 1)
+        self.assertEqual(self.stats(self.author).follower_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.client.get(reverse('profile_unfollow', args=[self.author]))
+        post.delete()
+        self.assertEqual(self.stats(self.author).post_count, 0)
+        self.assertEqual(self.stats(self.author).follower_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_profile_renders_stats(self):
+        """Карточка автора берет числа из счетчиков."""
+        Post.objects.create(text='Пост', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.client.get(reverse('profile', args=[self.author]))
+        self.assertEqual(response.context['count'], 1)
+        self.assertEqual(response.context['followers'], 1)
+        self.assertEqual(response.context['follows'], 0)
+
+    def test_check_stats_fixes_drift(self):
+        """Проверка находит и исправляет расхождения."""
+        Post.objects.create(text='Пост', author=self.author)
+        AuthorStats.objects.filter(user=self.author).update(post_count=7)
+        self.assertEqual(check_stats(), [self.author.pk])
+        self.assertEqual(check_stats(fix=True, batch_size=1),
+                         [self.author.pk])
+        self.assertEqual(self.stats(self.author).post_count, 1)
+        self.assertEqual(check_stats(), [])
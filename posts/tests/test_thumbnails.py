@@ -0,0 +1,66 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from PIL import Image
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from posts import thumbnails
+from posts.models import Post, User
+from . import constants as c
+
+
+@override_settings(POSTS_THUMBNAIL_WORKERS=0)
+class ThumbnailQueueTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        settings.MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create(username='author')
+        self.client.force_login(self.user)
+
+    def test_new_post_queues_thumbnails(self):
+        """Загрузка картинки в new_post ставит миниатюры в очередь."""
+        uploaded = SimpleUploadedFile(
+            name='small.gif', content=c.SMALL_GIF, content_type='image/gif')
+        with mock.patch.object(thumbnails, 'queue_for_post') as queue:
+            self.client.post(c.NEW_POST_URL,
+                             data={'text': 'Текст', 'image': uploaded})
+        queue.assert_called_once()
+        self.assertEqual(queue.call_args[0][0].image.name, c.IMAGE_URL)
+
+    def test_inline_generation_swallows_errors(self):
+        """Ошибка генерации пишется в лог и не ломает запрос."""
+        with mock.patch.object(thumbnails, 'generate',
+                               side_effect=OSError('broken')) as generate:
+            with self.assertLogs('yatube.thumbnails', 'ERROR'):
+                thumbnails.queue(1, c.IMAGE_URL)
+        generate.assert_called_once_with(c.IMAGE_URL)
+
+    def test_variants_survive_thumbnail_failure(self):
+        """Сбой миниатюр sorl не отменяет адаптивные варианты."""
+        buffer = BytesIO()
+        Image.new('RGB', (400, 300)).save(buffer, 'JPEG')
+        name = default_storage.save('posts/photo.jpg',
+                                    ContentFile(buffer.getvalue()))
+        post = Post.objects.create(text='Текст', author=self.user,
+                                   image=name)
+        with mock.patch.object(thumbnails, 'generate',
+                               side_effect=OSError('broken')):
+            with self.assertLogs('yatube.thumbnails', 'ERROR'):
+                thumbnails.queue(post.id, name)
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (400, 300))
+        self.assertTrue(post.variants.srcset)
@@ -0,0 +1,105 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import Post, Follow, TimelineEntry, User
+
+
+class TimelineTest(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+        self.client.force_login(self.reader)
+
+    def follow_feed(self):
+        response = self.client.get(reverse('follow_index'))
+        return list(response.context['page'])
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленту подписчика."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertEqual(self.follow_feed(), [post])
+
+    def test_follow_backfills_and_unfollow_purges(self):
+        """Подписка добавляет старые посты, отписка их убирает."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.client.get(reverse('profile_follow', args=[self.author]))
+        self.assertEqual(self.follow_feed(), [post])
+        self.client.get(reverse('profile_unfollow', args=[self.author]))
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.follow_feed(), [])
+
+    @override_settings(POSTS_TIMELINE_LENGTH=3)
+    def test_timeline_is_trimmed(self):
+        """Лента обрезается до заданной длины."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [Post.objects.create(text=f'Пост {i}', author=self.author)
+                 for i in range(5)]
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(
+                user=self.reader).values_list('post_id', flat=True)),
+            [post.id for post in reversed(posts[2:])])
+
+    @override_settings(POSTS_TIMELINE_FANOUT_LIMIT=0)
+    def test_pull_author_merged_on_read(self):
+        """Посты авторов выше порога читаются без рассылки."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.follow_feed(), [post])
+
+    @override_settings(POSTS_TIMELINE_LENGTH=3)
+    def test_fan_out_queries_do_not_grow_with_followers(self):
+        """Рассылка и обрезка не делают запросов на каждого подписчика."""
+        readers = [self.reader] + [
+            User.objects.create(username=f'reader{i}') for i in range(5)]
+        for reader in readers:
+            Follow.objects.create(user=reader, author=self.author)
+        posts = [Post.objects.create(text=f'Пост {i}', author=self.author)
+                 for i in range(4)]
+        posts.append(Post.objects.create(text='Пост', author=self.author))
+        TimelineEntry.objects.filter(post=posts[-1]).delete()
+        with self.assertNumQueries(3):
+            timeline.fan_out_post(posts[-1])
+        for reader in readers:
+            self.assertEqual(
+                list(TimelineEntry.objects.filter(
+                    user=reader).values_list('post_id', flat=True)),
+                [post.id for post in reversed(posts[2:])])
+
+    @override_settings(POSTS_TIMELINE_FANOUT_LIMIT=1)
+    def test_author_below_limit_is_backfilled(self):
+        """Автор, опустившийся до порога, снова в материализованной ленте."""
+        other = User.objects.create(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        Follow.objects.filter(user=other).delete()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertEqual(self.follow_feed(), [post])
+
+    @override_settings(POSTS_TIMELINE_LENGTH=2)
+    def test_trim_keeps_short_timelines(self):
+        """Обрезка удаляет только записи за пределом длинных лент."""
+        other = User.objects.create(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        old = Post.objects.create(text='Старый', author=other)
+        Follow.objects.create(user=self.reader, author=other)
+        posts = [Post.objects.create(text=f'Пост {i}', author=self.author)
+                 for i in range(2)]
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(
+                user=self.reader).values_list('post_id', flat=True)),
+            [posts[1].id, posts[0].id])
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(
+                user=other).values_list('post_id', flat=True)),
+            [posts[1].id, posts[0].id])
+        self.assertFalse(TimelineEntry.objects.filter(post=old).exists())
@@ -122,3 +122,32 @@ class StaticURLTests(TestCase):
 
         response = self.guest_client.get(c.ABOUT_TECH_URL)
         self.assertEqual(response.status_code, 200)
+
+
+class ReservedUsernameTests(TestCase):
+    def signup(self, username):
+        return self.client.post(reverse('signup'), {
+            'username': username,
+            'password1': 'Trudn0-ugadat',
+            'password2': 'Trudn0-ugadat',
+        })
+
+    def test_route_names_are_rejected(self):
+        """Имена, под которыми профиль перекрыт другим адресом,
+        при регистрации заняты."""
+        for username in ('search', 'export', 'new', 'follow', 'group',
+                         'admin', '500'):
+            with self.subTest(username=username):
+                response = self.signup(username)
+                self.assertEqual(response.status_code, 200)
+                self.assertFormError(response, 'form', 'username',
+                                     'Это имя пользователя занято.')
+        self.assertFalse(User.objects.exists())
+
+    def test_ordinary_name_is_accepted(self):
+        """Обычное имя регистрируется, профиль открывается."""
+        response = self.signup('searcher')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            self.client.get(reverse('profile', args=['searcher'])
+                            ).status_code, 200)
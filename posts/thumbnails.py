@@ -0,0 +1,125 @@
+import json
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+
+from core import metrics
+
+
+logger = logging.getLogger('yatube.thumbnails')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def geometries():
+    return getattr(settings, 'POSTS_THUMBNAIL_GEOMETRIES', ())
+
+
+def _init_worker():
+    # Воркеры запускаются через spawn: Django в них поднимается с нуля и
+    # не делит с родителем открытые соединения с базой.
+    import django
+    django.setup()
+
+
+def generate(name):
+    """Строит миниатюры всех настроенных размеров для файла из storage.
+
+    Возвращает имена созданных файлов миниатюр.
+    """
+    from sorl.thumbnail import get_thumbnail
+
+    return [get_thumbnail(name, geometry, **options).name
+            for geometry, options in geometries()]
+
+
+def prepare_post_image(post_id, name):
+    """Миниатюры и адаптивные варианты картинки поста.
+
+    Пост обновляется только если картинка за это время не сменилась.
+    Возвращает время подготовки в секундах: в пуле процессов его
+    записывает в метрики родитель.
+    """
+    from .images import build_variants, delete_image
+    from .models import Post
+
+    started = time.perf_counter()
+    # Без миниатюр sorl шаблон обойдется вариантами, и наоборот, поэтому
+    # ошибка одного шага не отменяет другой.
+    try:
+        generate(name)
+    except Exception as error:
+        logger.error('Thumbnail generation failed for %s: %r', name, error)
+    variants = build_variants(name)
+    width, height = variants.pop('width'), variants.pop('height')
+    updated = Post.objects.filter(pk=post_id, image=name).update(
+        image_width=width, image_height=height,
+        image_variants=json.dumps(variants))
+    if not updated:
+        # Картинку сменили или пост удалили, пока строились варианты.
+        delete_image(None, json.dumps(variants))
+    return time.perf_counter() - started
+
+
+def workers():
+    return getattr(settings, 'POSTS_THUMBNAIL_WORKERS', 0)
+
+
+def make_executor(max_workers=None):
+    """Пул spawn-процессов; max_workers=None — по числу ядер."""
+    return ProcessPoolExecutor(
+        max_workers=max_workers or None,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker)
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = make_executor(workers())
+        return _executor
+
+
+def _report(name):
+    def callback(future):
+        error = future.exception()
+        if error is not None:
+            logger.error('Image preparation failed for %s: %r',
+                         name, error)
+        else:
+            metrics.observe('yatube_thumbnail_seconds', future.result())
+    return callback
+
+
+def queue(post_id, name):
+    """Ставит подготовку картинки поста в пул процессов.
+
+    При POSTS_THUMBNAIL_WORKERS = 0 всё строится сразу в текущем
+    процессе (удобно для разработки и тестов).
+    """
+    if not name:
+        return
+    if not workers():
+        try:
+            metrics.observe('yatube_thumbnail_seconds',
+                            prepare_post_image(post_id, name))
+        except Exception as error:
+            logger.error('Image preparation failed for %s: %r',
+                         name, error)
+        return
+    get_executor().submit(prepare_post_image, post_id, name).add_done_callback(
+        _report(name))
+
+
+def queue_for_post(post):
+    """Генерация стартует после коммита, чтобы воркер увидел файл и пост."""
+    if post.image:
+        post_id, name = post.pk, post.image.name
+        transaction.on_commit(lambda: queue(post_id, name))
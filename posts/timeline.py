@@ -0,0 +1,199 @@
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import F, Q
+
+from .models import Post, Follow, TimelineEntry, AuthorStats
+
+
+FEED_KEYS = ('feed_date', 'feed_id')
+
+
+def timeline_length():
+    return getattr(settings, 'POSTS_TIMELINE_LENGTH', 500)
+
+
+def fanout_limit():
+    return getattr(settings, 'POSTS_TIMELINE_FANOUT_LIMIT', 10000)
+
+
+def is_pull_author(author_id):
+    """Авторов с огромным числом подписчиков не рассылаем при записи,
+    их посты подмешиваются в ленту при чтении."""
+    return AuthorStats.objects.filter(
+        user_id=author_id, follower_count__gt=fanout_limit()).exists()
+
+
+def trim_timeline(user_id):
+    """Обрезает ленту пользователя до POSTS_TIMELINE_LENGTH записей."""
+    entries = TimelineEntry.objects.filter(user_id=user_id).order_by(
+        '-pub_date', '-post_id')
+    boundary = entries.values_list('pub_date', 'post_id')[
+        timeline_length():timeline_length() + 1]
+    if not boundary:
+        return
+    pub_date, post_id = boundary[0]
+    entries.filter(
+        Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, post_id__lte=post_id)
+    ).delete()
+
+
+def _tables(connection):
+    quote = connection.ops.quote_name
+    return (quote(TimelineEntry._meta.db_table),
+            quote(Follow._meta.db_table), quote(Post._meta.db_table))
+
+
+def _insert_for_followers(connection, author_id, columns, params,
+                          source=''):
+    """Одним INSERT ... SELECT добавляет записи в ленты всех подписчиков
+    автора: columns — post_id и pub_date, source — что присоединить к
+    подпискам f."""
+    ops = connection.ops
+    entries, follows, _ = _tables(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{ops.insert_statement(ignore_conflicts=True)} {entries} '
+            f'(user_id, post_id, pub_date) SELECT f.user_id, {columns} '
+            f'FROM {follows} f {source} WHERE f.author_id = %s '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+            [*params, author_id])
+
+
+def trim_followers(author_id):
+    """Обрезает ленты подписчиков автора до POSTS_TIMELINE_LENGTH одним
+    DELETE.
+
+    Граница каждой ленты — запись со смещением POSTS_TIMELINE_LENGTH,
+    ее находит OFFSET по индексу (user, pub_date, post) без сортировки и
+    без чтения строк. У лент не длиннее предела границы нет, и они не
+    затрагиваются; у остальных удаляются только записи за границей.
+    """
+    connection = connections[router.db_for_write(TimelineEntry)]
+    entries, follows, _ = _tables(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'WITH cutoffs AS (SELECT user_id, pub_date, post_id '
+            f'FROM {entries} WHERE id IN (SELECT (SELECT e.id '
+            f'FROM {entries} e WHERE e.user_id = f.user_id '
+            f'ORDER BY e.pub_date DESC, e.post_id DESC LIMIT 1 OFFSET %s) '
+            f'FROM {follows} f WHERE f.author_id = %s)) '
+            f'DELETE FROM {entries} WHERE id IN (SELECT e.id '
+            f'FROM cutoffs c JOIN {entries} e ON e.user_id = c.user_id '
+            f'WHERE e.pub_date <= c.pub_date AND (e.pub_date < c.pub_date '
+            f'OR e.post_id <= c.post_id))',
+            [timeline_length(), author_id])
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост в ленты подписчиков автора.
+
+    Вставка и обрезка — по одному запросу на пост, сколько бы ни было
+    подписчиков.
+    """
+    if is_pull_author(post.author_id):
+        return
+    connection = connections[router.db_for_write(TimelineEntry)]
+    _insert_for_followers(
+        connection, post.author_id, '%s, %s',
+        [post.pk, connection.ops.adapt_datetimefield_value(post.pub_date)])
+    trim_followers(post.author_id)
+
+
+def follower_removed(author_id):
+    """Автор, у которого после отписки осталось ровно
+    POSTS_TIMELINE_FANOUT_LIMIT подписчиков, снова рассылается при
+    записи. Его посты подписчики до сих пор подмешивали при чтении, а в
+    материализованных лентах их нет: раскладываем последние посты
+    автора во все эти ленты.
+
+    Обратный переход ничего не требует: посты «тянущего» автора,
+    уже лежащие в лентах, не дублируются при чтении. Автор, чье число
+    подписчиков колеблется около порога, при каждом переходе платит
+    за раскладку заново.
+    """
+    if not AuthorStats.objects.filter(
+            user_id=author_id, follower_count=fanout_limit()).exists():
+        return
+    connection = connections[router.db_for_write(TimelineEntry)]
+    _, _, posts = _tables(connection)
+    _insert_for_followers(
+        connection, author_id, 'p.id, p.pub_date',
+        [author_id, timeline_length()],
+        f'CROSS JOIN (SELECT id, pub_date FROM {posts} '
+        f'WHERE author_id = %s ORDER BY pub_date DESC, id DESC '
+        f'LIMIT %s) p')
+    trim_followers(author_id)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты нового автора."""
+    if is_pull_author(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id').values_list('id', 'pub_date')[:timeline_length()]
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts],
+        ignore_conflicts=True)
+    trim_timeline(user_id)
+
+
+def purge(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+
+def rebuild(user_id):
+    """Собирает ленту заново одним запросом: последние посты всех
+    рассылаемых авторов, без вставки и обрезки по каждому автору."""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    posts = Post.objects.filter(
+        author_id__in=Follow.objects.filter(
+            user_id=user_id).values('author_id')
+    ).exclude(author_id__in=pull_author_ids(user_id)).order_by(
+        '-pub_date', '-id').values_list('id', 'pub_date')[:timeline_length()]
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts])
+
+
+def pull_author_ids(user_id):
+    followed = Follow.objects.filter(user_id=user_id).values('author_id')
+    return list(AuthorStats.objects.filter(
+        user_id__in=followed, follower_count__gt=fanout_limit()
+    ).values_list('user_id', flat=True))
+
+
+def followed_authors(user_id):
+    """Одним запросом: (id всех авторов, на которых подписан
+    пользователь, id «тянущих» авторов среди них)."""
+    limit = fanout_limit()
+    rows = Follow.objects.filter(user_id=user_id).values_list(
+        'author_id', 'author__stats__follower_count')
+    followed, pull = [], []
+    for author_id, follower_count in rows:
+        followed.append(author_id)
+        if follower_count is not None and follower_count > limit:
+            pull.append(author_id)
+    return followed, pull
+
+
+def follow_feed(user, pull_ids=None):
+    """Лента подписок: чтение из материализованной ленты плюс посты
+    авторов, которых не рассылаем при записи.
+
+    Посты аннотированы ключами сортировки FEED_KEYS. Для чистой
+    материализованной ленты это копии даты и id из TimelineEntry: так
+    запрос идет по индексу (user, pub_date, post) без сортировки.
+    """
+    if pull_ids is None:
+        pull_ids = pull_author_ids(user.id)
+    if not pull_ids:
+        return Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_date=F('timeline_entries__pub_date'),
+            feed_id=F('timeline_entries__post_id'))
+    return Post.objects.filter(
+        Q(id__in=TimelineEntry.objects.filter(
+            user=user).values('post_id')) | Q(author_id__in=pull_ids)
+    ).annotate(feed_date=F('pub_date'), feed_id=F('id'))
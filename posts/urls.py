@@ -10,8 +10,12 @@ urlpatterns = [
     path('500/', views.server_error, name='error500'),
     path('404/', views.page_not_found, name='error404'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
+    path('export/', views.export, name='export'),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
+    path('<str:username>/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
     path('<str:username>/<int:post_id>/edit/',
          views.post_edit, name='post_edit'),
     path('<str:username>/<int:post_id>/comment/', views.add_comment,
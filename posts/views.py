@@ -1,42 +1,73 @@
+from urllib.parse import urlencode
+
 from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.contrib.auth import get_user_model
-
-from .models import Post, Group, Comment, Follow
+from django.http import (Http404, HttpResponseBadRequest, JsonResponse,
+                         StreamingHttpResponse)
+
+from . import comments as comment_pages
+from . import exporter, feed_cache, thumbnails
+from .conditional import (conditional_page, follow_state, group_state,
+                          index_state, page_author, post_state,
+                          profile_state, request_followed_authors,
+                          follow_scopes)
+from .models import Post, Group, Follow
 from .forms import PostForm, CommentForm
+from .pagination import get_feed_page
+from .search import search_posts
+from .stats import get_stats
+from .timeline import FEED_KEYS, follow_feed
 
 
+@conditional_page(index_state)
 def index(request):
-    post_list = Post.objects.select_related('group').order_by('-pub_date')
-
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = Post.objects.select_related(
+        'author', 'group').order_by('-pub_date')
+    page, paginator = get_feed_page(request, post_list, 10)
+    cache_key = feed_cache.page_key(request, 'index', feed_cache.GLOBAL)
 
     return render(
         request,
         'index.html',
-        {'page': page, 'paginator': paginator}
+        {'page': page, 'paginator': paginator,
+         'feed_cache_key': cache_key,
+         'feed_cache_timeout': feed_cache.timeout()}
     )
 
 
+@conditional_page(group_state)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.group.all()[:12]
-
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    posts = group.group.select_related('author', 'group')
+    page, paginator = get_feed_page(request, posts, 10)
+    cache_key = feed_cache.page_key(
+        request, 'group', feed_cache.group_scope(group.pk))
     context = {
         'group': group,
         'posts': posts,
         'page': page,
-        'paginator': paginator
+        'paginator': paginator,
+        'feed_cache_key': cache_key,
+        'feed_cache_timeout': feed_cache.timeout(),
     }
     return render(request, 'group.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page = None
+    if query:
+        page = search_posts(query, 10, after=request.GET.get('after'))
+    context = {
+        'query': query,
+        'page': page,
+        'query_string': urlencode({'q': query}),
+    }
+    return render(request, 'search.html', context)
+
+
 @login_required
 def new_post(request):
     if request.method == 'POST':
@@ -46,6 +77,7 @@ def new_post(request):
             post = form.save(commit=False)
             post.author = request.user
             form.save()
+            thumbnails.queue_for_post(post)
 
             return redirect('index')
 
@@ -58,58 +90,93 @@ def new_post(request):
 User = get_user_model()
 
 
+@conditional_page(profile_state)
 def profile(request, username):
-    author = User.objects.get(username=username)
+    author = page_author(request, username)
+    if author is None:
+        raise Http404
     post_list = Post.objects.filter(author=author).select_related(
-        'author').order_by('-pub_date')
-    count = Post.objects.filter(author=author).select_related('author').count()
-    paginator = Paginator(post_list, 5)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+        'author', 'group').order_by('-pub_date')
+    page, paginator = get_feed_page(request, post_list, 5)
     following = False
     if request.user.is_authenticated:
         following = author.following.filter(user=request.user).exists()
-    followers = Follow.objects.filter(author=author).count()
-    follows = Follow.objects.filter(user=author).count()
+    stats = get_stats(author)
+    cache_key = feed_cache.page_key(
+        request, 'profile', feed_cache.author_scope(author.pk))
     is_user = True
     if request.user == author:
         is_user = False
     context = {
         'page': page,
         'author': author,
-        'count': count,
+        'count': stats.post_count,
         'paginator': paginator,
         'following': following,
-        'followers': followers,
-        'follows': follows,
-        'is_user': is_user
+        'followers': stats.follower_count,
+        'follows': stats.following_count,
+        'is_user': is_user,
+        'feed_cache_key': cache_key,
+        'feed_cache_timeout': feed_cache.timeout(),
     }
     return render(request, 'profile.html', context)
 
 
+@conditional_page(post_state)
 def post_view(request, username, post_id):
-    comments = Comment.objects.filter(post=post_id)
-    author = get_object_or_404(User, username=username)
+    author = page_author(request, username)
+    if author is None:
+        raise Http404
     text = Post._meta.get_field("text")
-    post = get_object_or_404(Post, id=post_id, author=author)
-    count = Post.objects.filter(author=author).select_related('author').count()
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'),
+        id=post_id, author=author)
     form = CommentForm(request.POST or None)
-    followers = Follow.objects.filter(author=author).count()
-    follows = Follow.objects.filter(user=author).count()
+    comments, comments_cursor = comment_pages.first_page(post)
+    stats = get_stats(author)
     context = {
         'post': post,
         'author': author,
-        'count': count,
+        'count': stats.post_count,
         'post_id': post_id,
         'text': text,
         'form': form,
         'comments': comments,
-        'followers': followers,
-        'follows': follows,
+        'comments_cursor': comments_cursor,
+        'followers': stats.follower_count,
+        'follows': stats.following_count,
     }
     return render(request, 'post.html', context)
 
 
+@conditional_page(post_state)
+def post_comments(request, username, post_id):
+    author = page_author(request, username)
+    if author is None:
+        raise Http404
+    post = get_object_or_404(Post.objects.only('id', 'author'),
+                             id=post_id, author=author)
+    comments, cursor = comment_pages.page_after(
+        post_id, request.GET.get('after'))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [{
+                'id': comment.pk,
+                'author': comment.author.username,
+                'text': comment.text,
+                'created': comment.created.isoformat(),
+            } for comment in comments],
+            'next': cursor,
+        })
+    context = {
+        'post': post,
+        'author': author,
+        'comments': comments,
+        'comments_cursor': cursor,
+    }
+    return render(request, 'comment_page.html', context)
+
+
 @login_required
 def post_edit(request, username, post_id):
     author = User.objects.get(username=username)
@@ -124,6 +191,8 @@ def post_edit(request, username, post_id):
         if form.is_valid():
             post = form.save(commit=False)
             post.save()
+            if 'image' in form.changed_data:
+                thumbnails.queue_for_post(post)
             return redirect('post', username=username, post_id=post_id)
     form = PostForm(instance=post)
     context = {
@@ -149,14 +218,18 @@ def add_comment(request, username, post_id):
 
 
 @login_required
+@conditional_page(follow_state)
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    _, pull_ids = request_followed_authors(request)
+    post_list = follow_feed(request.user, pull_ids).select_related(
+        'author', 'group').order_by('-feed_date', '-feed_id')
+    page, paginator = get_feed_page(request, post_list, 10, FEED_KEYS)
+    cache_key = feed_cache.page_key(request, 'follow', *follow_scopes(request))
     context = {
         'page': page,
-        'paginator': paginator
+        'paginator': paginator,
+        'feed_cache_key': cache_key,
+        'feed_cache_timeout': feed_cache.timeout(),
     }
     return render(request, "follow.html", context)
 
@@ -181,6 +254,26 @@ def profile_unfollow(request, username):
     return redirect('profile', username=username)
 
 
+@staff_member_required
+def export(request):
+    author = group = None
+    if request.GET.get('author'):
+        author = get_object_or_404(User, username=request.GET['author'])
+    if request.GET.get('group'):
+        group = get_object_or_404(Group, slug=request.GET['group'])
+    file_format = request.GET.get('format', 'jsonl')
+    if file_format not in exporter.FORMATS:
+        return HttpResponseBadRequest('Неизвестный формат выгрузки')
+    compress = request.GET.get('gzip', '1') != '0'
+    response = StreamingHttpResponse(
+        exporter.stream(author, group, file_format, compress),
+        content_type=('application/gzip' if compress
+                      else exporter.CONTENT_TYPES[file_format]))
+    response['Content-Disposition'] = 'attachment; filename="{}"'.format(
+        exporter.filename(author, group, file_format, compress))
+    return response
+
+
 def page_not_found(request, exception=None):
     # Переменная exception содержит отладочную информацию,
     # выводить её в шаблон пользователской страницы 404 мы не станем
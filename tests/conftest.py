@@ -1,4 +1,24 @@
+import pytest
+
+
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
+    'tests.fixtures.fixture_queries',
 ]
+
+
+@pytest.fixture(scope='session', autouse=True)
+def isolated_cache(tmp_path_factory):
+    """Тесты не трогают общий кэш запущенного сервера."""
+    from core.test_runner import isolated_caches
+    with isolated_caches(str(tmp_path_factory.mktemp('cache'))):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """База между тестами очищается без сигналов, поэтому кэш страниц и
+    поколения лент от прошлого теста к ней не относятся."""
+    from django.core.cache import cache
+    cache.clear()
@@ -0,0 +1,66 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.fixture
+def feed_data(django_user_model):
+    """Реалистичный объем: несколько авторов, групп, подписок и комментариев."""
+    from posts.models import Post, Group, Comment, Follow
+    authors = [django_user_model.objects.create_user(username=f'author_{i}') for i in range(5)]
+    reader = django_user_model.objects.create_user(username='reader')
+    groups = [Group.objects.create(title=f'Группа {i}', slug=f'group-{i}', description='Описание') for i in range(3)]
+    posts = [
+        Post.objects.create(text=f'Пост {i}', author=authors[i % len(authors)], group=groups[i % len(groups)])
+        for i in range(40)
+    ]
+    for post in posts[:15]:
+        for author in authors[:3]:
+            Comment.objects.create(post=post, author=author, text='Комментарий')
+    for author in authors:
+        Follow.objects.create(user=reader, author=author)
+    return {'authors': authors, 'reader': reader, 'groups': groups, 'posts': posts}
+
+
+@pytest.fixture
+def assert_query_budget(settings):
+    """Проверяет, что запрос к URL укладывается в QUERY_BUDGETS[url_name]."""
+    def check(client, url_name, url, method='get', **kwargs):
+        budget = settings.QUERY_BUDGETS[url_name]
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, method)(url, **kwargs)
+        assert response.status_code in (200, 302), \
+            f'Страница `{url}` вернула код {response.status_code}'
+        assert len(queries) <= budget, \
+            f'Страница `{url}` выполнила {len(queries)} SQL-запросов при бюджете {budget}:\n' + \
+            '\n'.join(query['sql'] for query in queries.captured_queries)
+        return response
+    return check
+
+
+@pytest.fixture
+def assert_query_plans():
+    """Проверяет планы всех SELECT, выполненных при запросе к URL: ни
+    полных просмотров таблиц, ни сортировки во временном B-дереве."""
+    from django.core.cache import cache
+    from core.queries import StatementLog, explain_query_plan, plan_problems
+
+    def check(client, url):
+        # Холодный кэш: иначе запросы ленты закрыты фрагментным кэшем.
+        cache.clear()
+        log = StatementLog()
+        with connection.execute_wrapper(log):
+            response = client.get(url)
+        assert response.status_code == 200, \
+            f'Страница `{url}` вернула код {response.status_code}'
+        problems = []
+        for sql, params in log.statements:
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            bad = plan_problems(explain_query_plan(sql, params))
+            if bad:
+                problems.append(sql + '\n    ' + '\n    '.join(bad))
+        assert not problems, \
+            f'Страница `{url}` выполняет запросы с плохим планом:\n' + '\n'.join(problems)
+        return response
+    return check
@@ -0,0 +1,42 @@
+import pytest
+
+
+class TestBenchmark:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_runs_every_route(self, settings, tmp_path):
+        from benchmarks.dataset import seed
+        from benchmarks.runner import compare, run
+        settings.MEDIA_ROOT = str(tmp_path)
+        settings.POSTS_THUMBNAIL_WORKERS = 0
+        data = seed(users=5, groups=2, posts=30, comments=20, follows=2, images=2)
+        report = run(data, iterations=2, warmup=0)
+
+        assert report['meta']['uncovered_routes'] == [], \
+            'Для каждого маршрута posts, users и about должен быть сценарий'
+        clients = {(result['name'], result['client']) for result in report['results']}
+        assert ('index', 'anonymous') in clients and ('index', 'user') in clients, \
+            'Страницы должны прогоняться анонимно и от имени пользователя'
+        result = report['results'][0]
+        assert result['requests'] == 2
+        assert set(result['latency_ms']) >= {'p50', 'p95', 'p99'}
+        assert result['queries']['max'] > 0 and result['bytes']['p50'] > 0
+        assert compare(report, report) == [], \
+            'Прогон не должен быть регрессией относительно самого себя'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_command_does_not_touch_shared_cache(self, settings, tmp_path):
+        from io import StringIO
+        from django.core.cache import cache
+        from django.core.management import call_command
+        caches = {alias: dict(options) for alias, options in settings.CACHES.items()}
+        cache.set('sentinel', 'живой')
+        call_command('benchmark', users=3, groups=1, posts=10, comments=5, follows=1,
+                     images=0, iterations=1, warmup=0, cold_cache=True,
+                     output=str(tmp_path / 'report.json'), stdout=StringIO(),
+                     stderr=StringIO())
+        assert settings.CACHES == caches
+        assert cache.get('sentinel') == 'живой', \
+            'Бенчмарк с --cold-cache не должен очищать общий кэш'
+        assert not cache.get_many(['feedgen:global']), \
+            'Бенчмарк не должен писать поколения лент в общий кэш'
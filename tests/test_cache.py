@@ -0,0 +1,95 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from core.cache import get_or_compute
+from core.cache.sqlite import SQLiteCache
+
+
+@pytest.fixture
+def shared_cache(tmp_path):
+    """Отдельный файл кэша, чтобы не задевать кэш настроек."""
+    def make(**options):
+        return SQLiteCache(str(tmp_path / 'cache.sqlite3'),
+                           {'OPTIONS': {'TOUCH_INTERVAL': 0, **options}})
+    return make
+
+
+def write_in_child(location):
+    SQLiteCache(location, {}).set('from_child', 'значение')
+
+
+class TestSQLiteCache:
+
+    def test_visible_across_processes(self, shared_cache, tmp_path):
+        cache = shared_cache()
+        cache.set('warm', 1)
+        process = multiprocessing.get_context('fork').Process(
+            target=write_in_child, args=(str(tmp_path / 'cache.sqlite3'),))
+        process.start()
+        process.join()
+        assert cache.get('from_child') == 'значение', \
+            'Запись другого процесса должна быть видна через общий файл'
+
+    def test_add_expiry_and_bulk_operations(self, shared_cache):
+        cache = shared_cache()
+        assert cache.add('lock', 1, 60)
+        assert not cache.add('lock', 2, 60), 'add() не должен перезаписывать живой ключ'
+        cache.set('short', 'x', 0)
+        assert cache.get('short') is None
+        assert cache.add('short', 'y'), 'add() должен занимать просроченный ключ'
+        cache.set_many({'a': 1, 'b': [2]})
+        assert cache.get_many(['a', 'b', 'c']) == {'a': 1, 'b': [2]}
+        assert cache.incr('a', 5) == 6
+        cache.delete_many(['a', 'b'])
+        assert not cache.has_key('a')
+
+    def test_lru_eviction_by_entries_and_size(self, shared_cache):
+        cache = shared_cache(MAX_ENTRIES=10, CULL_FREQUENCY=2)
+        for i in range(10):
+            cache.set(f'key{i}', i)
+        cache.get('key0')
+        cache.set('key10', 10)
+        assert cache.get('key0') == 0, 'Недавно прочитанный ключ не должен вытесняться'
+        assert cache.get('key1') is None, 'Давно не читанный ключ должен вытесняться первым'
+        assert cache.stats()['entries'] <= 10
+
+        cache.clear()
+        cache = shared_cache(MAX_SIZE=50 * 1024, CULL_FREQUENCY=2)
+        for i in range(20):
+            cache.set(f'blob{i}', b'x' * 10 * 1024)
+        assert cache.stats()['size'] <= 50 * 1024
+        assert cache.get('blob19') is not None
+
+
+class TestGetOrCompute:
+
+    def test_single_computation_on_miss(self, shared_cache):
+        cache = shared_cache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'лента'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            get_or_compute('feed', compute, 60, cache=cache))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == ['лента'] * 8
+        assert len(calls) == 1, 'Промах горячего ключа должен пересчитывать один поток'
+
+    def test_early_recompute_before_expiry(self, shared_cache):
+        cache = shared_cache()
+        assert get_or_compute('feed', lambda: 'старое', 60, cache=cache) == 'старое'
+        assert get_or_compute('feed', lambda: 'новое', 60, cache=cache) == 'старое'
+        # Вычисление «длилось» дольше остатка срока жизни: значение
+        # пересчитывается заранее, хотя ключ еще не истек.
+        cache.set('feed', ('старое', 3600, time.time() + 1), 60)
+        assert get_or_compute('feed', lambda: 'новое', 60, cache=cache) == 'новое'
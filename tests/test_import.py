@@ -0,0 +1,152 @@
+import itertools
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+
+RECORDS = [
+    {'type': 'user', 'username': 'alice', 'email': 'alice@example.com'},
+    {'type': 'user', 'username': 'bob'},
+    {'type': 'group', 'slug': 'cats', 'title': 'Котики'},
+    {'type': 'post', 'id': 501, 'author': 'alice', 'group': 'cats',
+     'text': 'Первый пост про котиков', 'pub_date': '2020-01-01T10:00:00'},
+    {'type': 'post', 'id': 502, 'author': 'alice',
+     'text': 'Второй пост', 'pub_date': '2020-01-02T10:00:00+03:00'},
+    {'type': 'comment', 'post': 501, 'author': 'bob',
+     'text': 'Отличные котики', 'created': '2020-01-01T11:00:00'},
+    {'type': 'follow', 'user': 'bob', 'author': 'alice'},
+    {'type': 'follow', 'user': 'bob', 'author': 'alice'},
+    {'type': 'follow', 'user': 'bob', 'author': 'bob'},
+    {'type': 'post', 'author': 'nobody', 'text': 'Без автора',
+     'pub_date': '2020-01-03T10:00:00'},
+]
+
+
+class TestImportContent:
+
+    def write_jsonl(self, tmp_path, records=RECORDS):
+        path = tmp_path / 'content.jsonl'
+        path.write_text(''.join(json.dumps(record, ensure_ascii=False) + '\n'
+                                for record in records), encoding='utf-8')
+        return str(path)
+
+    def run(self, path, **options):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_content', path, stdout=stdout, stderr=stderr,
+                     **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_imports_jsonl_and_rebuilds_derived_data(self, tmp_path):
+        from posts.models import Post, Comment, Follow, TimelineEntry, User
+        output, errors = self.run(self.write_jsonl(tmp_path))
+        alice = User.objects.get(username='alice')
+        assert set(Post.objects.values_list('id', flat=True)) == {501, 502}, \
+            'Импорт должен сохранять id постов'
+        post = Post.objects.get(pk=501)
+        assert post.author == alice and post.group.slug == 'cats'
+        assert post.comment_count == 1, \
+            'После импорта должны быть пересчитаны счетчики комментариев'
+        assert Comment.objects.get().author.username == 'bob'
+        assert Follow.objects.count() == 1
+        assert TimelineEntry.objects.filter(user__username='bob').count() == 2, \
+            'После импорта должны быть собраны ленты подписок'
+        assert 'created:post: 2' in output
+        assert 'duplicate:follow: 1' in output
+        assert 'error:follow: 1' in output and 'error:post: 1' in output
+        assert 'nobody' in errors, 'Отброшенные записи должны попадать в stderr'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_reimport_skips_duplicates(self, tmp_path):
+        from posts.models import Post, Comment, Follow, User
+        path = self.write_jsonl(tmp_path)
+        self.run(path)
+        output, _ = self.run(path)
+        assert 'created:user: 0' in output and 'created:post: 0' in output
+        assert User.objects.count() == 2
+        assert Post.objects.count() == 2
+        assert Comment.objects.count() == 1
+        assert Follow.objects.count() == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_imports_csv_of_one_kind(self, tmp_path):
+        from posts.models import Group
+        path = tmp_path / 'groups.csv'
+        path.write_text('slug,title,description\n'
+                        'cats,Котики,"Про котиков, конечно"\n'
+                        'dogs,Собаки,\n', encoding='utf-8')
+        self.run(str(path), kind='group')
+        assert dict(Group.objects.values_list('slug', 'description')) == {
+            'cats': 'Про котиков, конечно', 'dogs': ''}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_resumes_from_checkpoint(self, tmp_path):
+        from posts.importer import Checkpoint, Importer, read_records
+        from posts.models import Post
+        path = self.write_jsonl(tmp_path)
+        checkpoint_path = str(tmp_path / 'checkpoint.json')
+        checkpoint = Checkpoint(checkpoint_path, path)
+        # Прерываем импорт после пяти записей: пишется одна пачка.
+        Importer(batch_size=5).run(
+            itertools.islice(read_records(path), 5), checkpoint)
+        offset, stats = checkpoint.load()
+        assert offset > 0 and stats['created:post'] == 2
+        Post.objects.filter(pk=502).delete()
+
+        output, _ = self.run(path, checkpoint=checkpoint_path)
+        assert 'Продолжаем' in output
+        assert not Post.objects.filter(pk=502).exists(), \
+            'Продолжение не должно заново читать уже записанные строки'
+        assert 'created:comment: 1' in output
+        assert not (tmp_path / 'checkpoint.json').exists(), \
+            'После успешного импорта контрольная точка удаляется'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_malformed_line_is_counted_not_fatal(self, tmp_path):
+        from posts.models import User
+        path = tmp_path / 'content.jsonl'
+        path.write_text('{"type": "user", "username": "alice"}\n'
+                        '{"type": "user", "username": \n'
+                        '[1, 2]\n'
+                        '{"type": "user", "username": "bob"}\n', encoding='utf-8')
+        output, errors = self.run(str(path))
+        assert set(User.objects.values_list('username', flat=True)) == {'alice', 'bob'}, \
+            'Битая строка не должна останавливать импорт'
+        assert 'error:unknown: 2' in output
+        assert 'неверный JSON' in errors
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_invalidates_existing_followers_feeds(self, client, tmp_path):
+        from posts.models import Follow, User
+        alice = User.objects.create_user(username='alice')
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=alice)
+        client.force_login(reader)
+        client.get(reverse('follow_index'))
+        self.run(self.write_jsonl(tmp_path, [
+            {'type': 'post', 'author': 'alice', 'text': 'Импортированный пост',
+             'pub_date': '2020-01-01T10:00:00'}]))
+        assert 'Импортированный пост' in client.get(reverse('follow_index')).content.decode(), \
+            'Лента подписчика автора должна обновиться после импорта'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rebuild_touches_only_imported_rows(self, tmp_path):
+        from posts import search
+        from posts.models import AuthorStats, Post, User
+        old = User.objects.create_user(username='old')
+        Post.objects.bulk_create([Post(author=old, text='Старый пост без индекса')])
+        AuthorStats.objects.filter(user=old).delete()
+        self.run(self.write_jsonl(tmp_path, [
+            {'type': 'user', 'username': 'alice'},
+            {'type': 'post', 'author': 'alice', 'text': 'Импортированный пост',
+             'pub_date': '2020-01-01T10:00:00'}]))
+        assert not AuthorStats.objects.filter(user=old).exists(), \
+            'Пересчет после импорта не должен обходить всю базу'
+        assert search.search_posts('старый', 10).object_list == []
+        imported = Post.objects.get(text='Импортированный пост')
+        assert search.search_posts('импортированный', 10).object_list == [imported], \
+            'Импортированные посты без id должны попасть в поисковый индекс'
+        assert AuthorStats.objects.get(user__username='alice').post_count == 1
@@ -0,0 +1,83 @@
+import json
+import threading
+
+import pytest
+from django.urls import reverse
+
+from core import metrics
+
+
+@pytest.fixture
+def registry():
+    metrics.registry.reset()
+    yield metrics.registry
+    metrics.registry.reset()
+
+
+class TestMetrics:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_endpoint_exposes_request_sql_template_and_cache(self, client, registry, post,
+                                                            settings):
+        settings.METRICS_ALLOWED_IPS = ['127.0.0.1']
+        client.get(reverse('index'))
+        client.get(reverse('index'))
+        text = client.get(reverse('metrics')).content.decode()
+        assert 'yatube_http_request_seconds_count{status="200",view="index"} 2' in text
+        assert 'yatube_http_request_seconds_bucket{status="200",view="index",le="+Inf"} 2' in text
+        assert 'yatube_sql_queries_total{view="index"}' in text
+        assert 'yatube_template_render_seconds_count{template="index.html"} 1' in text, \
+            'Вторая главная отдается из кэша страниц без рендеринга'
+        assert 'yatube_page_cache_total{result="hit",view="index"} 1' in text
+        assert 'yatube_cache_gets_total{result="hit"}' in text
+
+    @pytest.mark.django_db
+    def test_endpoint_is_not_public(self, client):
+        response = client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.5')
+        assert response.status_code == 404
+        response = client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1')
+        assert response.status_code == 404, \
+            'За прокси все запросы приходят с 127.0.0.1: по умолчанию он не открыт'
+
+    @pytest.mark.django_db
+    def test_aggregates_workers(self, client, registry, settings, tmp_path):
+        settings.METRICS_DIR = str(tmp_path)
+        settings.METRICS_ALLOWED_IPS = ['127.0.0.1']
+        (tmp_path / '1.json').write_text(json.dumps({
+            'counters': [['yatube_sql_queries_total', [['view', 'post']], 5]],
+            'histograms': [],
+        }))
+        metrics.inc('yatube_sql_queries_total', 2, view='post')
+        text = client.get(reverse('metrics')).content.decode()
+        assert 'yatube_sql_queries_total{view="post"} 7' in text, \
+            'Метрики процессов из METRICS_DIR должны суммироваться'
+
+    def test_threads_write_own_shards(self, registry):
+        def work():
+            for _ in range(1000):
+                metrics.inc('yatube_cache_gets_total', result='hit')
+                metrics.observe('yatube_thumbnail_seconds', 0.02)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        snapshot = registry.snapshot()
+        assert snapshot['counters'][('yatube_cache_gets_total', (('result', 'hit'),))] == 8000
+        series = snapshot['histograms'][('yatube_thumbnail_seconds', ())]
+        assert series[-1] == 8000
+        assert series[metrics.DEFAULT_BUCKETS.index(0.025)] == 8000
+
+    def test_finished_threads_are_merged(self, registry):
+        def work():
+            metrics.inc('yatube_cache_gets_total', result='miss')
+
+        for _ in range(20):
+            thread = threading.Thread(target=work)
+            thread.start()
+            thread.join()
+        snapshot = registry.snapshot()
+        assert snapshot['counters'][('yatube_cache_gets_total', (('result', 'miss'),))] == 20
+        assert len(registry._shards) <= 1, \
+            'Шарды завершившихся потоков должны сливаться в общий итог'
@@ -0,0 +1,64 @@
+import os
+import pstats
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+
+@pytest.fixture
+def profiles(settings, tmp_path):
+    settings.PROFILING_DIR = str(tmp_path)
+    return tmp_path
+
+
+def dumps(directory):
+    return sorted(os.listdir(directory))
+
+
+class TestProfiling:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_staff_header_writes_profile_and_sql(self, client, profiles, django_user_model, post):
+        staff = django_user_model.objects.create_user(username='staff', is_staff=True)
+        client.force_login(staff)
+        response = client.get(reverse('profile', args=[post.author.username]), HTTP_X_PROFILE='1')
+        name = response['X-Profile-Id']
+        assert dumps(profiles) == [f'{name}.prof', f'{name}.sql.txt']
+        pstats.Stats(str(profiles / f'{name}.prof'))
+        sql = (profiles / f'{name}.sql.txt').read_text()
+        assert 'FROM "auth_user"' in sql, 'В дамп должны попасть SQL-запросы страницы'
+
+        response = client.get(reverse('index'), HTTP_X_PROFILE='memory')
+        name = response['X-Profile-Id']
+        assert (profiles / f'{name}.alloc.txt').exists()
+        assert (profiles / f'{name}.tracemalloc').exists()
+
+    @pytest.mark.django_db
+    def test_header_from_non_staff_is_ignored(self, user_client, profiles):
+        response = user_client.get(reverse('index'), HTTP_X_PROFILE='1')
+        assert 'X-Profile-Id' not in response
+        assert dumps(profiles) == []
+
+    @pytest.mark.django_db
+    def test_signed_flag_for_one_user(self, client, user, profiles):
+        stdout = StringIO()
+        call_command('profile_token', user=user.username, stdout=stdout)
+        flag = stdout.getvalue().strip()
+        assert 'X-Profile-Id' not in client.get(reverse('index') + flag), \
+            'Токен, выданный пользователю, не действует для других'
+        assert 'X-Profile-Id' not in client.get(reverse('index') + flag + 'x'), \
+            'Испорченный токен должен игнорироваться'
+        client.force_login(user)
+        assert 'X-Profile-Id' in client.get(reverse('index') + flag)
+
+    @pytest.mark.django_db
+    def test_sampling_and_rotation(self, client, profiles, settings):
+        settings.PROFILING_SAMPLE_RATE = 1
+        settings.PROFILING_VIEWS = ('index',)
+        settings.PROFILING_KEEP = 2
+        assert 'X-Profile-Id' not in client.get(reverse('search'))
+        names = [client.get(reverse('index'))['X-Profile-Id'] for _ in range(3)]
+        assert dumps(profiles) == [f'{name}{suffix}' for name in names[1:]
+                                   for suffix in ('.prof', '.sql.txt')]
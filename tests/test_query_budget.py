@@ -0,0 +1,36 @@
+import pytest
+from django.urls import reverse
+
+
+class TestQueryBudget:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_anonymous_feeds(self, client, feed_data, assert_query_budget):
+        post = feed_data['posts'][0]
+        assert_query_budget(client, 'index', reverse('index'))
+        assert_query_budget(client, 'index', reverse('index') + '?page=3')
+        assert_query_budget(client, 'group', reverse('group', args=[feed_data['groups'][0].slug]))
+        assert_query_budget(client, 'profile', reverse('profile', args=[post.author.username]))
+        assert_query_budget(client, 'post', reverse('post', args=[post.author.username, post.id]))
+        assert_query_budget(client, 'post_comments',
+                            reverse('post_comments', args=[post.author.username, post.id]))
+
+    @pytest.mark.django_db(transaction=True)
+    def test_authorized_feeds(self, client, feed_data, assert_query_budget):
+        client.force_login(feed_data['reader'])
+        post = feed_data['posts'][0]
+        assert_query_budget(client, 'index', reverse('index'))
+        assert_query_budget(client, 'follow_index', reverse('follow_index'))
+        assert_query_budget(client, 'profile', reverse('profile', args=[post.author.username]))
+        assert_query_budget(client, 'post', reverse('post', args=[post.author.username, post.id]))
+        assert_query_budget(
+            client, 'add_comment', reverse('add_comment', args=[post.author.username, post.id]),
+            method='post', data={'text': 'Новый комментарий'})
+
+    @pytest.mark.django_db(transaction=True)
+    def test_budget_violation_raises(self, client, feed_data, settings):
+        from core.middleware import QueryBudgetExceeded
+        settings.QUERY_BUDGETS = {'index': 0}
+        settings.QUERY_BUDGET_ACTION = 'raise'
+        with pytest.raises(QueryBudgetExceeded):
+            client.get(reverse('index'))
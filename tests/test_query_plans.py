@@ -0,0 +1,51 @@
+import pytest
+from django.urls import reverse
+
+from posts.pagination import encode_key
+
+
+class TestQueryPlans:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_anonymous_feeds(self, client, feed_data, assert_query_plans):
+        post = feed_data['posts'][0]
+        assert_query_plans(client, reverse('index'))
+        assert_query_plans(client, reverse('index') + '?page=3')
+        assert_query_plans(client, reverse('group', args=[feed_data['groups'][0].slug]))
+        assert_query_plans(client, reverse('profile', args=[post.author.username]))
+        assert_query_plans(client, reverse('post', args=[post.author.username, post.id]))
+        comment = post.comments.order_by('created', 'id').first()
+        assert_query_plans(client, reverse('post_comments', args=[post.author.username, post.id])
+                           + f'?after={encode_key(comment.created, comment.pk)}')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_authorized_feeds(self, client, feed_data, assert_query_plans):
+        client.force_login(feed_data['reader'])
+        post = feed_data['posts'][0]
+        assert_query_plans(client, reverse('follow_index'))
+        response = assert_query_plans(client, reverse('follow_index') + '?after=')
+        cursor = response.context['page'].next_cursor
+        assert_query_plans(client, reverse('follow_index') + f'?after={cursor}')
+        assert_query_plans(client, reverse('follow_index') + f'?before={cursor}')
+        assert_query_plans(client, reverse('profile', args=[post.author.username]))
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cursor_pages(self, client, feed_data, assert_query_plans):
+        response = assert_query_plans(client, reverse('index') + '?after=')
+        cursor = response.context['page'].next_cursor
+        assert_query_plans(client, reverse('index') + f'?after={cursor}')
+        assert_query_plans(client, reverse('index') + f'?before={cursor}')
+        group = feed_data['groups'][0].slug
+        assert_query_plans(client, reverse('group', args=[group]) + f'?after={cursor}')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_timeline_trim(self, feed_data):
+        from core.queries import (StatementLog, explain_query_plan, plan_problems,
+                                  wrap_all_connections)
+        from posts import timeline
+        statements = StatementLog()
+        with wrap_all_connections(statements):
+            timeline.trim_followers(feed_data['posts'][0].author_id)
+        sql, params = statements.statements[-1]
+        assert plan_problems(explain_query_plan(sql, params)) == [], \
+            'Обрезка лент должна идти по индексу без сортировки'
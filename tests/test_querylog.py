@@ -0,0 +1,66 @@
+import logging
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from core import querylog
+
+
+@pytest.fixture
+def query_log(settings, tmp_path):
+    settings.QUERY_LOG_DIR = str(tmp_path)
+    settings.QUERY_LOG_FLUSH_INTERVAL = 0
+    querylog.query_log.reset()
+    yield querylog.query_log
+    querylog.query_log.reset()
+
+
+class TestQueryLog:
+
+    def test_fingerprint_drops_values(self):
+        first = querylog.fingerprint(
+            'SELECT "posts_post"."id" FROM "posts_post" WHERE "posts_post"."author_id" IN (%s, %s, %s)  LIMIT 21')
+        second = querylog.fingerprint(
+            'SELECT "posts_post"."id" FROM "posts_post" WHERE "posts_post"."author_id" IN (%s) LIMIT 10')
+        assert first == second == \
+            'SELECT "posts_post"."id" FROM "posts_post" WHERE "posts_post"."author_id" IN (...) LIMIT ?'
+        assert querylog.fingerprint("SELECT 1 FROM t WHERE name = 'it''s' AND U0.x = -3") == \
+            'SELECT ? FROM t WHERE name = ? AND U0.x = ?'
+
+    def test_report_ranks_n_plus_one(self, query_log):
+        query_log.record('index', [('SELECT author WHERE id = ?', 0.001)] * 10 +
+                         [('SELECT page', 0.005)])
+        query_log.record('index', [('SELECT author WHERE id = ?', 0.001)] * 10 +
+                         [('SELECT page', 0.005)])
+        rows = querylog.report([query_log.snapshot()], sort='per_request')
+        assert rows[0]['sql'] == 'SELECT author WHERE id = ?'
+        assert rows[0]['per_request'] == 10
+        assert rows[0]['count'] == 20
+
+    @pytest.mark.django_db(transaction=True)
+    def test_requests_feed_report_command(self, client, query_log, settings, post):
+        client.get(reverse('profile', args=[post.author.username]))
+        client.get(reverse('post', args=[post.author.username, post.id]))
+        stdout = StringIO()
+        call_command('query_report', top=5, view='profile', width=0, stdout=stdout)
+        lines = stdout.getvalue().splitlines()
+        assert lines[0].split()[:2] == ['total', 'ms']
+        assert len(lines) > 1 and all(' profile ' in line for line in lines[1:]), \
+            'Отчет с --view должен показывать только это представление'
+        assert 'FROM "auth_user"' in stdout.getvalue()
+
+        call_command('query_report', reset=True, stdout=StringIO())
+        assert querylog.load(settings.QUERY_LOG_DIR) == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_slow_queries_are_logged_with_stack(self, client, query_log, settings, caplog, post):
+        settings.SLOW_QUERY_THRESHOLD = 0
+        with caplog.at_level(logging.WARNING, logger='yatube.slow_queries'):
+            client.get(reverse('profile', args=[post.author.username]))
+        messages = [record.getMessage() for record in caplog.records
+                    if record.name == 'yatube.slow_queries']
+        assert messages, 'Запросы дольше порога должны попадать в лог'
+        assert any('params:' in message and 'posts/views.py' in message for message in messages), \
+            'В логе нужны параметры и фрагмент стека из кода проекта'
@@ -0,0 +1,97 @@
+from io import StringIO
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.urls import reverse
+
+
+@pytest.fixture
+def replica(settings, tmp_path):
+    """Алиас replica — файл SQLite, который заполняет sync_replicas."""
+    connections.databases['replica'] = {
+        **connections.databases['default'],
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    }
+    settings.DATABASE_REPLICAS = ['replica']
+    yield 'replica'
+    connections['replica'].close()
+    del connections.databases['replica']
+    delattr(connections._connections, 'replica')
+
+
+class TestReplicaRouting:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_reads_go_to_replica_until_user_writes(self, client, replica, user, post):
+        from posts.models import Post
+        call_command('sync_replicas', stdout=StringIO())
+        fresh = Post.objects.create(text='Пост после синхронизации', author=user)
+        cache.clear()
+
+        response = client.get(reverse('index'))
+        assert fresh.text not in response.content.decode(), \
+            'Главная должна читаться с реплики, где нового поста еще нет'
+        assert 'primary_until' not in response.cookies
+
+        client.force_login(user)
+        response = client.post(reverse('add_comment', args=[user.username, post.id]),
+                               {'text': 'Свежий комментарий'})
+        assert 'primary_until' in response.cookies, \
+            'После записи должна ставиться cookie привязки к основной базе'
+        response = client.get(reverse('index'))
+        assert fresh.text in response.content.decode(), \
+            'После записи пользователь должен читать из основной базы'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_other_views_and_writes_use_primary(self, client, replica, user):
+        from core.db.router import PrimaryReplicaRouter, read_from_replica, reset
+        from posts.models import Post
+        router = PrimaryReplicaRouter()
+        read_from_replica()
+        try:
+            assert router.db_for_read(Post) == 'replica'
+            assert router.db_for_write(Post) == 'default'
+            assert router.db_for_read(Post) == 'default', \
+                'После записи в запросе чтения должны идти в основную базу'
+        finally:
+            assert reset() is False, \
+                'Маршрут для записи без самой записи не включает привязку'
+        assert router.db_for_read(Post) == 'default', \
+            'Вне представлений из REPLICA_READ_VIEWS чтение идет из основной базы'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_only_real_writes_are_sticky(self, client, replica, user):
+        from core.db.router import read_from_replica, record_writes, reset
+        from core.queries import wrap_all_connections
+        from posts.models import AuthorStats, Post
+        AuthorStats.objects.create(user=user)
+        read_from_replica()
+        try:
+            with wrap_all_connections(record_writes):
+                AuthorStats.objects.get_or_create(user=user)
+        finally:
+            assert reset() is False, \
+                'get_or_create, нашедший строку, не должен ставить привязку'
+        read_from_replica()
+        try:
+            with wrap_all_connections(record_writes):
+                Post.objects.create(text='Пост', author=user)
+        finally:
+            assert reset() is True
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('page_cache_views', [('index',), ()])
+    def test_replica_pages_are_not_cached(self, client, replica, settings, user,
+                                          page_cache_views):
+        from posts.models import Post
+        settings.PAGE_CACHE_VIEWS = page_cache_views
+        call_command('sync_replicas', stdout=StringIO())
+        fresh = Post.objects.create(text='Пост после синхронизации', author=user)
+        cache.clear()
+        assert fresh.text not in client.get(reverse('index')).content.decode()
+
+        settings.DATABASE_REPLICAS = []
+        assert fresh.text in client.get(reverse('index')).content.decode(), \
+            'Страница и фрагменты, собранные из реплики, не должны попадать в кэш'
@@ -0,0 +1,61 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+class TestSeed:
+
+    def seed(self, *args, **options):
+        call_command('seed', *args, users=20, groups=3, posts=200, comments=400,
+                     follows=5, stdout=StringIO(), **options)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_fills_database_consistently(self):
+        from posts.models import Post, Comment, Follow, TimelineEntry, AuthorStats
+        self.seed()
+        assert Post.objects.count() == 200
+        assert Comment.objects.exists() and Follow.objects.exists()
+        assert TimelineEntry.objects.exists(), \
+            'Команда seed должна собрать ленты подписок'
+        stats = AuthorStats.objects.get(user=Post.objects.first().author)
+        assert stats.post_count == Post.objects.filter(author=stats.user).count(), \
+            'Команда seed должна пересчитать счетчики авторов'
+        post = Post.objects.order_by('-comment_count').first()
+        assert post.comment_count == post.comments.count()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_same_seed_gives_same_data(self):
+        from posts.models import Post
+        self.seed(prefix='first')
+        first = list(Post.objects.order_by('id').values_list('text', 'pub_date'))
+        self.seed(prefix='second')
+        second = list(Post.objects.order_by('id').values_list('text', 'pub_date'))[len(first):]
+        assert first == second, 'При одном и том же --seed данные и даты должны совпадать'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_until_sets_last_post_date(self):
+        import datetime
+        from posts.models import Post
+        self.seed('--until=2020-05-01')
+        until = datetime.datetime(2020, 5, 1, tzinfo=datetime.timezone.utc)
+        latest = Post.objects.latest('pub_date').pub_date
+        # 200 постов за 365 дней: шаг меньше двух дней.
+        assert until - datetime.timedelta(days=2) < latest < until
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rebuild_touches_only_seeded_rows(self):
+        from posts import search
+        from posts.models import Post, AuthorStats, User
+        old = User.objects.create_user(username='old')
+        Post.objects.bulk_create([Post(author=old, text='Старый пост без индекса')])
+        AuthorStats.objects.filter(user=old).delete()
+        self.seed()
+        assert not AuthorStats.objects.filter(user=old).exists(), \
+            'Пересчет после seed не должен обходить всю базу'
+        assert search.search_posts('старый', 10).object_list == []
+        seeded = Post.objects.exclude(author=old).first()
+        assert seeded in search.search_posts(seeded.text, 10).object_list, \
+            'Записанные seed посты должны попасть в поисковый индекс'
+        stats = AuthorStats.objects.get(user=seeded.author)
+        assert stats.post_count == Post.objects.filter(author=seeded.author).count()
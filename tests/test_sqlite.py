@@ -0,0 +1,71 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+def pragma_of(cursor, name):
+    cursor.execute(f'PRAGMA {name}')
+    return cursor.fetchone()[0]
+
+
+def pragma(name):
+    with connection.cursor() as cursor:
+        return pragma_of(cursor, name)
+
+
+class TestSqliteProfile:
+
+    @pytest.mark.django_db
+    def test_pragmas_are_applied_to_connection(self, settings):
+        pragmas = settings.DATABASES['default']['OPTIONS']['pragmas']
+        assert pragma('busy_timeout') == pragmas['busy_timeout']
+        assert pragma('cache_size') == pragmas['cache_size']
+        assert pragma('synchronous') == 1, 'Ожидается synchronous = NORMAL'
+        assert pragma('foreign_keys') == 1, \
+            'Свои PRAGMA не должны отменять настройки Django'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_transactions_take_write_lock_immediately(self):
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                pass
+        assert queries[0]['sql'] == 'BEGIN IMMEDIATE', \
+            'atomic() должен начинать транзакцию с BEGIN IMMEDIATE'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_maintenance_command(self):
+        stdout = StringIO()
+        call_command('sqlite_maintenance', stdout=stdout, stderr=StringIO())
+        output = stdout.getvalue()
+        for step in ('analyze', 'optimize', 'fts5 optimize posts_search_fts'):
+            assert step in output, f'Команда sqlite_maintenance должна выполнить {step}'
+        assert 'размер' in output
+
+    @pytest.mark.django_db(transaction=True)
+    def test_incremental_vacuum_frees_requested_pages(self, tmp_path):
+        from django.db import connections
+        from core.db.maintenance import maintain
+        connections.databases['scratch'] = {
+            **connections.databases['default'],
+            'NAME': str(tmp_path / 'scratch.sqlite3'),
+        }
+        try:
+            with connections['scratch'].cursor() as cursor:
+                cursor.execute('CREATE TABLE junk (data TEXT)')
+                cursor.executemany('INSERT INTO junk VALUES (%s)',
+                                   [('x' * 4000,)] * 50)
+                cursor.execute('DELETE FROM junk')
+                assert pragma_of(cursor, 'freelist_count') > 10
+                page_size = pragma_of(cursor, 'page_size')
+            steps, before, after = maintain('scratch', vacuum_pages=10, analyze=False)
+            assert before['free'] - after['free'] == 10 * page_size, \
+                'incremental_vacuum(N) должен освободить ровно N страниц'
+            steps, before, after = maintain('scratch', analyze=False)
+            assert after['free'] == 0
+        finally:
+            connections['scratch'].close()
+            del connections.databases['scratch']
+            delattr(connections._connections, 'scratch')
@@ -0,0 +1,33 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from core import warmup
+
+
+class TestWarmup:
+
+    def test_templates_and_routes(self):
+        compiled, errors = warmup.compile_templates()
+        assert errors == []
+        assert compiled >= 10, 'Должны компилироваться шаблоны проекта и приложений'
+        names, reversed_count = warmup.resolve_routes()
+        assert 'index' in set(warmup._route_names(warmup.get_resolver().url_patterns))
+        assert 0 < reversed_count < names, 'Маршруты с параметрами не строятся, но и не роняют прогрев'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_command_primes_page_cache(self, client, post_with_group):
+        stdout = StringIO()
+        call_command('warmup', pages=2, stdout=stdout)
+        output = stdout.getvalue()
+        for step in ('import sorl.thumbnail', 'thumbnail engine', 'templates',
+                     'url resolver', 'feed and group pages', 'total'):
+            assert step in output, f'В отчете нет шага {step}'
+        assert '3 pages' in output, 'Две страницы главной и одна группа'
+
+        response = client.get(reverse('index'))
+        assert response['X-Page-Cache'] == 'hit'
+        response = client.get(reverse('group', args=[post_with_group.group.slug]))
+        assert response['X-Page-Cache'] == 'hit'
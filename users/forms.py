@@ -1,11 +1,32 @@
+from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import get_user_model
+from django.urls import NoReverseMatch, Resolver404, resolve, reverse
 
 
 User = get_user_model()
 
 
+def is_reserved_username(username):
+    """Имя совпадает с адресом сайта (search/, new/, admin/ и т. п.),
+    который стоит в urls раньше профиля: страницы такого пользователя
+    были бы недоступны."""
+    try:
+        return any(
+            resolve(reverse(name, args=args)).url_name != name
+            for name, args in (('profile', [username]),
+                               ('post', [username, 1])))
+    except (NoReverseMatch, Resolver404):
+        return True
+
+
 class CreationForm(UserCreationForm):
     # class Meta(UserCreationForm.Meta):
     model = User
     fields = ('first_name', 'last_name', 'username', 'email')
+
+    def clean_username(self):
+        username = self.cleaned_data['username']
+        if is_reserved_username(username):
+            raise forms.ValidationError('Это имя пользователя занято.')
+        return username
@@ -18,6 +18,7 @@ INSTALLED_APPS = [
     'about',
     'users',
     'posts',
+    'core',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -29,13 +30,19 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
+    'core.middleware.QueryLogMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'posts.page_cache.PageCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -44,7 +51,9 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backend.InstrumentedDjangoTemplates',
+        # Имя движка, которое было у стандартного бэкенда
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -61,13 +70,56 @@ TEMPLATES = [
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
+# SQLite в режиме для конкурентной записи (core/db/sqlite3/base.py):
+# WAL — читатели не ждут писателя; synchronous=NORMAL в WAL не теряет
+# целостность, но не синхронизирует диск на каждом коммите; busy_timeout
+# и BEGIN IMMEDIATE — писатели ждут очереди вместо «database is locked».
+# Соединения живут CONN_MAX_AGE секунд, PRAGMA выполняются один раз на
+# соединение. Обслуживание базы — команда sqlite_maintenance.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                # Первым: действует только на пустой базе, а переключение
+                # в WAL уже записывает ее заголовок. Существующую базу
+                # переводит sqlite_maintenance --full-vacuum
+                'auto_vacuum': 'incremental',
+                'journal_mode': 'wal',
+                'synchronous': 'normal',
+                'busy_timeout': 20000,
+                # Отрицательное значение — в КиБ: 64 МиБ страниц на
+                # соединение
+                'cache_size': -64000,
+                'mmap_size': 256 * 1024 ** 2,
+                'temp_store': 'memory',
+            },
+        },
     }
 }
 
+# Реплики для чтения (core/db/router.py) — алиасы DATABASES с копией
+# основной базы. Для проверки на одной машине подойдут копии файла,
+# которые обновляет команда sync_replicas:
+#
+#     DATABASES['replica'] = {
+#         **DATABASES['default'],
+#         'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+#         'TEST': {'MIRROR': 'default'},
+#     }
+#     DATABASE_REPLICAS = ['replica']
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['core.db.router.PrimaryReplicaRouter']
+# Представления, которые читают с реплик, и сколько секунд после записи
+# пользователь читает из основной базы, чтобы видеть свои изменения
+REPLICA_READ_VIEWS = ('index', 'group', 'profile', 'post', 'post_comments',
+                      'follow_index', 'search')
+REPLICA_STICKY_SECONDS = 10
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -113,8 +165,116 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Общий для всех воркеров машины кэш в файле SQLite (core/cache/sqlite.py)
+# с вытеснением давно не читанных записей сверх MAX_ENTRIES / MAX_SIZE
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.sqlite.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_SIZE': 256 * 1024 ** 2,
+        },
     }
 }
+
+# Тесты работают с копией кэша во временном каталоге (core/test_runner.py)
+TEST_RUNNER = 'core.test_runner.DiscoverRunner'
+
+# Курсорная пагинация лент (?after=/?before=) вместо ?page=N
+POSTS_CURSOR_PAGINATION = False
+
+# Сколько комментариев показывать на странице поста и подгружать
+# кнопкой «Показать ещё»
+POSTS_COMMENTS_PAGE_SIZE = 50
+
+# Материализованная лента подписок: длина ленты и порог подписчиков,
+# выше которого посты автора подмешиваются при чтении, а не рассылаются
+POSTS_TIMELINE_LENGTH = 500
+POSTS_TIMELINE_FANOUT_LIMIT = 10000
+
+# Потолок SQL-запросов на один запрос к представлению (по имени URL).
+# QUERY_BUDGET_ACTION: 'log' — предупреждение в логе, 'raise' — исключение
+QUERY_BUDGETS = {
+    'index': 5,
+    'group': 5,
+    'profile': 6,
+    'post': 6,
+    'post_comments': 5,
+    'follow_index': 5,
+    'add_comment': 9,
+}
+QUERY_BUDGET_ACTION = 'log'
+
+# Время жизни фрагментов лент; актуальность обеспечивают поколения,
+# которые сдвигаются при записи (posts/feed_cache.py)
+FEED_CACHE_TIMEOUT = 60 * 60
+
+# Метрики Prometheus на /metrics (core/metrics.py): кому их отдавать
+# кроме сотрудников; каталог, через который процессы сводят метрики
+# (None — только процесс, принявший запрос), и как часто его обновлять.
+# За nginx на той же машине все запросы приходят с 127.0.0.1, поэтому
+# адреса по умолчанию не открыты: укажите адрес сборщика Prometheus,
+# только если он ходит к приложению напрямую, мимо прокси
+METRICS_ALLOWED_IPS = ()
+METRICS_DIR = None
+METRICS_FLUSH_INTERVAL = 5
+
+# Сводка SQL по отпечаткам (core/querylog.py, manage.py query_report):
+# куда процессы сбрасывают сводку (None — не сбрасывать, например
+# os.path.join(BASE_DIR, 'querylog')) и как часто; запросы дольше
+# SLOW_QUERY_THRESHOLD секунд пишутся в лог yatube.slow_queries
+QUERY_LOG_DIR = None
+QUERY_LOG_FLUSH_INTERVAL = 5
+SLOW_QUERY_THRESHOLD = 0.1
+
+# Профилирование живых запросов (core/profiling.py): куда писать профили
+# и сколько последних хранить; доля случайно профилируемых запросов к
+# PROFILING_VIEWS и следить ли в них за памятью; срок жизни токенов
+# ?_profile= из manage.py profile_token
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILING_KEEP = 50
+PROFILING_SAMPLE_RATE = 0
+PROFILING_VIEWS = ('profile', 'follow_index')
+PROFILING_SAMPLE_MEMORY = False
+PROFILING_TOKEN_MAX_AGE = 24 * 60 * 60
+
+# Прогрев процесса (core/warmup.py, manage.py warmup): выполнять ли его
+# при загрузке yatube/wsgi.py и сколько первых страниц главной и самых
+# больших групп запрашивать, чтобы заполнить кэши
+WARMUP_ON_START = False
+WARMUP_PAGES = 3
+
+# Кэш целых страниц для анонимных посетителей (posts/page_cache.py):
+# страницы каких представлений кэшировать и сколько секунд хранить копию
+PAGE_CACHE_VIEWS = ('index', 'group', 'profile', 'post', 'post_comments')
+PAGE_CACHE_TIMEOUT = 10 * 60
+
+# Размеры миниатюр, которые строятся заранее при загрузке картинки;
+# должны совпадать с тем, что запрашивают шаблоны через {% thumbnail %}
+POSTS_THUMBNAIL_GEOMETRIES = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+# Число процессов для генерации миниатюр в каждом воркере сайта; 0 —
+# строить сразу в запросе. Пул свой у каждого воркера gunicorn, поэтому
+# всего процессов — число воркеров, умноженное на это значение
+POSTS_THUMBNAIL_WORKERS = 0 if DEBUG else 2
+
+# Приём картинок постов (posts/images.py): больше POSTS_IMAGE_MAX_SIZE
+# картинка уменьшается, больше POSTS_IMAGE_MAX_PIXELS или
+# POSTS_IMAGE_MAX_UPLOAD_SIZE байт — отклоняется до декодирования
+POSTS_IMAGE_MAX_SIZE = (1920, 1920)
+POSTS_IMAGE_MAX_PIXELS = 24 * 10 ** 6
+POSTS_IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 ** 2
+# Загрузки больше этого размера пишутся во временный файл, а не в память
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440
+
+# Адаптивные варианты картинок для srcset: ширины, форматы и пропорции
+# кадра карточки поста
+POSTS_IMAGE_VARIANT_WIDTHS = (320, 640, 960)
+POSTS_IMAGE_VARIANT_FORMATS = ('WEBP', 'JPEG')
+POSTS_IMAGE_CARD_ASPECT = (960, 339)
+
+# Полнотекстовый поиск: 'fts5' (SQLite FTS5), 'inverted' (обратный
+# индекс в таблице posts_searchposting) или 'auto'
+SEARCH_BACKEND = 'auto'
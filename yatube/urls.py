@@ -10,6 +10,7 @@ urlpatterns = [
     path('auth/', include('django.contrib.auth.urls')),
     path('admin/', admin.site.urls),
     path('about/', include('about.urls', namespace='about')),
+    path('', include('core.urls')),
     path('', include('posts.urls')),
 ]
 
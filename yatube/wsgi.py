@@ -1,8 +1,14 @@
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Прогрев до того, как сервер начнет отдавать приложению запросы.
+if getattr(settings, 'WARMUP_ON_START', False):
+    from core.warmup import warm_up
+    warm_up()